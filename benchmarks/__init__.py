@@ -0,0 +1,7 @@
+"""
+Benchmarks
+Synthetic vault generator (synth) and timing suite (run) for the storage,
+search, link-resolution, render and merge paths.
+
+    python -m benchmarks.run --sizes 1000 10000 --out bench_output.json
+"""
@@ -0,0 +1,178 @@
+"""
+Benchmark suite for the DB, search, link-resolution, render and merge paths.
+
+Each size gets a fresh synthetic vault in a temp directory; the vault code is
+pointed at it by changing into that directory (collection paths are relative).
+
+Usage:
+    python -m benchmarks.run [--sizes 1000 10000] [--repeat 5]
+                             [--out bench_output.json] [--compare previous.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dnd_vault as vault  # noqa: E402
+import merge_monsters  # noqa: E402
+from benchmarks import synth  # noqa: E402
+
+QUERIES = ["ember", "moss lan", '"witch goat"', "zzz"]
+
+
+def timed(fn, repeat):
+    """Run fn `repeat` times; returns {min, median} in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3)}
+
+
+def quiet(fn):
+    """Wrap fn so its printing doesn't end up in the timings' output."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+    return run
+
+
+def cold_load():
+    vault.STORE.invalidate()
+    for path in vault.COLLECTION_PATHS.values():
+        vault.load_list(path)
+
+
+def cold_lookup(ids):
+    """Reopen every collection and fetch one entry, as a single CLI command would."""
+    vault.STORE.invalidate()
+    for path, entry_id in ids.items():
+        vault.STORE.get(path, entry_id)
+
+
+def search_all():
+    for path in vault.COLLECTION_PATHS.values():
+        for q in QUERIES:
+            vault.search_entries(path, q)
+
+
+def bench_size(size, repeat, seed):
+    results = {"size": size}
+    workdir = tempfile.mkdtemp(prefix=f"vault-bench-{size}-")
+    cwd = os.getcwd()
+    try:
+        start = time.perf_counter()
+        data, sources = synth.generate(size, seed)
+        synth.write_vault(workdir, data, sources)
+        results["generate_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        os.chdir(workdir)
+
+        vault.STORE.snapshots = False
+        results["load_cold_json"] = timed(cold_load, repeat)
+        vault.STORE.snapshots = True
+        cold_load()  # writes the snapshots
+        for thread in threading.enumerate():
+            if thread.name == "vault-snapshot":
+                thread.join()
+        results["load_cold"] = timed(cold_load, repeat)
+        ids = {p: vault.load_list(p)[-1]["id"] for p in vault.COLLECTION_PATHS.values() if vault.load_list(p)}
+        vault.STORE.snapshots = False
+        results["lookup_cold_json"] = timed(lambda: cold_lookup(ids), repeat)
+        vault.STORE.snapshots = True
+        results["lookup_cold"] = timed(lambda: cold_lookup(ids), repeat)
+        results["load_warm"] = timed(lambda: [vault.load_list(p) for p in vault.COLLECTION_PATHS.values()], repeat)
+
+        # The first search builds (and persists) each collection's index.
+        results["search_index_build"] = timed(search_all, 1)
+        results["search_warm"] = timed(search_all, repeat)
+
+        results["next_id"] = timed(lambda: vault.next_id(vault.QUESTS_PATH, "quest-"), repeat)
+
+        quests = vault.load_list(vault.QUESTS_PATH)
+        shops = vault.load_list(vault.SHOPS_PATH)
+        parents = [q for q in quests if q.get("sub_quests")][:50]
+        results["display_quest"] = timed(quiet(lambda: [vault.display_quest(q) for q in parents]), repeat)
+        results["display_shop"] = timed(quiet(lambda: [vault.display_shop(s) for s in shops[:50]]), repeat)
+        results["render_markdown"] = timed(
+            lambda: [vault.RENDER.render("quests", q) for q in quests[:500]], repeat
+        )
+
+        # Merge everything into an empty bestiary, then re-run with nothing changed.
+        merge_dir = os.path.join(workdir, "merge")
+        os.makedirs(merge_dir)
+        shutil.copytree(os.path.join(workdir, "monsters"), os.path.join(merge_dir, "monsters"))
+        with open(os.path.join(merge_dir, "monsters.json"), "w", encoding="utf-8") as f:
+            json.dump([], f)
+        run_merge = quiet(lambda: merge_monsters.main(merge_dir))
+        results["merge_monsters_cold"] = timed(run_merge, 1)
+        results["merge_monsters_warm"] = timed(run_merge, repeat)
+    finally:
+        os.chdir(cwd)
+        vault.STORE.invalidate()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(current, previous):
+    """Print median deltas against an earlier results file."""
+    old = {r["size"]: r for r in previous.get("results", [])}
+    for result in current["results"]:
+        base = old.get(result["size"])
+        if not base:
+            continue
+        print(f"\n--- size {result['size']} vs previous ---")
+        for name, value in result.items():
+            if not isinstance(value, dict) or name not in base:
+                continue
+            before, after = base[name]["median_ms"], value["median_ms"]
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"  {name:<22} {before:>10.3f} -> {after:>10.3f} ms  {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the vault on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_output.json")
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": type(vault.STORE).__name__,
+        "results": [],
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} records per collection...")
+        result = bench_size(size, args.repeat, args.seed)
+        report["results"].append(result)
+        for name, value in result.items():
+            if isinstance(value, dict):
+                print(f"  {name:<22} median {value['median_ms']:>10.3f} ms   min {value['min_ms']:>10.3f} ms")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
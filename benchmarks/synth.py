@@ -0,0 +1,222 @@
+"""
+Synthetic vault generator.
+
+Builds items, monsters (vault format and `monsters/` source format), shops,
+characters and quests shaped like the real files: nested objectives, growler
+menus with item links, shop owners, sub-quest trees and cross-links.
+"""
+
+import json
+import os
+import random
+
+WORDS = (
+    "ember raven hollow gilded fading weeping burning ash moss thorn lantern "
+    "grim witch goat drune fairy hag bog mire stone oak bramble crow silver "
+    "iron bone candle ruby feather mask chain brand pipe brew smoke leaf wold "
+    "fog marsh root owl elf gnome saint choir debt ledger moon crypt vault"
+).split()
+
+CATEGORIES = ["Weapon", "Ring", "Potion", "Wondrous Item", "Pipe", "Brew", "Gear", "Quest Item"]
+RARITIES = ["Common", "Uncommon", "Rare", "Very Rare", "Legendary"]
+ALIGNMENTS = ["Lawful", "Neutral", "Chaotic", "Any"]
+TREASURE = ["None", "A", "B", "C", "D", "U", "V"]
+SHOP_TYPES = ["Tavern", "Shop", "Church", "Location", "Smoke Shop"]
+CHAR_TYPES = ["PC", "Major NPC", "Quest NPC", "Encampment NPC", "Faction/Group", "Deity"]
+QUEST_TYPES = ["Side Quest", "Core Quest", "Faction Arc", "Antagonist Arc"]
+QUEST_STATUS = ["Not Started", "In Progress", "Complete"]
+OBJECTIVE_STATUS = ["incomplete", "in_progress", "complete"]
+
+
+def words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def title(rng, n=3):
+    return words(rng, n).title()
+
+
+def sentence(rng, n=18):
+    return words(rng, n).capitalize() + "."
+
+
+def ids(prefix, n):
+    return [f"{prefix}{i:04d}" for i in range(1, n + 1)]
+
+
+def make_items(rng, n):
+    items = []
+    for item_id in ids("item-", n):
+        name = title(rng)
+        description = " ".join(sentence(rng) for _ in range(3))
+        rules = sentence(rng, 24)
+        items.append({
+            "id": item_id,
+            "name": name,
+            "category": rng.choice(CATEGORIES),
+            "rarity": rng.choice(RARITIES),
+            "description": description,
+            "rules": rules,
+            "created_on": "2025-12-09",
+            "source": "Synthetic",
+            "tags": rng.sample(WORDS, 4),
+            "paste_block": f"**{name}**\n\n*Description*:\n{description}\n\n*Effect*:\n{rules}",
+        })
+    return items
+
+
+def make_attack(rng):
+    attack = {"name": rng.choice(["bite", "claw", "weapon", "sting"]),
+              "damage": f"1d{rng.choice([4, 6, 8, 10])}"}
+    if rng.random() < 0.2:
+        attack["count"] = rng.choice([2, 3])
+    return attack
+
+
+def make_source_monster(rng, i):
+    ac = rng.randint(0, 9)
+    hd = rng.randint(1, 12)
+    return {
+        "id": f"synthetic-{i}",
+        "name": f"{title(rng, 2)} {i}",
+        "description": sentence(rng, 20),
+        "ac": ac,
+        "aac": 19 - ac,
+        "hd": str(hd) + rng.choice(["", "*", "**", "+1"]),
+        "hp_avg": hd * 4 + rng.randint(0, 3),
+        "attacks": [make_attack(rng) for _ in range(rng.randint(1, 3))],
+        "thac0": max(10, 20 - hd),
+        "attack_bonus": min(9, hd),
+        "mv": {"base": rng.choice([60, 90, 120, 150]), "encounter": rng.choice([20, 30, 40, 50])},
+        "saves": {"D": 12, "W": 13, "P": 14, "B": 15, "S": 16},
+        "save_as": str(hd),
+        "morale": rng.randint(5, 12),
+        "alignment": rng.choice(ALIGNMENTS),
+        "xp": hd * rng.choice([10, 25, 50]),
+        "number_appearing": {"dungeon": f"1d{rng.choice([4, 6, 8])}", "lair": f"{rng.randint(1, 3)}d6"},
+        "treasure_type": rng.choice(TREASURE),
+        "special": [sentence(rng, 12) for _ in range(rng.randint(0, 3))],
+        "tags": rng.sample(WORDS, 3),
+    }
+
+
+def make_monsters(rng, n):
+    """Return (vault monsters, source monsters) for the same bestiary."""
+    from merge_monsters import convert_monster
+
+    sources = [make_source_monster(rng, i) for i in range(1, n + 1)]
+    return [convert_monster(m, i) for i, m in enumerate(sources, start=1)], sources
+
+
+def make_shops(rng, n, item_ids):
+    shops = []
+    for shop_id in ids("shop-", n):
+        linked = rng.sample(item_ids, min(len(item_ids), 6))
+        shops.append({
+            "id": shop_id,
+            "name": title(rng),
+            "owner": title(rng, 2),
+            "location": title(rng, 2),
+            "type": rng.choice(SHOP_TYPES),
+            "description": sentence(rng, 30),
+            "inventory": [
+                {"name": title(rng, 2), "price": f"{rng.randint(1, 50)} {rng.choice(['cp', 'sp', 'gp'])}",
+                 "stock": rng.choice(["common", "limited", "rare"])}
+                for _ in range(rng.randint(2, 10))
+            ],
+            "growler_menu": [
+                {"name": title(rng, 2), "price": f"{rng.randint(1, 5)} gp", "item_id": item_id}
+                for item_id in linked[:3]
+            ],
+            "acquired_here": linked[3:5],
+            "stolen_from": linked[5:],
+            "quest_items": [title(rng, 2)],
+            "notes": sentence(rng),
+            "tags": rng.sample(WORDS, 3),
+            "created_on": "2025-12-09",
+        })
+    return shops
+
+
+def make_characters(rng, n, shop_ids, item_ids, quest_ids):
+    chars = []
+    owners = iter(shop_ids)
+    for char_id in ids("char-", n):
+        chars.append({
+            "id": char_id,
+            "name": title(rng, 2),
+            "type": rng.choice(CHAR_TYPES),
+            "race_class": title(rng, 2),
+            "appearance": sentence(rng, 25),
+            "personality": sentence(rng, 25),
+            "motivations": sentence(rng, 20),
+            "special_notes": sentence(rng, 15),
+            "shop_id": next(owners, None) if rng.random() < 0.3 else None,
+            "quest_ids": rng.sample(quest_ids, min(len(quest_ids), 2)),
+            "related_items": rng.sample(item_ids, min(len(item_ids), 2)),
+            "tags": rng.sample(WORDS, 4),
+            "created_on": "2025-12-09",
+        })
+    return chars
+
+
+def make_quests(rng, n, char_ids, item_ids, shop_ids):
+    """Quests form a forest: every 6th quest is a parent of the next five."""
+    quest_ids = ids("quest-", n)
+    quests = []
+    for i, quest_id in enumerate(quest_ids):
+        parent = quest_ids[i - i % 6] if i % 6 else None
+        subs = quest_ids[i + 1:i + 6] if i % 6 == 0 else []
+        quests.append({
+            "id": quest_id,
+            "name": title(rng, 4),
+            "type": "Main Quest" if subs else rng.choice(QUEST_TYPES),
+            "status": rng.choice(QUEST_STATUS),
+            "parent_quest": parent,
+            "description": " ".join(sentence(rng) for _ in range(3)),
+            "objectives": [
+                {"text": sentence(rng, 8), "status": rng.choice(OBJECTIVE_STATUS), "notes": sentence(rng, 6)}
+                for _ in range(rng.randint(2, 6))
+            ],
+            "related_characters": rng.sample(char_ids, min(len(char_ids), 3)),
+            "related_items": rng.sample(item_ids, min(len(item_ids), 2)),
+            "related_shops": rng.sample(shop_ids, min(len(shop_ids), 1)),
+            "sub_quests": subs,
+            "host": rng.choice(char_ids),
+            "current_holder": rng.choice(char_ids),
+            "core_item": rng.choice(item_ids),
+            "themes": rng.sample(WORDS, 3),
+            "tags": rng.sample(WORDS, 4),
+            "created_on": "2025-12-09",
+        })
+    return quests
+
+
+def generate(size, seed=0):
+    """Return ({collection: entries}, source_monsters) with `size` records each."""
+    rng = random.Random(seed)
+    item_ids = ids("item-", size)
+    shop_ids = ids("shop-", size)
+    char_ids = ids("char-", size)
+    quest_ids = ids("quest-", size)
+    monsters, sources = make_monsters(rng, size)
+    vault = {
+        "items": make_items(rng, size),
+        "monsters": monsters,
+        "shops": make_shops(rng, size, item_ids),
+        "characters": make_characters(rng, size, shop_ids, item_ids, quest_ids),
+        "quests": make_quests(rng, size, char_ids, item_ids, shop_ids),
+    }
+    return vault, sources
+
+
+def write_vault(directory, vault, sources, per_file=500):
+    """Write collections as `<name>.json` and sources as `monsters/monsters_NNN.json`."""
+    os.makedirs(os.path.join(directory, "monsters"), exist_ok=True)
+    for name, entries in vault.items():
+        with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2, ensure_ascii=False)
+    for n, start in enumerate(range(0, len(sources), per_file)):
+        path = os.path.join(directory, "monsters", f"monsters_{n:03d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"monsters": sources[start:start + per_file]}, f, indent=4, ensure_ascii=False)
@@ -0,0 +1,284 @@
+"""
+Combat Sim
+Monte Carlo encounter balancing: a party against a group of monsters, many
+fights at once, OSE-style.
+
+Each round both sides roll 1d6 group initiative (ties act simultaneously),
+every living combatant attacks a random living enemy, and monsters check
+morale (2d6 over ML flees) when their first member falls and when half are
+down. A fight ends in victory, rout, TPK or the round limit.
+
+Fights are run as a batch: hit points live in one `array` per combatant
+indexed by fight, and each attacker's outcomes for all fights it takes part
+in are drawn in one `random.choices` call from an exact table of "miss or N
+damage" against each target's armour class (built from the shared `dice`
+distributions), so no dice are rolled one at a time.
+"""
+
+import math
+import random
+import re
+from array import array
+from collections import Counter
+
+import dice
+from monster_stats import parse_hd, vault_row
+
+MAX_ROUNDS = 50
+DEFAULT_PC_AAC = 14
+DEFAULT_PC_DAMAGE = "1d8"
+
+# OSE fighter THAC0 by level band; used for PCs without a "thac0" field.
+PC_THAC0 = ((3, 19), (6, 17), (9, 14), (12, 12), (99, 10))
+
+ROUTINE_RE = re.compile(r"(\d+)\s*×\s*([^()]+?)\s*\(([^)]*)\)")
+
+
+# ---------- PARSING ----------
+
+def damage_distribution(text):
+    """Exact {damage: probability} for the first dice expression in text, or None."""
+    roller = dice.find(text)
+    if roller is None:
+        return None
+    # OSE: damage is never less than 1 on a hit
+    out = {}
+    for total, p in roller.distribution().items():
+        out[max(total, 1)] = out.get(max(total, 1), 0.0) + p
+    return out
+
+
+def parse_attacks(text):
+    """`"2 × claw (1d4) or 1 × bite (2d8)"` -> [[dist, dist], [dist]].
+
+    Each alternative routine is a list of per-swing damage distributions;
+    swings without a damage roll (e.g. `(paralysis)`) are dropped.
+    """
+    routines = []
+    for option in re.split(r"\s+or\s+", text or ""):
+        swings = []
+        for count, _name, inside in ROUTINE_RE.findall(option):
+            dist = damage_distribution(inside)
+            if dist:
+                swings.extend([dist] * int(count))
+        if swings:
+            routines.append(swings)
+    return routines
+
+
+def expected(dist):
+    return sum(d * p for d, p in dist.items())
+
+
+class Combatant:
+    """One fighter. `hp` is either a fixed number or a callable rolling it."""
+
+    def __init__(self, name, hp, aac, thac0, routine, morale=None):
+        self.name = name
+        self.hp = hp
+        self.aac = aac
+        self.thac0 = thac0
+        self.routine = routine
+        self.morale = morale
+
+    @classmethod
+    def from_monster(cls, monster, label=None, fixed_hp=False):
+        """Build from a vault monster, using its most damaging attack routine."""
+        row = vault_row(monster)
+        routines = parse_attacks(monster.get("attacks"))
+        routine = max(routines, key=lambda r: sum(map(expected, r)), default=[])
+        hd, mod, _ = parse_hd(monster.get("hd"))
+        if fixed_hp or math.isnan(hd):
+            hp = int(row["hp"]) if not math.isnan(row.get("hp", math.nan)) else 4
+        else:
+            hit_dice = dice.compile("1d4" if hd < 1 else f"{int(hd)}d8{int(mod):+d}")
+            hp = lambda rng: max(1, hit_dice.roll(rng))
+        return cls(
+            label or monster.get("name", "?"),
+            hp,
+            int(row.get("aac", 10)) if not math.isnan(row.get("aac", math.nan)) else 10,
+            int(row.get("thac0", 19)) if not math.isnan(row.get("thac0", math.nan)) else 19,
+            routine,
+            int(row["morale"]) if not math.isnan(row.get("morale", math.nan)) else 12,
+        )
+
+    @classmethod
+    def from_character(cls, char, aac=None, damage=None):
+        """Build a PC from a character entry, filling gaps with OSE defaults.
+
+        `aac` and `damage` only stand in when the sheet has no value of its own.
+        """
+        level = char.get("level") or 1
+        thac0 = char.get("thac0") or next(t for top, t in PC_THAC0 if level <= top)
+        dist = (damage_distribution(char.get("damage")) or damage_distribution(damage)
+                or damage_distribution(DEFAULT_PC_DAMAGE))
+        if char.get("aac") is not None:
+            aac = char["aac"]
+        return cls(
+            char.get("name", "?"),
+            char.get("current_hp") or char.get("max_hp") or 8,
+            DEFAULT_PC_AAC if aac is None else aac,
+            thac0,
+            [dist],
+        )
+
+
+# ---------- SIMULATION ----------
+
+def outcome_table(attacker, target_aac):
+    """(population, cum_weights) of total routine damage (0 = all misses)."""
+    need = attacker.thac0 - (19 - target_aac)
+    p_hit = min(max((21 - need) / 20, 0.05), 0.95)
+    total = {0: 1.0}
+    for swing in attacker.routine:
+        outcome = {0: 1 - p_hit}
+        for dmg, p in swing.items():
+            outcome[dmg] = outcome.get(dmg, 0.0) + p_hit * p
+        total = dice.convolve(total, outcome)
+    population = sorted(total)
+    cum, acc = [], 0.0
+    for dmg in population:
+        acc += total[dmg]
+        cum.append(acc)
+    return population, cum
+
+
+class Battle:
+    def __init__(self, party, monsters, fights, rng):
+        self.party = party
+        self.monsters = monsters
+        self.fights = fights
+        self.rng = rng
+        self.combatants = party + monsters
+        self.hp = []
+        for c in self.combatants:
+            if callable(c.hp):
+                self.hp.append(array("i", (c.hp(rng) for _ in range(fights))))
+            else:
+                self.hp.append(array("i", [c.hp]) * fights)
+        self.start_hp = [array("i", hp) for hp in self.hp]
+        self.tables = {}
+
+    def table(self, a, t):
+        key = (a, t)
+        if key not in self.tables:
+            self.tables[key] = outcome_table(self.combatants[a], self.combatants[t].aac)
+        return self.tables[key]
+
+    def attacks(self, side, enemies, fights):
+        """Damage dealt by `side` this phase: [(target, fight, damage)]."""
+        hp = self.hp
+        rng = self.rng
+        hits = []
+        for a in side:
+            if not self.combatants[a].routine:
+                continue
+            alive_a = hp[a]
+            by_target = {}
+            for f in fights:
+                if alive_a[f] <= 0:
+                    continue
+                living = [e for e in enemies if hp[e][f] > 0]
+                if living:
+                    by_target.setdefault(living[int(rng.random() * len(living))], []).append(f)
+            for t, fs in by_target.items():
+                population, cum = self.table(a, t)
+                for f, dmg in zip(fs, rng.choices(population, cum_weights=cum, k=len(fs))):
+                    if dmg:
+                        hits.append((t, f, dmg))
+        return hits
+
+    def apply(self, hits):
+        hp = self.hp
+        for t, f, dmg in hits:
+            hp[t][f] -= dmg
+
+    def run(self, max_rounds=MAX_ROUNDS):
+        rng = self.rng
+        party = list(range(len(self.party)))
+        monsters = list(range(len(self.party), len(self.combatants)))
+        hp = self.hp
+        result = ["timeout"] * self.fights
+        rounds = array("i", [max_rounds]) * self.fights
+        checked = [0] * self.fights  # morale checks taken (first loss, half down)
+        morale = min((self.combatants[m].morale or 12) for m in monsters) if monsters else 12
+        active = list(range(self.fights))
+
+        for rnd in range(1, max_rounds + 1):
+            party_first, monsters_first, tied = [], [], []
+            for f in active:
+                p, m = rng.randint(1, 6), rng.randint(1, 6)
+                (party_first if p > m else monsters_first if m > p else tied).append(f)
+
+            self.apply(self.attacks(party, monsters, party_first))
+            self.apply(self.attacks(monsters, party, party_first))
+            self.apply(self.attacks(monsters, party, monsters_first))
+            self.apply(self.attacks(party, monsters, monsters_first))
+            simultaneous = self.attacks(party, monsters, tied) + self.attacks(monsters, party, tied)
+            self.apply(simultaneous)
+
+            still = []
+            for f in active:
+                party_up = sum(1 for c in party if hp[c][f] > 0)
+                monsters_up = sum(1 for c in monsters if hp[c][f] > 0)
+                if not party_up:
+                    result[f], rounds[f] = "tpk", rnd
+                    continue
+                if not monsters_up:
+                    result[f], rounds[f] = "victory", rnd
+                    continue
+                down = len(monsters) - monsters_up
+                due = (down >= 1) + (down * 2 >= len(monsters))
+                if morale < 12 and checked[f] < due:
+                    checked[f] = due
+                    if rng.randint(1, 6) + rng.randint(1, 6) > morale:
+                        result[f], rounds[f] = "rout", rnd
+                        continue
+                still.append(f)
+            active = still
+            if not active:
+                break
+        return result, rounds
+
+
+def simulate(party, monsters, fights=10000, seed=None, max_rounds=MAX_ROUNDS):
+    """Run `fights` battles and summarise them.
+
+    Returns outcome probabilities, expected rounds, each PC's chance of going
+    down and the distribution of total party hp lost.
+    """
+    rng = random.Random(seed)
+    battle = Battle(party, monsters, fights, rng)
+    result, rounds = battle.run(max_rounds)
+    outcomes = Counter(result)
+
+    loss = []
+    for f in range(fights):
+        lost = 0
+        for c in range(len(party)):
+            lost += battle.start_hp[c][f] - max(battle.hp[c][f], 0)
+        loss.append(lost)
+    loss.sort()
+
+    def pct(q):
+        return loss[min(len(loss) - 1, int(q * len(loss)))] if loss else 0
+
+    return {
+        "fights": fights,
+        "victory": outcomes["victory"] / fights,
+        "rout": outcomes["rout"] / fights,
+        "tpk": outcomes["tpk"] / fights,
+        "timeout": outcomes["timeout"] / fights,
+        "expected_rounds": sum(rounds) / fights,
+        "pc_down": {
+            pc.name: sum(1 for f in range(fights) if battle.hp[c][f] <= 0) / fights
+            for c, pc in enumerate(party)
+        },
+        "hp_loss": {
+            "mean": sum(loss) / fights,
+            "p10": pct(0.10),
+            "p50": pct(0.50),
+            "p90": pct(0.90),
+            "max": loss[-1] if loss else 0,
+        },
+    }
@@ -82,6 +82,7 @@ export function renderDashboard() {
                                         <div class="quest-tags">
                                             ${quest.quest_type ? `<span class="chip chip-primary">${quest.quest_type}</span>` : ''}
                                             ${quest.status ? `<span class="chip">${quest.status}</span>` : ''}
+                                            ${quest.progress ? `<span class="chip" title="Objectives done, sub-quests included">${quest.progress.tree[0]}/${quest.progress.tree[1]} · ${quest.progress.tree_percent}%</span>` : ''}
                                         </div>
                                     </div>
                                 </div>
@@ -64,7 +64,10 @@ export function renderEncounterView() {
                 <div class="card encounter-panel">
                     <div class="card-header">
                         <h2 class="card-title">💀 Monsters</h2>
-                        <button class="btn btn-sm btn-ghost" id="add-monster-btn">+ Add</button>
+                        <div style="display: flex; gap: var(--space-2);">
+                            <button class="btn btn-sm btn-ghost" id="random-encounter-btn" title="Roll on the encounter table (needs vault_server.py)">🎲 Random</button>
+                            <button class="btn btn-sm btn-ghost" id="add-monster-btn">+ Add</button>
+                        </div>
                     </div>
                     <div class="card-body" id="monsters-panel">
                         ${renderMonstersPanel()}
@@ -317,6 +320,9 @@ function attachEventHandlers() {
         document.getElementById('monster-search').focus();
     });
 
+    // Random encounter from the server's encounter tables
+    document.getElementById('random-encounter-btn')?.addEventListener('click', rollRandomEncounter);
+
     // Monster modal close
     document.querySelector('.modal-close')?.addEventListener('click', () => {
         document.getElementById('monster-modal').classList.add('hidden');
@@ -466,6 +472,39 @@ function addMonster(monsterId, count) {
     saveEncounter();
 }
 
+async function rollRandomEncounter() {
+    // Party level sets the HD band; the encounter's location picks the biome
+    const levels = encounter.party
+        .map(p => dataLoader.getCharacterById(p.character_id)?.level)
+        .filter(Boolean);
+    const params = new URLSearchParams({ days: 1, force: 1 });
+    if (levels.length) {
+        params.set('level', Math.round(levels.reduce((a, b) => a + b, 0) / levels.length));
+    }
+    if (encounter.location) {
+        params.set('biome', encounter.location);
+    }
+
+    let result;
+    try {
+        const response = await fetch(`/api/encounters?${params}`);
+        if (!response.ok) throw new Error(response.statusText);
+        result = await response.json();
+    } catch (e) {
+        alert('Random encounters need the local API server (python vault_server.py).');
+        return;
+    }
+
+    const rolled = result.days[0]?.encounters || [];
+    if (rolled.length === 0) {
+        alert(`Nothing on the table for ${result.table}.`);
+        return;
+    }
+    rolled.forEach(e => addMonster(e.monster_id, e.count));
+    addToLog(`Random encounter (${result.table})`);
+    saveEncounter();
+}
+
 function adjustHP(dataset, delta) {
     if (dataset.type === 'pc') {
         const pc = encounter.party.find(p => p.character_id === dataset.id);
@@ -499,9 +499,11 @@ function getDispositionColor(disposition) {
 }
 
 function calculateQuestProgress(quest) {
-    if (quest.status === 'Completed') return 1;
+    if (quest.status === 'Complete' || quest.status === 'Completed') return 1;
+    // Rollup baked into quests.json by quest_progress.py (sub-quests included)
+    if (quest.progress) return quest.progress.tree_percent / 100;
     if (quest.objectives && quest.objectives.length > 0) {
-        const completed = quest.objectives.filter(o => o.completed).length;
+        const completed = quest.objectives.filter(o => o.status === 'complete' || o.completed).length;
         return completed / quest.objectives.length;
     }
     if (quest.status === 'In Progress') return 0.5;
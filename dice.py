@@ -0,0 +1,259 @@
+"""
+Dice
+Dice notation compiled once into reusable roller objects.
+
+    2d6            4d6kh3 / 4d6k3     keep highest 3     (kl: keep lowest)
+    1d6+2          4d6dl1             drop lowest 1      (dh: drop highest)
+    d%             1d4x100 / 1d4×100  multiples
+    3d6-1d4+2      terms add and subtract
+
+`compile(expr)` is memoized, so every consumer asking for "1d6" shares one
+object and its exact distribution (built by convolution, also cached).
+Batch rolls sample that distribution with one `random.choices` call, unless
+building it would cost more than rolling every die (`60d100` once, or a keep
+too large to enumerate), in which case each term is rolled directly.
+"""
+
+import functools
+import math
+import random
+import re
+from itertools import combinations_with_replacement
+
+TERM_RE = re.compile(
+    r"([+-])?\s*(?:(\d*)d(\d+|%)(?:(kh|kl|dh|dl|k)(\d+))?|(\d+))\s*(?:[x×*]\s*(\d+))?",
+    re.IGNORECASE,
+)
+# A dice expression somewhere inside free text, e.g. "bite (2d6) + poison".
+FIND_RE = re.compile(r"\d*d(?:\d+|%)(?:(?:kh|kl|dh|dl|k)\d+)?(?:\s*[x×*]\s*\d+)?(?:\s*[+-]\s*\d+(?!\s*d))*", re.IGNORECASE)
+
+# Largest multiset enumeration allowed for an exact keep/drop distribution.
+MAX_KEEP_OUTCOMES = 200000
+# Rolling one die costs roughly this many convolution steps.
+ROLL_COST = 10
+
+
+class DiceError(ValueError):
+    pass
+
+
+# ---------- DISTRIBUTIONS ----------
+
+def convolve(a, b):
+    out = {}
+    for x, px in a.items():
+        for y, py in b.items():
+            out[x + y] = out.get(x + y, 0.0) + px * py
+    return out
+
+
+def scale(dist, factor):
+    return {value * factor: p for value, p in dist.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def sum_distribution(n, sides):
+    """Exact distribution of the sum of n dice with `sides` faces."""
+    die = {face: 1 / sides for face in range(1, sides + 1)}
+    dist = {0: 1.0}
+    for _ in range(n):
+        dist = convolve(dist, die)
+    return dist
+
+
+@functools.lru_cache(maxsize=None)
+def keep_distribution(n, sides, keep, highest):
+    """Exact distribution of the `keep` highest (or lowest) of n dice."""
+    if math.comb(n + sides - 1, n) > MAX_KEEP_OUTCOMES:
+        raise DiceError(f"{n}d{sides} keep {keep} is too large to enumerate")
+    dist = {}
+    total = sides ** n
+    for faces in combinations_with_replacement(range(1, sides + 1), n):
+        # faces is sorted; count the orderings of this multiset
+        ways = math.factorial(n)
+        for face in set(faces):
+            ways //= math.factorial(faces.count(face))
+        kept = sum(faces[-keep:] if highest else faces[:keep]) if keep else 0
+        dist[kept] = dist.get(kept, 0.0) + ways / total
+    return dist
+
+
+# ---------- TERMS ----------
+
+class Term:
+    """One signed `NdM` (with keep/drop and multiplier) or constant."""
+
+    def __init__(self, sign, count, sides, keep, highest, constant, multiplier):
+        self.sign = sign
+        self.count = count
+        self.sides = sides
+        self.keep = keep
+        self.highest = highest
+        self.constant = constant
+        self.multiplier = multiplier
+
+    def roll(self, rng):
+        if self.sides is None:
+            value = self.constant
+        else:
+            faces = [rng.randint(1, self.sides) for _ in range(self.count)]
+            if self.keep < self.count:
+                faces.sort(reverse=self.highest)
+                faces = faces[:self.keep]
+            value = sum(faces)
+        return self.sign * value * self.multiplier
+
+    def distribution(self):
+        if self.sides is None:
+            dist = {self.constant: 1.0}
+        elif self.keep < self.count:
+            dist = keep_distribution(self.count, self.sides, self.keep, self.highest)
+        else:
+            dist = sum_distribution(self.count, self.sides)
+        return scale(dist, self.sign * self.multiplier)
+
+
+def parse_term(match):
+    sign_s, count_s, sides_s, mode, amount_s, constant_s, mult_s = match.groups()
+    sign = -1 if sign_s == "-" else 1
+    multiplier = int(mult_s) if mult_s else 1
+    if constant_s is not None:
+        return Term(sign, 0, None, 0, True, int(constant_s), multiplier)
+    count = int(count_s) if count_s else 1
+    sides = 100 if sides_s == "%" else int(sides_s)
+    if count < 1 or sides < 1:
+        raise DiceError(f"Bad dice term {match.group().strip()!r}")
+    keep, highest = count, True
+    if mode:
+        amount = int(amount_s)
+        mode = mode.lower()
+        if mode in ("k", "kh"):
+            keep = amount
+        elif mode == "kl":
+            keep, highest = amount, False
+        elif mode == "dl":
+            keep = count - amount
+        elif mode == "dh":
+            keep, highest = count - amount, False
+        if not 0 <= keep <= count:
+            raise DiceError(f"Can't keep {keep} of {count} dice")
+    return Term(sign, count, sides, keep, highest, 0, multiplier)
+
+
+# ---------- EXPRESSIONS ----------
+
+class Dice:
+    """A compiled dice expression. Use `compile()` rather than building directly."""
+
+    def __init__(self, expr, terms):
+        self.expr = expr
+        self.terms = terms
+        self._dist = None
+        self._table = None
+
+    def __repr__(self):
+        return f"Dice({self.expr!r})"
+
+    def roll(self, rng=None):
+        rng = rng or random
+        return sum(term.roll(rng) for term in self.terms)
+
+    def distribution(self):
+        """Exact {total: probability}, computed once per expression."""
+        if self._dist is None:
+            dist = {0: 1.0}
+            for term in self.terms:
+                dist = convolve(dist, term.distribution())
+            self._dist = dict(sorted(dist.items()))
+        return self._dist
+
+    def exact_cost(self):
+        """Rough number of steps needed to build the exact distribution (inf if it can't be)."""
+        cost, width = 0, 1
+        for term in self.terms:
+            if term.sides is None:
+                continue
+            if term.keep < term.count:
+                outcomes = math.comb(term.count + term.sides - 1, term.count)
+                if outcomes > MAX_KEEP_OUTCOMES:
+                    return math.inf
+                cost += outcomes * term.count
+            else:
+                cost += term.count ** 2 * term.sides ** 2
+            span = term.keep * term.sides
+            cost += width * span
+            width += span
+        return cost
+
+    def roll_many(self, n, rng=None, seed=None):
+        """n independent rolls, sampled from the exact distribution in one call.
+
+        When that distribution isn't built yet and would cost more than the
+        rolls themselves, the terms are rolled directly instead.
+        """
+        rng = rng or random.Random(seed)
+        if self._table is None:
+            dice_per_roll = sum(term.count for term in self.terms) or 1
+            if self.exact_cost() > n * dice_per_roll * ROLL_COST:
+                return [self.roll(rng) for _ in range(n)]
+            dist = self.distribution()
+            cum, acc = [], 0.0
+            for p in dist.values():
+                acc += p
+                cum.append(acc)
+            self._table = (list(dist), cum)
+        values, cum = self._table
+        return rng.choices(values, cum_weights=cum, k=n)
+
+    @property
+    def minimum(self):
+        return next(iter(self.distribution()))
+
+    @property
+    def maximum(self):
+        return next(reversed(self.distribution()))
+
+    @property
+    def mean(self):
+        return sum(v * p for v, p in self.distribution().items())
+
+    def chance(self, at_least):
+        """P(total >= at_least)."""
+        return sum(p for v, p in self.distribution().items() if v >= at_least)
+
+
+@functools.lru_cache(maxsize=None)
+def compile(expr):
+    """Compile a dice expression; the same string always returns the same object."""
+    text = expr.strip()
+    terms, pos = [], 0
+    while pos < len(text):
+        if text[pos].isspace():
+            pos += 1
+            continue
+        match = TERM_RE.match(text, pos)
+        if not match or match.end() == pos or (terms and not match.group(1)):
+            raise DiceError(f"Can't parse dice expression {expr!r}")
+        terms.append(parse_term(match))
+        pos = match.end()
+    if not terms:
+        raise DiceError(f"Empty dice expression {expr!r}")
+    return Dice(text, terms)
+
+
+def find(text):
+    """Compile the first dice expression in free text (`"bite (2d6) + poison"`), or None."""
+    match = FIND_RE.search(text or "")
+    return compile(match.group()) if match else None
+
+
+def roll(expr, rng=None):
+    return compile(expr).roll(rng)
+
+
+def number_appearing(text):
+    """`"1d6 (2d6)"` -> (wandering, lair) Dice; a bare number is a constant."""
+    wandering, _, lair = str(text or "").partition("(")
+    wandering = wandering.strip() or "1"
+    lair = lair.rstrip(") ").strip() or wandering
+    return compile(wandering), compile(lair)
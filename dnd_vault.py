@@ -1,27 +1,83 @@
+import argparse
+import datetime
 import json
 import os
-import datetime
+import sqlite3
+import sys
 import textwrap
 
+import combat_sim
+import dice
+import dolmenwood_calendar
+import encounter_tables
+from link_graph import LinkGraph
+from monster_stats import stats_view
+import quest_progress
+from search_index import SearchEngine
+import shop_prices
+import treasure
+import vault_io
+import vault_schema
+from vault_ids import IdAllocator
+from vault_metrics import METRICS
+from vault_query import QueryEngine, QueryError
+from vault_render import FORMATS, Renderer, monster_stat_line
+from vault_sqlite import SqliteStore
+from vault_store import VaultStore
+
 ITEMS_PATH = "items.json"
 MONSTERS_PATH = "monsters.json"
 SHOPS_PATH = "shops.json"
 CHARACTERS_PATH = "characters.json"
 QUESTS_PATH = "quests.json"
 
+COLLECTION_PATHS = {
+    "items": ITEMS_PATH,
+    "monsters": MONSTERS_PATH,
+    "shops": SHOPS_PATH,
+    "characters": CHARACTERS_PATH,
+    "quests": QUESTS_PATH,
+}
+
+ID_PREFIXES = {
+    "items": "item-",
+    "monsters": "monster-",
+    "shops": "shop-",
+    "characters": "char-",
+    "quests": "quest-",
+}
+
+# Storage backend: the JSON files by default, or a SQLite database if VAULT_DB is set.
+VAULT_DB = os.environ.get("VAULT_DB")
+
+# Shared cache of parsed collections; reloads a file only when it changes.
+STORE = SqliteStore(VAULT_DB) if VAULT_DB else VaultStore()
+SEARCH = STORE if VAULT_DB else SearchEngine(STORE)
+IDS = IdAllocator(STORE)
+LINKS = LinkGraph(STORE, COLLECTION_PATHS)
+RENDER = Renderer(resolve=LINKS.entity)
+QUERIES = QueryEngine(STORE, COLLECTION_PATHS, ID_PREFIXES, LINKS)
+
 
 # ---------- DB LAYER ----------
 
 def load_list(path):
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return STORE.load(path)
 
 
 def save_list(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    if path == QUESTS_PATH:
+        quest_progress.refresh(data)
+    STORE.save(path, data)
+
+
+def append_entry(path, entry):
+    """Add or update a single entry without rewriting the whole file."""
+    if path == QUESTS_PATH:
+        # Also rewrites any ancestor quests whose progress rollups moved.
+        quest_progress.record(STORE, path, entry)
+        return
+    STORE.append(path, entry)
 
 
 def load_items():
@@ -64,44 +120,24 @@ def save_quests(quests):
     save_list(QUESTS_PATH, quests)
 
 
-def next_id(entries, prefix):
-    if not entries:
-        return f"{prefix}0001"
-    nums = []
-    for entry in entries:
-        try:
-            nums.append(int(entry["id"].split("-")[1]))
-        except Exception:
-            continue
-    n = max(nums) + 1 if nums else 1
-    return f"{prefix}{n:04d}"
+def next_id(path, prefix):
+    """Allocate the next ID for a collection (O(1), safe across processes)."""
+    return IDS.allocate(path, prefix)[0]
 
 
 def get_item_by_id(item_id):
     """Look up an item by its ID."""
-    items = load_items()
-    for item in items:
-        if item.get("id") == item_id:
-            return item
-    return None
+    return STORE.get(ITEMS_PATH, item_id)
 
 
 def get_character_by_shop(shop_id):
     """Find the character who owns a shop."""
-    characters = load_characters()
-    for char in characters:
-        if char.get("shop_id") == shop_id:
-            return char
-    return None
+    return STORE.find(CHARACTERS_PATH, "shop_id", shop_id)
 
 
 def get_shop_by_id(shop_id):
     """Look up a shop by its ID."""
-    shops = load_shops()
-    for shop in shops:
-        if shop.get("id") == shop_id:
-            return shop
-    return None
+    return STORE.get(SHOPS_PATH, shop_id)
 
 
 # ---------- HELPERS ----------
@@ -144,17 +180,8 @@ def add_item():
     tags_raw = input("Tags (comma separated): ").strip()
     tags = [t.strip() for t in tags_raw.split(",") if t.strip()]
 
-    paste_block = f"""**{name}**
-
-*Description*:
-{description}
-
-*Effect*:
-{rules}
-"""
-    items = load_items()
     entry = {
-        "id": next_id(items, "item-"),
+        "id": next_id(ITEMS_PATH, "item-"),
         "name": name,
         "category": category,
         "rarity": rarity,
@@ -163,11 +190,11 @@ def add_item():
         "created_on": today_str(),
         "source": "ChatGPT",
         "tags": tags,
-        "paste_block": paste_block.strip()
+        "paste_block": ""
     }
+    RENDER.bake("items", entry)
 
-    items.append(entry)
-    save_items(items)
+    append_entry(ITEMS_PATH, entry)
     print("\nSaved item with ID:", entry["id"])
     print("\nPaste block preview:\n")
     print(entry["paste_block"])
@@ -209,22 +236,8 @@ def add_monster():
     tags_raw = input("Tags (comma separated): ").strip()
     tags = [t.strip() for t in tags_raw.split(",") if t.strip()]
 
-    # Build stat line
-    stat_line = f"AC {ac}, HD {hd} ({hp}hp), Att {att}, THAC0 {thac0}, MV {mv}, SV {sv}, ML {ml}, AL {al}, XP {xp}, NA {na}, TT {tt}"
-    
-    # Build paste block
-    paste_block = f"""**{name}**
-
-{description}
-
-{stat_line}
-
-{special_abilities}
-"""
-
-    monsters = load_monsters()
     entry = {
-        "id": next_id(monsters, "monster-"),
+        "id": next_id(MONSTERS_PATH, "monster-"),
         "name": name,
         "description": description,
         "ac": ac,
@@ -240,15 +253,16 @@ def add_monster():
         "number_appearing": na,
         "treasure_type": tt,
         "special_abilities": special_abilities,
-        "stat_line": stat_line,
+        "stat_line": "",
         "created_on": today_str(),
         "source": "ChatGPT",
         "tags": tags,
-        "paste_block": paste_block.strip()
+        "paste_block": ""
     }
+    entry["stat_line"] = monster_stat_line(entry)
+    RENDER.bake("monsters", entry)
 
-    monsters.append(entry)
-    save_monsters(monsters)
+    append_entry(MONSTERS_PATH, entry)
     print("\nSaved monster with ID:", entry["id"])
     print("\nPaste block preview:\n")
     print(entry["paste_block"])
@@ -269,9 +283,8 @@ def add_shop():
     tags_raw = input("Tags (comma separated): ").strip()
     tags = [t.strip() for t in tags_raw.split(",") if t.strip()]
 
-    shops = load_shops()
     entry = {
-        "id": next_id(shops, "shop-"),
+        "id": next_id(SHOPS_PATH, "shop-"),
         "name": name,
         "owner": owner,
         "location": location,
@@ -286,30 +299,25 @@ def add_shop():
         "created_on": today_str()
     }
 
-    shops.append(entry)
-    save_shops(shops)
+    append_entry(SHOPS_PATH, entry)
     print("\nSaved shop with ID:", entry["id"])
     print(f"\nYou can now edit {SHOPS_PATH} to add inventory items.")
 
 
 # ---------- SEARCH / VIEW ----------
 
-def search_entries(entries, term):
-    term = term.lower()
-    results = []
-    for e in entries:
-        haystack = " ".join([
-            e.get("name", ""),
-            e.get("description", ""),
-            e.get("rules", ""),
-            e.get("stat_block", ""),
-            e.get("owner", ""),
-            e.get("location", ""),
-            e.get("notes", ""),
-            " ".join(e.get("tags", [])),
-        ]).lower()
-        if term in haystack:
-            results.append(e)
+def search_entries(path, term):
+    """Search a collection through the shared inverted index, best match first."""
+    return SEARCH.search(path, term)
+
+
+def search_with_suggestion(path, term):
+    """Search, falling back to typo-tolerant name/tag matching when nothing matches."""
+    results = search_entries(path, term)
+    if not results:
+        suggestion, results = SEARCH.fuzzy(path, term)
+        if suggestion:
+            print(f'No exact matches. Did you mean "{suggestion}"?')
     return results
 
 
@@ -347,8 +355,7 @@ def search_items():
         print("Cancelled.")
         return
 
-    items = load_items()
-    results = search_entries(items, term)
+    results = search_with_suggestion(ITEMS_PATH, term)
     entry = choose_from_results(results)
     if not entry:
         return
@@ -360,7 +367,7 @@ def search_items():
     print("Created:", entry.get("created_on", ""))
     print("Tags:", ", ".join(entry.get("tags", [])))
     print("\nPaste block:\n")
-    print(entry["paste_block"])
+    print(RENDER.paste_block("items", entry))
     print("\n(Select this text in your terminal and copy it into ChatGPT.)")
 
 
@@ -371,8 +378,7 @@ def search_monsters():
         print("Cancelled.")
         return
 
-    monsters = load_monsters()
-    results = search_entries(monsters, term)
+    results = search_with_suggestion(MONSTERS_PATH, term)
     entry = choose_from_results(results)
     if not entry:
         return
@@ -408,7 +414,7 @@ def search_monsters():
     
     print("\nTags:", ", ".join(entry.get("tags", [])))
     print("\n--- PASTE BLOCK ---\n")
-    print(entry["paste_block"])
+    print(RENDER.paste_block("monsters", entry))
     print("\n(Select this text in your terminal and copy it into ChatGPT.)")
 
 
@@ -519,8 +525,7 @@ def search_shops():
         print("Cancelled.")
         return
 
-    shops = load_shops()
-    results = search_entries(shops, term)
+    results = search_with_suggestion(SHOPS_PATH, term)
     entry = choose_from_results(results, show_type="shop")
     if not entry:
         return
@@ -621,22 +626,7 @@ def search_characters():
         print("Cancelled.")
         return
 
-    characters = load_characters()
-    # Add race_class to search
-    results = []
-    term_lower = term.lower()
-    for c in characters:
-        haystack = " ".join([
-            c.get("name", ""),
-            c.get("type", ""),
-            c.get("race_class", ""),
-            c.get("appearance", ""),
-            c.get("personality", ""),
-            c.get("special_notes", ""),
-            " ".join(c.get("tags", [])),
-        ]).lower()
-        if term_lower in haystack:
-            results.append(c)
+    results = search_with_suggestion(CHARACTERS_PATH, term)
     
     if not results:
         print("No results.")
@@ -679,9 +669,8 @@ def add_character():
     shop_id_input = input("Shop ID (if they own a shop, or leave blank): ").strip()
     shop_id = shop_id_input if shop_id_input else None
 
-    characters = load_characters()
     entry = {
-        "id": next_id(characters, "char-"),
+        "id": next_id(CHARACTERS_PATH, "char-"),
         "name": name,
         "type": char_type,
         "race_class": race_class,
@@ -696,8 +685,7 @@ def add_character():
         "created_on": today_str()
     }
 
-    characters.append(entry)
-    save_characters(characters)
+    append_entry(CHARACTERS_PATH, entry)
     print("\nSaved character with ID:", entry["id"])
 
 
@@ -705,20 +693,12 @@ def add_character():
 
 def get_quest_by_id(quest_id):
     """Look up a quest by its ID."""
-    quests = load_quests()
-    for quest in quests:
-        if quest.get("id") == quest_id:
-            return quest
-    return None
+    return STORE.get(QUESTS_PATH, quest_id)
 
 
 def get_character_by_id(char_id):
     """Look up a character by its ID."""
-    characters = load_characters()
-    for char in characters:
-        if char.get("id") == char_id:
-            return char
-    return None
+    return STORE.get(CHARACTERS_PATH, char_id)
 
 
 def display_quest(quest):
@@ -824,18 +804,21 @@ def display_quest(quest):
         if core_item:
             print(f"\n✨ Core Item: {core_item['name']}")
     
-    # Show sub-quests
+    # Show sub-quests (the whole tree, nested)
     sub_quests = quest.get('sub_quests', [])
     if sub_quests:
         print("\n--- SUB-QUESTS ---")
-        for sq_id in sub_quests:
-            sq = get_quest_by_id(sq_id)
+        for depth, sq_id in LINKS.walk_tree(quest['id']):
+            if depth == 0:
+                continue
+            indent = "  " * depth
+            sq = LINKS.entity(sq_id)
             if sq:
                 sq_status = sq.get('status', '?')
                 sq_icon = status_icons.get(sq_status, "❓")
-                print(f"  {sq_icon} {sq['name']}")
+                print(f"{indent}{sq_icon} {sq['name']}")
             else:
-                print(f"  • {sq_id}")
+                print(f"{indent}• {sq_id}")
     
     # Show stakes
     stakes = quest.get('stakes')
@@ -909,21 +892,7 @@ def search_quests():
         print("Cancelled.")
         return
 
-    quests = load_quests()
-    results = []
-    term_lower = term.lower()
-    for q in quests:
-        haystack = " ".join([
-            q.get("name", ""),
-            q.get("type", ""),
-            q.get("description", ""),
-            q.get("emotion", ""),
-            q.get("biome", ""),
-            " ".join(q.get("themes", [])),
-            " ".join(q.get("tags", [])),
-        ]).lower()
-        if term_lower in haystack:
-            results.append(q)
+    results = search_with_suggestion(QUESTS_PATH, term)
     
     if not results:
         print("No results.")
@@ -959,38 +928,61 @@ def quest_overview():
         print("No quests in the vault yet.")
         return
     
-    # Count by status
-    complete = sum(1 for q in quests if q.get('status') == 'Complete')
-    in_progress = sum(1 for q in quests if q.get('status') == 'In Progress')
-    not_started = sum(1 for q in quests if q.get('status') == 'Not Started')
+    # One pass: status counts and the lookups below read the baked rollups.
+    by_id = {}
+    counts = dict.fromkeys(quest_progress.STATUSES, 0)
+    main_quest = None
+    for q in quests:
+        by_id[q.get('id')] = q
+        counts[q.get('status')] = counts.get(q.get('status'), 0) + 1
+        if main_quest is None and q.get('type') == 'Main Quest':
+            main_quest = q
     
-    print(f"✅ Complete: {complete}")
-    print(f"🔶 In Progress: {in_progress}")
-    print(f"⬜ Not Started: {not_started}")
+    print(f"✅ Complete: {counts['Complete']}")
+    print(f"🔶 In Progress: {counts['In Progress']}")
+    print(f"⬜ Not Started: {counts['Not Started']}")
     
     # Show main quest progress
-    main_quest = next((q for q in quests if q.get('type') == 'Main Quest'), None)
     if main_quest:
+        progress = main_quest.get('progress') or quest_progress.rollup(main_quest, [])
+        done, total = progress['objectives']
+        tree_done, tree_total = progress['tree']
         print(f"\n--- MAIN QUEST ---")
         print(f"{main_quest['name']}")
-        objectives = main_quest.get('objectives', [])
-        done = sum(1 for o in objectives if o.get('status') == 'complete')
-        print(f"Progress: {done}/{len(objectives)} objectives")
+        print(f"Progress: {done}/{total} objectives ({progress['percent']}%)")
+        print(f"With sub-quests: {tree_done}/{tree_total} ({progress['tree_percent']}%)")
         
         # Show core status
         print("\n--- CORES ---")
+        status_icons = {"Complete": "✅", "In Progress": "🔶", "Not Started": "⬜"}
         for sq_id in main_quest.get('sub_quests', []):
-            sq = get_quest_by_id(sq_id)
+            sq = by_id.get(sq_id)
             if sq and sq.get('type') == 'Core Quest':
                 emotion = sq.get('emotion', '?')
-                status = sq.get('status', '?')
-                status_icons = {"Complete": "✅", "In Progress": "🔶", "Not Started": "⬜"}
-                icon = status_icons.get(status, "❓")
-                print(f"  {icon} {emotion}: {sq['name']}")
+                icon = status_icons.get(sq.get('status', '?'), "❓")
+                sq_done, sq_total = (sq.get('progress') or quest_progress.rollup(sq, []))['objectives']
+                print(f"  {icon} {emotion}: {sq['name']} ({sq_done}/{sq_total})")
 
 
 # ---------- MAIN MENU ----------
 
+MENU_ACTIONS = {
+    "1": add_item,
+    "2": add_monster,
+    "3": search_items,
+    "4": search_monsters,
+    "5": browse_shops,
+    "6": search_shops,
+    "7": add_shop,
+    "8": browse_characters,
+    "9": search_characters,
+    "10": add_character,
+    "11": quest_overview,
+    "12": browse_quests,
+    "13": search_quests,
+}
+
+
 def main_menu():
     while True:
         print_banner("D&D Vault")
@@ -1018,38 +1010,613 @@ def main_menu():
         print("0) Quit")
 
         choice = input("\nChoose an option: ").strip()
-        if choice == "1":
-            add_item()
-        elif choice == "2":
-            add_monster()
-        elif choice == "3":
-            search_items()
-        elif choice == "4":
-            search_monsters()
-        elif choice == "5":
-            browse_shops()
-        elif choice == "6":
-            search_shops()
-        elif choice == "7":
-            add_shop()
-        elif choice == "8":
-            browse_characters()
-        elif choice == "9":
-            search_characters()
-        elif choice == "10":
-            add_character()
-        elif choice == "11":
-            quest_overview()
-        elif choice == "12":
-            browse_quests()
-        elif choice == "13":
-            search_quests()
-        elif choice == "0":
+        if choice == "0":
+            STORE.compact_all()
             print("Bye.")
             break
+        action = MENU_ACTIONS.get(choice)
+        if action:
+            with METRICS.action(action.__name__):
+                action()
         else:
             print("Invalid choice.")
 
 
+# ---------- COMMAND LINE ----------
+
+def cmd_export(args):
+    fmt = args.format or vault_io.guess_format(args.output)
+    entries = load_list(COLLECTION_PATHS[args.collection])
+    out = vault_io.open_output(args.output)
+    try:
+        count = vault_io.export_records(entries, out, fmt, vault_schema.text_fields(args.collection))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Exported {count} {args.collection}.", file=sys.stderr)
+
+
+def cmd_import(args):
+    fmt = args.format or vault_io.guess_format(args.input)
+    stream = vault_io.open_input(args.input)
+    try:
+        added, updated, errors = vault_io.import_records(
+            STORE, IDS,
+            COLLECTION_PATHS[args.collection], ID_PREFIXES[args.collection],
+            stream, fmt, today=today_str(),
+            check=vault_schema.record_checker(args.collection),
+            text_fields=vault_schema.text_fields(args.collection),
+            save=save_list,
+        )
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if errors:
+        for lineno, message in errors:
+            print(f"line {lineno}: {message}", file=sys.stderr)
+        print(f"Import aborted: {len(errors)} problem(s), nothing written.", file=sys.stderr)
+        return 1
+    print(f"Imported {args.collection}: {added} added, {updated} updated.")
+
+
+def cmd_validate(args):
+    names = [args.collection] if args.collection else list(COLLECTION_PATHS)
+    problems = 0
+    for name in names:
+        errors = vault_schema.validate_collection(name, load_list(COLLECTION_PATHS[name]), name)
+        for path, message in errors:
+            print(f"{path}: {message}")
+        problems += len(errors)
+
+    if not args.collection:
+        for source, field, target in LINKS.dangling():
+            print(f"{source}.{field}: unknown id {target}")
+            problems += 1
+
+    if args.sources:
+        for filename in sorted(os.listdir(args.sources)):
+            if not filename.endswith(".json"):
+                continue
+            filepath = os.path.join(args.sources, filename)
+            with open(filepath, "r", encoding="utf-8") as f:
+                errors = vault_schema.validate_source_file(json.load(f), filename)
+            for path, message in errors:
+                print(f"{path}: {message}")
+            problems += len(errors)
+
+    if problems:
+        print(f"\n{problems} problem(s) found.")
+        return 1
+    print("Vault is valid.")
+
+
+def stat_range(text):
+    """`"3..5"` -> (3, 5), `"15.."` -> (15, None), `"4"` -> (4, 4)."""
+    low, sep, high = text.partition("..")
+    try:
+        low = float(low) if low else None
+        high = (float(high) if high else None) if sep else low
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N, LOW..HIGH, LOW.. or ..HIGH, got {text!r}")
+    return (low, high)
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def probability(text):
+    """argparse type for a chance between 0 and 1."""
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, got {text!r}")
+    if not 0 <= value <= 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1, got {value:g}")
+    return value
+
+
+def monster_count(text):
+    """argparse type for `ID[:COUNT]` -> (id, count)."""
+    monster_id, sep, count = text.partition(":")
+    if not sep:
+        return monster_id, 1
+    try:
+        return monster_id, positive_int(count)
+    except argparse.ArgumentTypeError as e:
+        raise argparse.ArgumentTypeError(f"bad count in {text!r}: {e}")
+
+
+def shopping_line(text):
+    """argparse type for `ITEM[:QTY]` -> (item, quantity).
+
+    A colon followed by text with spaces is part of the name ("Scroll: Light").
+    """
+    name, sep, quantity = text.rpartition(":")
+    if not sep or not quantity or quantity != quantity.strip() or " " in quantity:
+        return text, 1
+    try:
+        return name, positive_int(quantity)
+    except argparse.ArgumentTypeError as e:
+        raise argparse.ArgumentTypeError(f"bad quantity in {text!r}: {e}")
+
+
+def dice_expr(text):
+    """argparse type for a dice expression such as `1d8+1`."""
+    try:
+        dice.compile(text)
+    except dice.DiceError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    if dice.find(text) is None:
+        raise argparse.ArgumentTypeError(f"expected dice such as 1d8+1, got {text!r}")
+    return text
+
+
+MONSTER_FILTERS = ("hd", "ac", "aac", "hp", "thac0", "morale", "xp", "mv", "fly", "swim")
+
+
+def cmd_monsters(args):
+    criteria = {f: getattr(args, f) for f in MONSTER_FILTERS if getattr(args, f) is not None}
+    if args.alignment:
+        criteria["alignment"] = args.alignment
+    if args.treasure:
+        criteria["treasure_type"] = args.treasure
+    matches = stats_view(STORE, MONSTERS_PATH).select(**criteria)
+    for m in matches:
+        print(f"{m['id']}  {m['name']:<28} AC {m.get('ac', '?'):<8} HD {m.get('hd', '?'):<6} "
+              f"ML {m.get('morale', '?'):<3} AL {m.get('alignment', '?')}")
+    print(f"\n{len(matches)} monster(s).")
+
+
+def cmd_calendar(args):
+    cal = dolmenwood_calendar.default_calendar()
+    if args.export:
+        first, _, last = args.years.partition("-")
+        table = dolmenwood_calendar.CalendarTable(cal, int(first), int(last or first), args.seed)
+        with open(args.export, "w", encoding="utf-8") as f:
+            json.dump(table.export(), f, ensure_ascii=False)
+        print(f"Wrote {table.end - table.start} days to {args.export}.")
+        return
+    try:
+        today, upcoming = dolmenwood_calendar.lookahead(args.date, args.days, args.seed, args.only,
+                                                        args.season)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    weather = today["weather"]
+    print(f"{today['weekday']}, {today['day']} {today['month_name']} {today['year']} — {today['season_desc']}")
+    print(f"  {today['moon']['icon']} {today['moon']['name']} ({today['moon']['sign']} moon, {today['moon']['sign_phase']})")
+    if args.season:
+        print(f"  {cal.special_seasons[args.season]['name']}: {cal.special_seasons[args.season]['description']}")
+    print(f"  Weather ({weather['roll']}): {weather['desc']} {' '.join(weather['effects'])}".rstrip())
+    print(f"\nNext {args.days} days:")
+    for day in upcoming:
+        notes = [e["name"] for e in day["events"]]
+        if day["moon"]["full"]:
+            notes.insert(0, "🌕 Full Moon")
+        elif day["moon"]["new"]:
+            notes.insert(0, "🌑 New Moon")
+        print(f"  {day['day']:>2} {day['month_name']:<10} {day['year']}  {'; '.join(notes)}")
+
+
+def cmd_roll(args):
+    try:
+        roller = dice.compile(args.expr)
+        if args.dist:
+            dist = roller.distribution()
+            top = max(dist.values())
+            for value, p in dist.items():
+                print(f"{value:>6}  {p:7.2%}  {'█' * max(1, round(p / top * 40))}")
+            print(f"\nMean {roller.mean:.2f}, range {roller.minimum}–{roller.maximum}")
+            return
+        rolls = roller.roll_many(args.n, seed=args.seed)
+    except dice.DiceError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(" ".join(map(str, rolls)))
+
+
+def cmd_simulate(args):
+    monsters = []
+    for monster_id, count in args.monsters:
+        monster = STORE.get(MONSTERS_PATH, monster_id)
+        if not monster:
+            print(f"No monster {monster_id}.", file=sys.stderr)
+            return 1
+        for n in range(count):
+            monsters.append(combat_sim.Combatant.from_monster(
+                monster, f"{monster['name']} #{n + 1}", fixed_hp=args.fixed_hp))
+    if args.party:
+        chars = [get_character_by_id(c) for c in args.party.split(",")]
+        if None in chars:
+            print("Unknown character in --party.", file=sys.stderr)
+            return 1
+    else:
+        chars = STORE.find_all(CHARACTERS_PATH, "type", "PC")
+    party = [combat_sim.Combatant.from_character(c, args.pc_aac, args.pc_damage) for c in chars]
+    if not party:
+        print("No party: add PCs or pass --party.", file=sys.stderr)
+        return 1
+
+    r = combat_sim.simulate(party, monsters, args.fights, args.seed)
+    print(f"{len(party)} PCs vs {len(monsters)} monsters, {r['fights']} fights")
+    print(f"  Victory {r['victory']:.1%}  Rout {r['rout']:.1%}  TPK {r['tpk']:.1%}  Stalemate {r['timeout']:.1%}")
+    print(f"  Expected rounds: {r['expected_rounds']:.1f}")
+    loss = r["hp_loss"]
+    print(f"  Party hp lost: mean {loss['mean']:.1f}, median {loss['p50']}, 90th pct {loss['p90']}, worst {loss['max']}")
+    for name, p in r["pc_down"].items():
+        print(f"  {name} goes down: {p:.1%}")
+
+
+def cmd_encounters(args):
+    biome = args.biome
+    if args.quest:
+        quest = STORE.get(QUESTS_PATH, args.quest)
+        if quest is None:
+            print(f"No quest {args.quest}.", file=sys.stderr)
+            return 1
+        biome = encounter_tables.biome_for(quest.get("biome"))
+    elif biome:
+        biome = encounter_tables.biome_for(biome) or biome
+    try:
+        table = encounter_tables.table_for(STORE, MONSTERS_PATH, biome, args.tag, args.level)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not len(table):
+        print(f"No monsters fit {table.describe()}.", file=sys.stderr)
+        return 1
+    print(f"Encounter table: {table.describe()} — {len(table)} monsters, {table.chance}-in-6 per day\n")
+    if args.odds:
+        for monster, p in table.alias.odds():
+            print(f"  {p:6.1%}  {monster['name']:<28} {monster.get('number_appearing', '1')}")
+        return
+    days = encounter_tables.hex_days(table, args.days, seed=args.seed, force=args.force,
+                                     lair_chance=args.lair_chance)
+    for day in days:
+        rolled = ", ".join(
+            f"{e['count']} × {e['name']}{' (in lair)' if e['lair'] else ''} [{e['monster_id']}:{e['count']}]"
+            for e in day["encounters"]
+        )
+        print(f"  Day {day['day']:>3}: {rolled or '—'}")
+    found = sum(len(d["encounters"]) for d in days)
+    print(f"\n{found} encounter(s) in {args.days} day(s). Check one with `simulate ID:COUNT`.")
+
+
+def cmd_treasure(args):
+    pool = treasure.pool_for(STORE, ITEMS_PATH)
+    try:
+        if args.rooms is not None:
+            table = encounter_tables.table_for(STORE, MONSTERS_PATH, args.biome, None, args.level)
+            if not len(table):
+                print(f"No monsters fit {table.describe()}.", file=sys.stderr)
+                return 1
+            rolled = treasure.dungeon_level(table, args.rooms, pool, seed=args.seed)
+            print(f"{args.rooms} lairs ({table.describe()}):\n")
+        elif args.monster:
+            groups = []
+            for monster_id, count in args.monster:
+                monster = STORE.get(MONSTERS_PATH, monster_id)
+                if not monster:
+                    print(f"No monster {monster_id}.", file=sys.stderr)
+                    return 1
+                groups.append((monster, count))
+            rolled = treasure.roll_groups(groups, pool, seed=args.seed, lair=not args.wandering)
+        elif args.codes:
+            code = ", ".join(args.codes)
+            rolled = [{"name": f"Hoard {i + 1}", "count": 1, "code": code, "hoard": h}
+                      for i, h in enumerate(treasure.roll(code, args.count, pool, seed=args.seed))]
+        else:
+            print("Give treasure types, --monster or --rooms.", file=sys.stderr)
+            return 1
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    hoards = [r["hoard"] for r in rolled]
+    if not args.summary:
+        for r in rolled:
+            who = f"{r['count']} × {r['name']}" if r.get("monster_id") else r["name"]
+            print(f"  {who} [{r['code']}]: {treasure.describe(r['hoard'])}")
+        print()
+    whole = treasure.total(hoards)
+    print(f"Total: {treasure.describe(whole)}")
+    print(f"Worth {treasure.gp_value(whole):,.0f} gp before magic items.")
+
+
+def print_offer(offer):
+    per = f"/{offer['unit']}" if offer["unit"] else ""
+    price = shop_prices.format_copper(offer["copper"]) if offer["copper"] is not None else offer["price"]
+    item_id = f" [{offer['item_id']}]" if offer["item_id"] else ""
+    print(f"  {price + per:>14}  {offer['name']}{item_id} — {offer['shop']}, {offer['location']}")
+
+
+def cmd_prices(args):
+    index = shop_prices.price_index(STORE, SHOPS_PATH)
+    aliases = shop_prices.aliases_for(STORE, ITEMS_PATH)
+    if args.buy:
+        wanted = list(args.buy)
+        if args.party:
+            pcs = len(STORE.find_all(CHARACTERS_PATH, "type", "PC")) or 1
+            wanted = [(name, n * pcs) for name, n in wanted]
+            print(f"Buying for {pcs} PCs.\n")
+        basket = index.basket(wanted, aliases, args.location)
+        for query, quantity, offer in basket["lines"]:
+            cost = shop_prices.format_copper(offer["copper"] * quantity)
+            print(f"  {quantity:>3} × {offer['name']:<30} {cost:>14}  at {offer['shop']}")
+        for query in basket["missing"]:
+            print(f"  ??? {query}: not for sale at a fixed price{' here' if args.location else ''}")
+        print(f"\nTotal: {shop_prices.format_copper(basket['total'])}")
+        return 1 if basket["missing"] else None
+    if args.under:
+        text = args.under + " gp" if args.under.strip().isdigit() else args.under
+        limit, _ = shop_prices.parse_price(text)
+        if limit is None:
+            print(f"Can't read price {args.under!r}; try '5 gp'.", file=sys.stderr)
+            return 1
+        offers = index.under(limit, args.location)
+        where = f" in {args.location}" if args.location else ""
+        print(f"{len(offers)} offer(s) at or under {shop_prices.format_copper(limit)}{where}:\n")
+    elif args.item:
+        offers = index.offers_for(" ".join(args.item), aliases)
+        if args.location:
+            places = set(index.locations(args.location))
+            offers = [o for o in offers if o["location"] in places]
+        if not offers:
+            print("Nobody sells that.", file=sys.stderr)
+            return 1
+    else:
+        print("Give an item, --under PRICE or --buy ITEM.", file=sys.stderr)
+        return 1
+    for offer in offers:
+        print_offer(offer)
+
+
+def cmd_progress(args):
+    quests = [dict(q) for q in load_list(QUESTS_PATH)]
+    if args.refresh:
+        # Re-bake after hand edits; only quests whose numbers moved are appended.
+        before = {q["id"]: q.get("progress") for q in quests}
+        quest_progress.refresh(quests)
+        stale = [q for q in quests if q.get("progress") != before[q["id"]]]
+        for quest in stale:
+            STORE.append(QUESTS_PATH, quest)
+        print(f"Refreshed progress on {len(stale)} quest(s).\n")
+    by_id = {q["id"]: q for q in quests}
+    children, parents = quest_progress.build_tree(quests)
+
+    def show(quest_id, depth, seen):
+        quest = by_id[quest_id]
+        p = quest.get("progress") or quest_progress.rollup(quest, [])
+        done, total = p["objectives"]
+        tree = f", tree {p['tree'][0]}/{p['tree'][1]} ({p['tree_percent']}%)" if children.get(quest_id) else ""
+        print(f"{'  ' * depth}{quest_id}  {quest.get('name', '?')} — {quest.get('status', '?')}, "
+              f"{done}/{total} objectives ({p['percent']}%){tree}")
+        for kid in children.get(quest_id, ()):
+            if kid not in seen:
+                show(kid, depth + 1, seen | {kid})
+
+    roots = [args.id] if args.id else [q["id"] for q in quests if q["id"] not in parents]
+    for quest_id in roots:
+        if quest_id not in by_id:
+            print(f"No quest {quest_id}.", file=sys.stderr)
+            return 1
+        show(quest_id, 0, {quest_id})
+
+
+def cmd_render(args):
+    path = COLLECTION_PATHS[args.collection]
+    if args.refresh:
+        entries = load_list(path)
+        changed = RENDER.refresh(args.collection, entries)
+        if args.collection == "quests":
+            changed += quest_progress.refresh(entries)
+        if changed:
+            save_list(path, entries)
+        print(f"Refreshed {changed} {args.collection}.")
+        return
+    if not args.id:
+        print("Give an entry ID or --refresh.", file=sys.stderr)
+        return 1
+    entry = STORE.get(path, args.id)
+    if entry is None:
+        print(f"No {args.collection} entry {args.id}.", file=sys.stderr)
+        return 1
+    print(RENDER.render(args.collection, entry, args.format))
+
+
+def cmd_query(args):
+    text = " ".join(args.text)
+    try:
+        results, plan = QUERIES.explain(text)
+    except QueryError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.explain:
+        print("Plan:")
+        for line in plan:
+            print("  " + line)
+        print()
+    if args.json:
+        for row in results:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    for row in results:
+        if "id" in row and "name" in row and len(row) > 3:
+            print(f"{row['id']}  {row['name']}")
+        else:
+            print("  ".join(f"{k}: {', '.join(map(str, v)) if isinstance(v, list) else v}"
+                            for k, v in row.items()))
+    print(f"\n{len(results)} result(s).")
+
+
+def cmd_sync(args):
+    if args.direction == "to-sqlite":
+        counts = SqliteStore(args.db).import_json(COLLECTION_PATHS, VaultStore())
+        target = args.db
+    else:
+        try:
+            db = SqliteStore(args.db, readonly=True)
+            counts = db.export_json(COLLECTION_PATHS, VaultStore(), force=args.force)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(e, file=sys.stderr)
+            return 1
+        target = "JSON files"
+    summary = ", ".join(f"{n} {name}" for name, n in counts.items())
+    print(f"Synced to {target}: {summary}.")
+
+
+def enable_profiling(dump_dir=None):
+    """Hook METRICS into the shared store, search and renderer."""
+    METRICS.enable(dump_dir)
+    STORE.metrics = METRICS
+    METRICS.count_calls(STORE, "collection", "collection_calls")
+    for method in ("get", "find", "find_all"):
+        METRICS.count_calls(STORE, method, "lookups")
+    METRICS.time_calls(SEARCH, "search", "search")
+    METRICS.time_calls(SEARCH, "fuzzy", "search")
+    METRICS.time_calls(RENDER, "render", "render")
+    METRICS.time_calls(STORE, "append", "write")
+    METRICS.time_calls(STORE, "save", "write")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="D&D Vault (no command opens the interactive menu)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print loads, bytes parsed, lookups, cache hits and timings after each action")
+    parser.add_argument("--profile-dump", metavar="DIR",
+                        help="With --profile, also cProfile each action into DIR/*.pstats")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("export", help="Write a collection as NDJSON or CSV")
+    p.add_argument("collection", choices=COLLECTION_PATHS)
+    p.add_argument("-o", "--output", help="Output file (default: stdout)")
+    p.add_argument("-f", "--format", choices=vault_io.FORMATS)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="Add or update records from NDJSON or CSV")
+    p.add_argument("collection", choices=COLLECTION_PATHS)
+    p.add_argument("input", nargs="?", default="-", help="Input file (default: stdin)")
+    p.add_argument("-f", "--format", choices=vault_io.FORMATS)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("validate", help="Check collections against their schemas")
+    p.add_argument("collection", nargs="?", choices=COLLECTION_PATHS)
+    p.add_argument("--sources", metavar="DIR", help="Also check monster source files (e.g. monsters/)")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("monsters", help="Filter the bestiary by numeric stats, alignment and treasure type")
+    for field in MONSTER_FILTERS:
+        p.add_argument(f"--{field}", type=stat_range, metavar="RANGE", help="N, LOW..HIGH, LOW.. or ..HIGH")
+    p.add_argument("--alignment", action="append", help="Repeat to allow several")
+    p.add_argument("--treasure", action="append", metavar="TYPE", help="Treasure type; repeat to allow several")
+    p.set_defaults(func=cmd_monsters)
+
+    p = sub.add_parser("calendar", help="Dolmenwood date: moon, sign, weather and what's coming up")
+    p.add_argument("date", nargs="?", default=dolmenwood_calendar.DEFAULT_DATE, help="YEAR-MONTH-DAY")
+    p.add_argument("--days", type=int, default=60, help="How far ahead to look (default 60)")
+    p.add_argument("--only", action="append", metavar="KIND",
+                   help="full_moon, new_moon, festival, wysenday, special, saint, ... (repeatable)")
+    p.add_argument("--seed", type=int, default=0, help="Weather/sign seed (default 0)")
+    p.add_argument("--season", choices=sorted(dolmenwood_calendar.default_calendar().special_seasons),
+                   help="Special season in effect (rolls today's weather on its table)")
+    p.add_argument("--export", metavar="FILE", help="Write the precomputed day table as JSON instead")
+    p.add_argument("--years", default="376-380", help="Years to export, FIRST-LAST")
+    p.set_defaults(func=cmd_calendar)
+
+    p = sub.add_parser("roll", help="Roll dice (2d6, 4d6kh3, 1d4x100, ...) or show their odds")
+    p.add_argument("expr")
+    p.add_argument("-n", type=int, default=1, help="Number of rolls")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--dist", action="store_true", help="Print the exact distribution instead")
+    p.set_defaults(func=cmd_roll)
+
+    p = sub.add_parser("simulate", help="Monte Carlo an encounter: TPK odds, rounds, hp lost")
+    p.add_argument("monsters", nargs="+", type=monster_count, metavar="ID[:COUNT]", help="e.g. monster-0018:4")
+    p.add_argument("--party", metavar="IDS", help="Comma-separated character IDs (default: every PC)")
+    p.add_argument("--fights", type=positive_int, default=10000)
+    p.add_argument("--seed", type=int)
+    p.add_argument("--fixed-hp", action="store_true", help="Use listed monster hp instead of rolling HD")
+    p.add_argument("--pc-aac", type=int, help=f"PC armour class when not on the sheet (default {combat_sim.DEFAULT_PC_AAC})")
+    p.add_argument("--pc-damage", type=dice_expr, help=f"PC damage when not on the sheet (default {combat_sim.DEFAULT_PC_DAMAGE})")
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser("encounters", help="Roll random encounters for a biome, tag and party level")
+    p.add_argument("--biome", help=f"One of {', '.join(encounter_tables.BIOMES)} (or a description)")
+    p.add_argument("--quest", metavar="ID", help="Use a quest's biome")
+    p.add_argument("--tag", help="Only monsters with this tag")
+    p.add_argument("--level", type=int, help="Average party level (limits monster HD)")
+    p.add_argument("--days", type=positive_int, default=1, help="Days of hex-crawling to roll")
+    p.add_argument("--force", action="store_true", help="An encounter every day (skip the x-in-6 check)")
+    p.add_argument("--lair-chance", type=probability, default=0.0, help="Chance an encounter is in the lair (0-1)")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--odds", action="store_true", help="Show the table's odds instead of rolling")
+    p.set_defaults(func=cmd_encounters)
+
+    p = sub.add_parser("treasure", help="Roll OSE treasure types, a monster's hoard or a dungeon level's loot")
+    p.add_argument("codes", nargs="*", metavar="TYPE", help="Treasure types, e.g. A or 'E + 5000gp'")
+    p.add_argument("-n", "--count", type=int, default=1, help="Hoards to roll for the given types")
+    p.add_argument("--monster", action="append", type=monster_count, metavar="ID[:COUNT]", help="Roll a monster group's treasure; repeatable")
+    p.add_argument("--wandering", action="store_true", help="Monsters away from their lair: individual treasure only")
+    p.add_argument("--rooms", type=positive_int, help="Stock this many lairs from the encounter table and roll their treasure")
+    p.add_argument("--biome", default="dungeon", choices=encounter_tables.BIOMES, help="Encounter table for --rooms")
+    p.add_argument("--level", type=int, help="Party level for --rooms")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--summary", action="store_true", help="Only print the total")
+    p.set_defaults(func=cmd_treasure)
+
+    p = sub.add_parser("prices", help="Compare shop prices: cheapest seller, budget lists, shopping totals")
+    p.add_argument("item", nargs="*", help="Item name or ID; lists every seller, cheapest first")
+    p.add_argument("--under", metavar="PRICE", help="Everything at or under a price, e.g. '5 gp'")
+    p.add_argument("--location", help="Only shops whose location contains this")
+    p.add_argument("--buy", action="append", type=shopping_line, metavar="ITEM[:QTY]", help="Price a shopping list; repeatable")
+    p.add_argument("--party", action="store_true", help="With --buy: quantities are per PC")
+    p.set_defaults(func=cmd_prices)
+
+    p = sub.add_parser("progress", help="Quest progress rollups as a tree")
+    p.add_argument("id", nargs="?", help="Only this quest and its sub-quests")
+    p.add_argument("--refresh", action="store_true", help="Re-bake rollups after editing quests.json by hand")
+    p.set_defaults(func=cmd_progress)
+
+    p = sub.add_parser("render", help="Print an entry as plain text, Markdown or Discord")
+    p.add_argument("collection", choices=COLLECTION_PATHS)
+    p.add_argument("id", nargs="?")
+    p.add_argument("-f", "--format", choices=FORMATS, default="markdown")
+    p.add_argument("--refresh", action="store_true", help="Re-bake stale stat lines / missing paste blocks")
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser("query", help="Query across collections, e.g. "
+                                     "'from quests -> related_items <- shops.quest_items'")
+    p.add_argument("text", nargs="+", help="The query (see vault_query.py for the syntax)")
+    p.add_argument("--explain", action="store_true", help="Show how each step was answered")
+    p.add_argument("--json", action="store_true", help="Print each result as a line of JSON")
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("sync", help="Copy the vault between the JSON files and a SQLite database")
+    p.add_argument("direction", choices=("to-sqlite", "to-json"))
+    p.add_argument("--db", default=VAULT_DB or "vault.db", help="Database file (default: $VAULT_DB or vault.db)")
+    p.add_argument("--force", action="store_true", help="to-json: write even collections the database has none of")
+    p.set_defaults(func=cmd_sync)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile or args.profile_dump:
+        enable_profiling(args.profile_dump)
+    if args.command is None:
+        main_menu()
+        return 0
+    with METRICS.action(args.command):
+        return args.func(args) or 0
+
+
 if __name__ == "__main__":
-    main_menu()
+    sys.exit(main())
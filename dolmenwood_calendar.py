@@ -0,0 +1,268 @@
+"""
+Dolmenwood Calendar
+Precomputed per-day table over `dolmenwood-calendar.json`, following the
+rules in `components/calendar.js`:
+
+- days 1-28 cycle through the seven weekdays; days 29+ are the month's
+  named wysendays
+- the moon's phase icon is `(day - newMoon + 30) % 30` scaled onto 8 phases
+- the moon sign phase is "full" within a day of the full moon, "waxing" from
+  the new moon up to that, "waning" otherwise; one sign is rolled per phase
+  per month
+- weather is a 2d6 roll on the month's season table, or on an active
+  special season's (those are started by the GM, not by the date)
+
+Dates are addressed by ordinal (day 0 is 1 Grimvold, year 1), so date <->
+ordinal conversion is O(1) arithmetic plus a lookup in a day-of-year table.
+Rolls are seeded per year, so a given seed always produces the same weather
+and signs.
+"""
+
+import functools
+import json
+import os
+import random
+from array import array
+
+import dice
+
+CALENDAR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dolmenwood-calendar.json")
+
+MOON_PHASES = ["🌑", "🌒", "🌓", "🌔", "🌕", "🌖", "🌗", "🌘"]
+MOON_NAMES = ["New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous",
+              "Full Moon", "Waning Gibbous", "Last Quarter", "Waning Crescent"]
+SIGN_PHASES = ["waxing", "full", "waning"]
+
+# Same order as MOON_SIGNS_DATA in components/calendar.js (the roll indexes it).
+MOON_SIGNS = ["Grinning", "Dead", "Beast", "Squamous", "Knight’s", "Rotting",
+              "Maiden’s", "Witch’s", "Robber’s", "Goat", "Narrow", "Black"]
+
+SEASONS = ["winter", "spring", "summer", "autumn"]
+
+# 2d6 -> (description, effects); mirrors WEATHER_TABLES in components/calendar.js.
+# Effects: I = travel impeded, V = poor visibility, W = wet conditions.
+WEATHER_TABLES = {
+    "winter": ["Deep freeze, hoarfrost", ("Snow storm", "IVW"), "Relentless wind", "Bitter, silent",
+               "Frigid, icy", "Clear, cold", ("Freezing rain", "VW"), "Cold wind, gloomy",
+               ("Frigid mist", "V"), ("Icy, steady snow", "VW"), ("Relentless blizzard", "IVW")],
+    "spring": [("Cold, gentle snow", "W"), ("Chilly, damp", "W"), "Windy, cloudy", "Brisk, clear",
+               "Clement, cheery", "Warm, sunny", "Bright, fresh", ("Blustery, drizzle", "W"),
+               ("Pouring rain", "VW"), "Gloomy, cool", ("Chill mist", "V")],
+    "summer": ["Cool winds", ("Low cloud, mist", "V"), ("Warm, gentle rain", "W"), "Brooding thunder",
+               "Balmy, clear", "Hot, humid", "Overcast, muggy", "Sweltering, still",
+               "Baking, dry", "Warm wind", ("Thunder storm", "VW")],
+    "autumn": [("Torrential rain", "VW"), ("Rolling fog", "V"), ("Driving rain", "VW"), "Bracing wind",
+               "Balmy, clement", "Clear, chilly", ("Drizzle, damp", "W"), ("Cloudy, misty", "V"),
+               "Brooding clouds", "Frosty, chill", ("Icy, gentle snow", "W")],
+    "hitching": [("Torrential rain", "VW"), ("Clear, fresh dew", "W"), ("Sleepy, purple mist", "V"),
+                 ("Interminable drizzle", "W"), ("Balmy mist", "V"), ("Thick fog, hot", "V"),
+                 ("Misty, seeping damp", "VW"), ("Hazy fog, dripping", "VW"), ("Sticky dew drips", "W"),
+                 "Gloomy, shadows drip", ("Befuddling green fog", "V")],
+    "vague": [("Hoarfrost, freezing fog", "V"), ("Steady snow, icy mist", "VW"), "Low mist, writhing soil",
+              ("Sickly, yellow mist", "V"), ("Thick, rolling fog", "V"), ("Freezing fog", "V"),
+              ("Chill mist, winds wail", "V"), ("Icy mist, eerie howling", "V"), ("Violet mist rises", "V"),
+              ("Blizzard, earth tremors", "IVW"), ("Blizzard, dense fog", "IVW")],
+}
+
+WEATHER_2D6 = dice.compile("2d6")
+
+# The web calendar's starting date (currentDate in components/calendar.js).
+DEFAULT_DATE = "376-11-4"
+# Years precomputed on either side of a requested date.
+SPAN_YEARS = 2
+
+
+def weather_entry(table, roll):
+    row = WEATHER_TABLES[table][roll - 2]
+    desc, effects = row if isinstance(row, tuple) else (row, "")
+    return {"season": table, "roll": roll, "desc": desc, "effects": list(effects)}
+
+
+def load_calendar(path=CALENDAR_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_date(text):
+    """`"376-11-4"` -> (376, 11, 4)."""
+    try:
+        year, month, day = (int(part) for part in text.split("-"))
+    except ValueError:
+        raise ValueError(f"Dates look like YEAR-MONTH-DAY, got {text!r}")
+    if year < 1:
+        raise ValueError(f"Years start at 1, got {year}")
+    return year, month, day
+
+
+class Calendar:
+    """Static calendar rules: month lengths, weekdays, moons, events."""
+
+    def __init__(self, data=None):
+        data = data or load_calendar()
+        self.data = data
+        self.months = data["months"]
+        self.week_days = data["weekDays"]
+        self.special_seasons = data.get("specialSeasons", {})
+        self.month_start = []
+        total = 0
+        for month in self.months:
+            self.month_start.append(total)
+            total += month["days"]
+        self.year_length = total
+        # day-of-year -> (month number, day of month)
+        self.day_of_year = [
+            (m + 1, d + 1) for m, month in enumerate(self.months) for d in range(month["days"])
+        ]
+        self.events = {}
+        for m, month in enumerate(self.months):
+            for event in month.get("events", []):
+                self.events.setdefault(self.month_start[m] + event["day"] - 1, []).append(event)
+
+    def ordinal(self, year, month, day):
+        if not 1 <= month <= len(self.months) or not 1 <= day <= self.months[month - 1]["days"]:
+            raise ValueError(f"No day {day} in month {month}")
+        return (year - 1) * self.year_length + self.month_start[month - 1] + day - 1
+
+    def date(self, ordinal):
+        year, doy = divmod(ordinal, self.year_length)
+        month, day = self.day_of_year[doy]
+        return year + 1, month, day
+
+    def weekday(self, month, day):
+        if day <= 28:
+            return self.week_days[(day - 1) % 7]
+        wysendays = self.months[month - 1].get("wysendays", [])
+        if day - 29 < len(wysendays):
+            return f"{wysendays[day - 29]} (Wysenday)"
+        return "Wysenday"
+
+    def moon_phase(self, month, day):
+        """Index into MOON_PHASES / MOON_NAMES."""
+        since_new = (day - self.months[month - 1]["newMoon"] + 30) % 30
+        return int(since_new / 29 * 8) % 8
+
+    def sign_phase(self, month, day):
+        m = self.months[month - 1]
+        if m["fullMoon"] - 1 <= day <= m["fullMoon"] + 1:
+            return "full"
+        if m["newMoon"] <= day < m["fullMoon"] - 1:
+            return "waxing"
+        return "waning"
+
+    def season_table(self, month, special_season=None):
+        """Weather table for a month, or for a special season the GM has started."""
+        if special_season:
+            if special_season not in self.special_seasons:
+                raise ValueError(f"No special season {special_season!r} "
+                                 f"(one of {', '.join(self.special_seasons)})")
+            return self.special_seasons[special_season]["weatherTable"]
+        season = self.months[month - 1]["season"].lower()
+        return next((s for s in SEASONS if s in season), "winter")
+
+
+class CalendarTable:
+    """Precomputed days for years `first..last` (inclusive), one array per column."""
+
+    def __init__(self, calendar, first, last, seed=0):
+        self.calendar = calendar
+        self.first = first
+        self.last = last
+        self.seed = seed
+        self.start = calendar.ordinal(first, 1, 1)
+        self.end = calendar.ordinal(last + 1, 1, 1)
+        # Static within a year; repeated per year below.
+        year_phase = array("B", (calendar.moon_phase(m, d) for m, d in calendar.day_of_year))
+        year_sign_phase = array("B", (SIGN_PHASES.index(calendar.sign_phase(m, d))
+                                      for m, d in calendar.day_of_year))
+        self.phase = array("B")
+        self.sign_phase = array("B")
+        self.weather = array("B")
+        self.signs = array("B")  # per year/month/phase: index into MOON_SIGNS
+        for year in range(first, last + 1):
+            rng = random.Random(f"{seed}:{year}")
+            self.phase.extend(year_phase)
+            self.sign_phase.extend(year_sign_phase)
+            self.weather.extend(WEATHER_2D6.roll_many(calendar.year_length, rng))
+            self.signs.extend(rng.randrange(len(MOON_SIGNS)) for _ in range(len(calendar.months) * 3))
+
+    def __contains__(self, ordinal):
+        return self.start <= ordinal < self.end
+
+    def day(self, ordinal, special_season=None):
+        """Everything known about one day. `special_season` swaps the weather table."""
+        if ordinal not in self:
+            raise KeyError(f"Day {ordinal} is outside years {self.first}-{self.last}")
+        cal = self.calendar
+        i = ordinal - self.start
+        year, month, day = cal.date(ordinal)
+        m = cal.months[month - 1]
+        phase = self.phase[i]
+        sign_phase = SIGN_PHASES[self.sign_phase[i]]
+        sign = MOON_SIGNS[self.signs[((year - self.first) * len(cal.months) + month - 1) * 3
+                                     + self.sign_phase[i]]]
+        table = cal.season_table(month, special_season)
+        return {
+            "date": f"{year}-{month}-{day}",
+            "ordinal": ordinal,
+            "year": year,
+            "month": month,
+            "month_name": m["name"],
+            "day": day,
+            "day_of_year": ordinal % cal.year_length + 1,
+            "weekday": cal.weekday(month, day),
+            "season": m["season"],
+            "season_desc": m.get("seasonDesc", ""),
+            "moon": {"icon": MOON_PHASES[phase], "name": MOON_NAMES[phase],
+                     "full": day == m["fullMoon"], "new": day == m["newMoon"],
+                     "sign": sign, "sign_phase": sign_phase},
+            "weather": weather_entry(table, self.weather[i]),
+            "events": cal.events.get(ordinal % cal.year_length, []),
+        }
+
+    def days(self, start, count):
+        return [self.day(o) for o in range(start, min(start + count, self.end))]
+
+    def find(self, start, count, kinds=("full_moon", "new_moon", "festival", "wysenday")):
+        """Days in [start, start+count) that are a full/new moon or carry an event of a given type."""
+        cal = self.calendar
+        kinds = set(kinds)
+        hits = []
+        for ordinal in range(max(start, self.start), min(start + count, self.end)):
+            doy = ordinal % cal.year_length
+            month, day = cal.day_of_year[doy]
+            m = cal.months[month - 1]
+            matched = [e for e in cal.events.get(doy, []) if e.get("type") in kinds]
+            if ("full_moon" in kinds and day == m["fullMoon"]) or \
+                    ("new_moon" in kinds and day == m["newMoon"]) or matched:
+                hits.append(self.day(ordinal))
+        return hits
+
+    def export(self):
+        """Every day in the table as JSON-ready dicts."""
+        return self.days(self.start, self.end - self.start)
+
+
+@functools.lru_cache(maxsize=None)
+def default_calendar():
+    return Calendar()
+
+
+@functools.lru_cache(maxsize=16)
+def table_for(year, seed=0):
+    """Shared table covering `year` give or take SPAN_YEARS."""
+    return CalendarTable(default_calendar(), max(1, year - SPAN_YEARS), year + SPAN_YEARS, seed)
+
+
+def lookahead(date, days=60, seed=0, kinds=None, special_season=None):
+    """(the given day, notable days in the next `days`) for a YEAR-MONTH-DAY string.
+
+    Special seasons wander rather than follow the date, so an active one is
+    passed in; like the web calendar, it only changes the given day's weather.
+    """
+    cal = default_calendar()
+    ordinal = cal.ordinal(*parse_date(date))
+    table = table_for(parse_date(date)[0], seed)
+    if ordinal + days > table.end:
+        table = CalendarTable(cal, table.first, cal.date(ordinal + days)[0], seed)
+    found = table.find(ordinal, days, kinds) if kinds else table.find(ordinal, days)
+    return table.day(ordinal, special_season), found
@@ -0,0 +1,208 @@
+"""
+Encounter Tables
+Weighted random-encounter tables built from `monsters.json`, per biome, tag
+and party level band.
+
+A monster's weight in a biome is the sum of that biome's weights for its
+tags (a swamp favours `swamp`, `aquatic`, `reptilian`, ...); a level band
+keeps monsters whose HD suit the party. Tables are compiled into Walker
+alias tables (Vose's method), so each draw is O(1) however many monsters
+qualify, and cached on the monster collection until it changes.
+
+`hex_days()` rolls a whole stretch of hex-crawling in one call: the daily
+encounter checks, one alias draw per encounter, and number appearing
+(`dice.number_appearing` on the stored "1d6 (2d6)" strings) rolled in one
+batch per monster.
+"""
+
+import math
+import random
+from array import array
+
+import dice
+from monster_stats import parse_hd
+
+# biome -> (encounter chance in 6 per day, {tag: weight})
+BIOMES = {
+    "forest": (2, {"beast": 3, "bear": 2, "insect": 2, "humanoid": 2, "goblinoid": 2,
+                   "demihuman": 1, "hybrid": 1, "spirit": 1, "shapeshifter": 1}),
+    "swamp": (3, {"swamp": 4, "aquatic": 3, "reptilian": 3, "snake": 2, "insect": 2,
+                  "undead": 2, "ooze": 1, "disease": 1}),
+    "hills": (2, {"giant": 3, "humanoid": 2, "goblinoid": 2, "beast": 2, "flying": 1, "dragon": 1}),
+    "road": (1, {"humanoid": 3, "thief": 3, "warrior": 2, "demihuman": 2, "npc": 2, "beast": 1}),
+    "town": (1, {"humanoid": 3, "thief": 3, "npc": 3, "cleric": 2}),
+    "ruins": (2, {"undead": 3, "incorporeal": 2, "spirit": 2, "ooze": 2, "mindless": 2, "aberration": 1}),
+    "dungeon": (2, {"ooze": 3, "undead": 2, "mindless": 2, "insect": 2, "goblinoid": 2,
+                    "aberration": 2, "burrowing": 1}),
+}
+DEFAULT_CHANCE = 1
+
+# Words in a quest's free-text `biome` that pick one of the biomes above.
+BIOME_WORDS = {
+    "marsh": "swamp", "swamp": "swamp", "bog": "swamp", "fen": "swamp",
+    "forest": "forest", "wood": "forest", "fairy": "forest", "mossling": "forest",
+    "wold": "hills", "hill": "hills", "mountain": "hills",
+    "road": "road", "town": "town", "inn": "town", "village": "town", "festival": "town",
+    "ruin": "ruins", "abandoned": "ruins", "dungeon": "dungeon", "cave": "dungeon",
+}
+
+# Unique or plot monsters never turn up at random.
+EXCLUDED_TAGS = {"boss", "session encounter"}
+
+# (highest party level, lowest HD, highest HD), after the OSE dungeon-level tables.
+LEVEL_BANDS = ((1, 0, 1), (2, 1, 2), (3, 2, 4), (5, 3, 6), (7, 5, 8), (math.inf, 7, math.inf))
+
+
+def biome_for(text):
+    """Map free text ("Marshes, fog, abandoned villages") to a biome, or None."""
+    text = (text or "").lower()
+    if text in BIOMES:
+        return text
+    hits = [(text.find(word), biome) for word, biome in BIOME_WORDS.items() if word in text]
+    return min(hits)[1] if hits else None
+
+
+def level_band(level):
+    """(lowest HD, highest HD) for a party of average level `level`."""
+    return next((lo, hi) for top, lo, hi in LEVEL_BANDS if level <= top)
+
+
+class AliasTable:
+    """Walker alias table: draws an item with probability proportional to its weight in O(1)."""
+
+    def __init__(self, items, weights):
+        if not items:
+            raise ValueError("An alias table needs at least one item")
+        n = len(items)
+        total = float(sum(weights))
+        self.items = list(items)
+        self.weights = list(weights)
+        self.prob = array("d", [0.0]) * n
+        self.alias = array("I", range(n))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, rng=random):
+        u = rng.random() * len(self.items)
+        i = int(u)
+        return self.items[i] if u - i < self.prob[i] else self.items[self.alias[i]]
+
+    def draw_many(self, k, rng=random):
+        n = len(self.items)
+        items, prob, alias = self.items, self.prob, self.alias
+        out = []
+        for _ in range(k):
+            u = rng.random() * n
+            i = int(u)
+            out.append(items[i] if u - i < prob[i] else items[alias[i]])
+        return out
+
+    def odds(self):
+        """[(item, probability)], most likely first."""
+        total = float(sum(self.weights))
+        return sorted(zip(self.items, (w / total for w in self.weights)), key=lambda iw: -iw[1])
+
+
+class EncounterTable:
+    """One compiled table plus each monster's number-appearing dice."""
+
+    def __init__(self, monsters, weights, biome=None, tag=None, level=None):
+        self.biome = biome
+        self.tag = tag
+        self.level = level
+        self.chance = BIOMES[biome][0] if biome else DEFAULT_CHANCE
+        self.alias = AliasTable(monsters, weights) if monsters else None
+        self.appearing = {m["id"]: dice.number_appearing(m.get("number_appearing")) for m in monsters}
+
+    @classmethod
+    def build(cls, monsters, biome=None, tag=None, level=None):
+        tag_weights = BIOMES[biome][1] if biome else None
+        band = level_band(level) if level else None
+        chosen, weights = [], []
+        for m in monsters:
+            tags = set(m.get("tags") or [])
+            if m.get("id") is None or tags & EXCLUDED_TAGS or (tag and tag not in tags):
+                continue
+            if band:
+                hd = parse_hd(m.get("hd"))[0]
+                if math.isnan(hd) or not band[0] <= hd <= band[1]:
+                    continue
+            weight = sum(tag_weights.get(t, 0) for t in tags) if tag_weights else 1
+            if weight > 0:
+                chosen.append(m)
+                weights.append(weight)
+        return cls(chosen, weights, biome, tag, level)
+
+    def __len__(self):
+        return len(self.alias) if self.alias else 0
+
+    def describe(self):
+        parts = [self.biome or "any biome"]
+        if self.tag:
+            parts.append(f"tag {self.tag}")
+        if self.level:
+            lo, hi = level_band(self.level)
+            parts.append(f"level {self.level} (HD {lo:g}-{hi:g})")
+        return ", ".join(parts)
+
+    def roll(self, n, rng, lair=False):
+        """`n` encounters: monster drawn from the table, number appearing rolled per monster."""
+        if not self.alias or n <= 0:
+            return []
+        monsters = self.alias.draw_many(n, rng)
+        slots = {}
+        for i, m in enumerate(monsters):
+            slots.setdefault(m["id"], []).append(i)
+        counts = [1] * n
+        lairs = [lair] * n
+        for monster_id, idxs in slots.items():
+            wandering, in_lair = self.appearing[monster_id]
+            # "0 (1d4)": never met wandering, so this is its lair
+            use_lair = (lair or wandering.maximum <= 0) and in_lair.maximum > 0
+            roller = in_lair if use_lair else wandering
+            for i, count in zip(idxs, roller.roll_many(len(idxs), rng)):
+                counts[i] = max(1, count)
+                lairs[i] = use_lair
+        return [
+            {"monster_id": m["id"], "name": m.get("name", "?"), "count": c, "lair": at_lair}
+            for m, c, at_lair in zip(monsters, counts, lairs)
+        ]
+
+
+def table_for(store, path, biome=None, tag=None, level=None):
+    """Compiled table for the monsters at `path`, cached until the collection changes."""
+    if biome is not None and biome not in BIOMES:
+        raise ValueError(f"Unknown biome {biome!r} (have: {', '.join(BIOMES)})")
+    key = ("encounter_table", biome, tag, level)
+    return store.collection(path).derived(key, lambda c: EncounterTable.build(c.entries, biome, tag, level))
+
+
+def hex_days(table, days, rng=None, seed=None, force=False, lair_chance=0.0):
+    """Roll `days` of travel: [{"day": n, "encounters": [...]}].
+
+    Each day checks for an encounter at the table's x-in-6 chance (every day
+    has one with `force`). Draws and number appearing are batched over the
+    whole stretch rather than rolled day by day.
+    """
+    rng = rng or random.Random(seed)
+    hits = [d for d in range(days) if force or rng.randrange(6) < table.chance]
+    in_lair = [lair_chance > 0 and rng.random() < lair_chance for _ in hits]
+    encounters = table.roll(sum(1 for lair in in_lair if not lair), rng)
+    encounters += table.roll(sum(in_lair), rng, lair=True)
+    out = [{"day": d + 1, "encounters": []} for d in range(days)]
+    for day, encounter in zip([d for d, lair in zip(hits, in_lair) if not lair] +
+                              [d for d, lair in zip(hits, in_lair) if lair], encounters):
+        out[day]["encounters"].append(encounter)
+    return out
@@ -0,0 +1,183 @@
+"""
+Link Graph
+Forward and reverse adjacency for every ID-valued field across the vault,
+built per collection; when one collection changes only its part is re-walked.
+
+Usage:
+    python link_graph.py refs item-0031
+    python link_graph.py tree quest-0001
+    python link_graph.py dangling
+    python link_graph.py export [link_graph.json]
+"""
+
+import json
+import re
+import sys
+
+ID_RE = re.compile(r"^(item|monster|shop|char|quest)-\d+$")
+
+
+def walk_ids(value, field=""):
+    """Yield (field_path, id) for every ID string nested inside `value`.
+
+    Nested fields are dotted, e.g. `growler_menu.item_id`.
+    """
+    if isinstance(value, str):
+        if ID_RE.match(value):
+            yield field, value
+    elif isinstance(value, list):
+        for v in value:
+            yield from walk_ids(v, field)
+    elif isinstance(value, dict):
+        for key, v in value.items():
+            yield from walk_ids(v, f"{field}.{key}" if field else key)
+
+
+class LinkGraph:
+    """Cross-reference graph over a VaultStore's collections."""
+
+    def __init__(self, store, paths):
+        self.store = store
+        self.paths = paths
+        self._stamp = None
+        # name -> (stamp, entities, forward) for each collection's share of the graph
+        self._parts = {}
+        self.entities = {}
+        self.kinds = {}
+        self.forward = {}
+        self.reverse = {}
+
+    def _part(self, coll):
+        entities, forward = {}, {}
+        for entry in coll.entries:
+            source = entry.get("id")
+            if source is None:
+                continue
+            entities[source] = entry
+            forward[source] = [
+                (field, target)
+                for key, value in entry.items() if key != "id"
+                for field, target in walk_ids(value, key)
+            ]
+        return coll.stamp, entities, forward
+
+    def refresh(self):
+        """Re-walk only the collections that changed, then re-merge the graph."""
+        colls = {name: self.store.collection(p) for name, p in self.paths.items()}
+        stamp = tuple(c.stamp for c in colls.values())
+        if stamp == self._stamp:
+            return self
+        for name, coll in colls.items():
+            part = self._parts.get(name)
+            if part is None or part[0] != coll.stamp:
+                self._parts[name] = self._part(coll)
+        entities, kinds, forward, reverse = {}, {}, {}, {}
+        for name in colls:
+            _, part_entities, part_forward = self._parts[name]
+            entities.update(part_entities)
+            kinds.update(dict.fromkeys(part_entities, name))
+            forward.update(part_forward)
+        for source, edges in forward.items():
+            for field, target in edges:
+                reverse.setdefault(target, []).append((source, field))
+        self.entities, self.kinds = entities, kinds
+        self.forward, self.reverse = forward, reverse
+        self._stamp = stamp
+        return self
+
+    def entity(self, entity_id):
+        return self.refresh().entities.get(entity_id)
+
+    def links_from(self, entity_id, field=None):
+        """[(field, target_id)] for every ID this entity references."""
+        edges = self.refresh().forward.get(entity_id, [])
+        return [e for e in edges if field is None or e[0] == field]
+
+    def references_to(self, entity_id, field=None):
+        """[(source_id, field)] for everything that references this entity."""
+        edges = self.refresh().reverse.get(entity_id, [])
+        return [e for e in edges if field is None or e[1] == field]
+
+    def walk_tree(self, root_id, field="sub_quests"):
+        """Yield (depth, id) depth-first down `field` links, skipping cycles."""
+        self.refresh()
+        seen = set()
+
+        def visit(node_id, depth):
+            if node_id in seen:
+                return
+            seen.add(node_id)
+            yield depth, node_id
+            for f, target in self.forward.get(node_id, []):
+                if f == field:
+                    yield from visit(target, depth + 1)
+
+        yield from visit(root_id, 0)
+
+    def subtree(self, root_id, field="sub_quests"):
+        """Nested {"id", "children"} tree of `field` links under `root_id`."""
+        root = None
+        stack = []
+        for depth, node_id in self.walk_tree(root_id, field):
+            node = {"id": node_id, "children": []}
+            del stack[depth:]
+            if stack:
+                stack[-1]["children"].append(node)
+            else:
+                root = node
+            stack.append(node)
+        return root
+
+    def dangling(self):
+        """[(source_id, field, target_id)] for links to IDs that don't exist."""
+        self.refresh()
+        return [
+            (source, field, target)
+            for target, refs in self.reverse.items() if target not in self.entities
+            for source, field in refs
+        ]
+
+    def to_dict(self):
+        """Nodes and edges, ready to serve to the web quest graph."""
+        self.refresh()
+        return {
+            "nodes": [
+                {"id": i, "type": self.kinds[i], "name": e.get("name", i)}
+                for i, e in self.entities.items()
+            ],
+            "edges": [
+                {"source": s, "field": f, "target": t}
+                for s, edges in self.forward.items() for f, t in edges
+            ],
+        }
+
+
+def main(argv):
+    from dnd_vault import LINKS
+
+    if not argv:
+        print(__doc__.strip())
+        return
+    cmd, args = argv[0], argv[1:]
+    if cmd == "refs" and args:
+        for source, field in LINKS.references_to(args[0]):
+            name = LINKS.entity(source).get("name", "?")
+            print(f"{source}  {field:<24} {name}")
+    elif cmd == "tree" and args:
+        for depth, node_id in LINKS.walk_tree(args[0]):
+            entity = LINKS.entity(node_id) or {}
+            print(f"{'  ' * depth}{node_id}  {entity.get('name', '(missing)')}")
+    elif cmd == "dangling":
+        for source, field, target in LINKS.dangling():
+            print(f"{source}.{field} -> {target}")
+    elif cmd == "export":
+        out = args[0] if args else "link_graph.json"
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(LINKS.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"Wrote {out}")
+    else:
+        print(__doc__.strip())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,12 +1,25 @@
 """
 Monster Merger Script
 Converts monsters from /monsters/*.json to main monsters.json format
+
+Source files are hashed into a manifest under .vault_cache/, so files that
+haven't changed since the last merge are skipped without being parsed.
 """
 
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 
+from vault_ids import IdAllocator
+from vault_render import Renderer, monster_stat_line
+from vault_schema import validate_source_file
+from vault_store import VaultStore, cache_path
+
+RENDER = Renderer()
+
+
 def convert_monster(monster, index):
     """Convert monster from source format to vault format"""
     
@@ -77,25 +90,18 @@ def convert_monster(monster, index):
     special = monster.get('special', [])
     special_str = "\n".join([f"▶ {s}" for s in special]) if special else ""
     
-    # Generate stat line
+    # Remaining stats
     hd = monster.get('hd', '1')
     hp = monster.get('hp_avg', 4)
     morale = monster.get('morale', 7)
     alignment = monster.get('alignment', 'Neutral')
     xp = monster.get('xp', 10)
     tt = monster.get('treasure_type', 'None')
-    
-    stat_line = f"AC {ac_str}, HD {hd} ({hp}hp), Att {attacks_str}, THAC0 {thac0_str}, MV {movement_str}, SV {saves_str}, ML {morale}, AL {alignment}, XP {xp}, NA {na_str}, TT {tt}"
-    
-    # Generate paste block
     name = monster.get('name', 'Unknown')
     description = monster.get('description', '')
-    paste_block = f"**{name}**\n\n{description}\n\n{stat_line}"
-    if special_str:
-        paste_block += f"\n\n{special_str}"
     
     # Build converted monster
-    return {
+    converted = {
         "id": f"monster-{index:04d}",
         "name": name,
         "description": description,
@@ -112,71 +118,121 @@ def convert_monster(monster, index):
         "number_appearing": na_str,
         "treasure_type": tt,
         "special_abilities": special_str,
-        "stat_line": stat_line,
+        "stat_line": "",
         "created_on": str(date.today()),
         "source": "OSE",
         "tags": monster.get('tags', []),
-        "paste_block": paste_block
+        "paste_block": ""
     }
+    
+    # Generate stat line and paste block from the shared templates
+    converted["stat_line"] = monster_stat_line(converted)
+    RENDER.bake("monsters", converted)
+    return converted
+
+def file_digest(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def convert_file(filepath):
+    """Parse, validate and convert one source file (IDs assigned later).
+
+    Returns (problems, [(source_name, converted)]).
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    problems = validate_source_file(data, os.path.basename(filepath))
+    return problems, [(m.get('name', ''), convert_monster(m, 0)) for m in data.get('monsters', [])]
+
+
+def convert_files(filepaths):
+    """Yield (filepath, converted) per file, in a process pool when there are several."""
+    if len(filepaths) < 2:
+        for filepath in filepaths:
+            yield filepath, convert_file(filepath)
+        return
+    with ProcessPoolExecutor() as pool:
+        yield from zip(filepaths, pool.map(convert_file, filepaths))
+
 
-def main():
-    monsters_dir = os.path.join(os.path.dirname(__file__), 'monsters')
-    output_file = os.path.join(os.path.dirname(__file__), 'monsters.json')
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main(base_dir=None):
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    monsters_dir = os.path.join(base_dir, 'monsters')
+    output_file = os.path.join(base_dir, 'monsters.json')
+    manifest_file = cache_path(output_file, 'monsters-manifest.json')
+    store = VaultStore()
     
-    # Load existing monsters
-    existing = []
-    if os.path.exists(output_file):
-        with open(output_file, 'r', encoding='utf-8') as f:
-            existing = json.load(f)
+    # Load existing monsters (including any not yet compacted from the change log)
+    existing = store.load(output_file)
     
     # Get existing names to avoid duplicates
     existing_names = {m['name'].lower() for m in existing}
     print(f"Found {len(existing)} existing monsters")
     
-    # Find next ID
-    max_id = 0
-    for m in existing:
-        try:
-            num = int(m['id'].split('-')[1])
-            max_id = max(max_id, num)
-        except:
-            pass
+    # Skip source files whose content hasn't changed since the last merge,
+    # unless monsters.json itself was changed behind our back
+    manifest = load_manifest(manifest_file)
+    output_digest = file_digest(output_file) if os.path.exists(output_file) else None
+    known = manifest.get('files', {}) if manifest.get('output') == output_digest else {}
     
-    next_id = max_id + 1
-    new_count = 0
-    
-    # Process all monster files
+    digests = {}
+    changed = []
     for filename in sorted(os.listdir(monsters_dir)):
         if not filename.endswith('.json'):
             continue
-        
         filepath = os.path.join(monsters_dir, filename)
-        print(f"Processing {filename}...")
-        
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        monsters = data.get('monsters', [])
-        
-        for monster in monsters:
-            name = monster.get('name', '').lower()
+        digests[filename] = file_digest(filepath)
+        if known.get(filename) == digests[filename]:
+            continue
+        changed.append(filepath)
+    
+    if not changed:
+        print("No source files changed.")
+        return
+    
+    new_monsters = []
+    
+    # Process changed monster files
+    for filepath, (problems, converted) in convert_files(changed):
+        print(f"Processing {os.path.basename(filepath)}...")
+        for path, message in problems:
+            print(f"  ⚠️ {path}: {message} (defaults used)")
+        for source_name, monster in converted:
+            name = source_name.lower()
             if name in existing_names:
-                print(f"  Skipping {monster['name']} (already exists)")
+                print(f"  Skipping {source_name} (already exists)")
                 continue
             
-            converted = convert_monster(monster, next_id)
-            existing.append(converted)
+            new_monsters.append(monster)
             existing_names.add(name)
-            next_id += 1
-            new_count += 1
-            print(f"  Added {monster['name']}")
-    
-    # Sort by name
-    existing.sort(key=lambda m: m['name'].lower())
+            print(f"  Added {source_name}")
+    
+    new_count = len(new_monsters)
+    if new_count:
+        # Assign IDs in one allocation
+        ids = IdAllocator(store).allocate(output_file, "monster-", new_count)
+        for monster, monster_id in zip(new_monsters, ids):
+            monster['id'] = monster_id
+        existing.extend(new_monsters)
+        
+        # Sort by name
+        existing.sort(key=lambda m: m['name'].lower())
+        
+        # Save
+        store.save(output_file, existing, indent=4)
+        output_digest = file_digest(output_file)
     
-    # Save
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(existing, f, indent=4, ensure_ascii=False)
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({'output': output_digest, 'files': digests}, f, indent=2)
     
     print(f"\n✅ Done! Added {new_count} new monsters. Total: {len(existing)}")
 
@@ -0,0 +1,196 @@
+"""
+Monster Stats
+Typed, columnar view of the bestiary for numeric filtering.
+
+Vault monsters keep their stats as display strings (`"ac": "2 [17]"`,
+`"movement": "120' (40'), fly 180' (60')"`). This module parses them once into
+one `array('d')` per stat (NaN where a stat is missing, so it never matches a
+range) and small integer codes for categorical fields. Filters then work
+column at a time over a shrinking selection of row numbers, instead of
+re-parsing every record per query.
+
+    view = stats_view(STORE, MONSTERS_PATH)
+    view.select(hd=(3, 5), aac=(15, None), alignment="Chaotic")
+"""
+
+import math
+import re
+from array import array
+
+NUMERIC = (
+    "ac", "aac", "hd", "hd_mod", "hd_stars", "hp", "thac0", "attack_bonus",
+    "morale", "xp", "mv", "mv_encounter", "fly", "swim", "burrow",
+)
+CATEGORICAL = ("alignment", "treasure_type")
+
+NAN = float("nan")
+
+AC_RE = re.compile(r"^\s*(-?\d+)\s*\[(-?\d+)\]")
+THAC0_RE = re.compile(r"^\s*(\d+)\s*\[([+-]?\d+)\]")
+HD_RE = re.compile(r"^\s*(\d+(?:/\d+)?)\s*([+-]\d+)?\s*(\**)")
+MV_RE = re.compile(r"^\s*(\d+)'\s*\((\d+)'\)")
+SPECIAL_MV_RE = re.compile(r"\b(fly|swim|burrow)\s+(\d+)'")
+NUMBER_RE = re.compile(r"-?\d[\d,]*")
+
+
+# ---------- PARSING ----------
+
+def number(value):
+    """First number in a value (`"1,200"` -> 1200.0), or NaN."""
+    if isinstance(value, bool) or value is None:
+        return NAN
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER_RE.search(str(value))
+    return float(match.group().replace(",", "")) if match else NAN
+
+
+def parse_hd(value):
+    """`"3+1**"` -> (3, 1, 2); `"1/2"` -> (0.5, 0, 0). Ranges use the low end."""
+    match = HD_RE.match(str(value or ""))
+    if not match:
+        return NAN, NAN, NAN
+    dice, mod, stars = match.groups()
+    if "/" in dice:
+        top, bottom = dice.split("/")
+        dice = int(top) / int(bottom)
+    return float(dice), float(mod or 0), float(len(stars))
+
+
+def parse_movement(text):
+    """`"120' (40'), fly 180' (60')"` -> {"mv": 120, "mv_encounter": 40, "fly": 180}."""
+    row = {}
+    match = MV_RE.match(text or "")
+    if match:
+        row["mv"], row["mv_encounter"] = float(match.group(1)), float(match.group(2))
+    for mode, speed in SPECIAL_MV_RE.findall(text or ""):
+        row[mode] = float(speed)
+    return row
+
+
+def vault_row(monster):
+    """Typed stats from a vault monster (the output of merge_monsters.convert_monster)."""
+    row = {}
+    match = AC_RE.match(str(monster.get("ac") or ""))
+    if match:
+        row["ac"], row["aac"] = float(match.group(1)), float(match.group(2))
+    row["hd"], row["hd_mod"], row["hd_stars"] = parse_hd(monster.get("hd"))
+    match = THAC0_RE.match(str(monster.get("thac0") or ""))
+    if match:
+        row["thac0"], row["attack_bonus"] = float(match.group(1)), float(match.group(2))
+    row.update(parse_movement(monster.get("movement")))
+    for field in ("hp", "morale", "xp"):
+        row[field] = number(monster.get(field))
+    for field in CATEGORICAL:
+        row[field] = monster.get(field)
+    return row
+
+
+def source_row(monster):
+    """Typed stats from a `monsters/*.json` source record (already numeric)."""
+    row = {field: number(monster.get(field)) for field in ("ac", "aac", "thac0", "attack_bonus", "morale", "xp")}
+    row["hd"], row["hd_mod"], row["hd_stars"] = parse_hd(monster.get("hd"))
+    row["hp"] = number(monster.get("hp_avg"))
+    mv = monster.get("mv") if isinstance(monster.get("mv"), dict) else {}
+    row["mv"], row["mv_encounter"] = number(mv.get("base")), number(mv.get("encounter"))
+    for mode in ("fly", "swim", "burrow"):
+        row[mode] = number(mv.get(mode))
+    for field in CATEGORICAL:
+        row[field] = monster.get(field)
+    return row
+
+
+# ---------- COLUMNAR VIEW ----------
+
+class MonsterStats:
+    """Parallel typed columns, one row per monster, in collection order."""
+
+    def __init__(self):
+        self.records = []
+        self.columns = {name: array("d") for name in NUMERIC}
+        self.codes = {name: array("H") for name in CATEGORICAL}
+        self.labels = {name: [] for name in CATEGORICAL}
+        self._code_of = {name: {} for name in CATEGORICAL}
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record, row):
+        self.records.append(record)
+        for name, column in self.columns.items():
+            value = row.get(name)
+            column.append(NAN if value is None else value)
+        for name, column in self.codes.items():
+            column.append(self.code(name, row.get(name)))
+
+    def code(self, name, label):
+        codes = self._code_of[name]
+        if label not in codes:
+            codes[label] = len(self.labels[name])
+            self.labels[name].append(label)
+        return codes[label]
+
+    @classmethod
+    def from_entries(cls, entries):
+        view = cls()
+        for monster in entries:
+            view.add(monster, vault_row(monster))
+        return view
+
+    @classmethod
+    def from_sources(cls, sources):
+        view = cls()
+        for monster in sources:
+            view.add(monster, source_row(monster))
+        return view
+
+    # ---------- FILTERING ----------
+
+    def rows(self, **criteria):
+        """Row numbers matching every criterion, in collection order.
+
+        Numeric criteria are `(low, high)` with None for an open end, or a
+        single value for equality. Categorical criteria are a label or a
+        collection of labels (case-insensitive).
+        """
+        selected = None
+        # Categorical codes first: cheap set membership that usually cuts deepest.
+        for name in sorted(criteria, key=lambda n: n not in self.codes):
+            want = criteria[name]
+            if name in self.codes:
+                labels = [want] if isinstance(want, str) else list(want)
+                lowered = {str(label).lower() for label in labels}
+                wanted = {c for label, c in self._code_of[name].items() if str(label).lower() in lowered}
+                column = self.codes[name]
+                if selected is None:
+                    selected = [i for i, c in enumerate(column) if c in wanted]
+                else:
+                    selected = [i for i in selected if column[i] in wanted]
+            elif name in self.columns:
+                low, high = want if isinstance(want, (tuple, list)) else (want, want)
+                low = -math.inf if low is None else low
+                high = math.inf if high is None else high
+                column = self.columns[name]
+                if selected is None:
+                    selected = [i for i, v in enumerate(column) if low <= v <= high]
+                else:
+                    selected = [i for i in selected if low <= column[i] <= high]
+            else:
+                raise KeyError(f"Unknown monster stat: {name}")
+            if not selected:
+                return []
+        return list(range(len(self.records))) if selected is None else selected
+
+    def select(self, **criteria):
+        """Records matching every criterion (see `rows`)."""
+        return [self.records[i] for i in self.rows(**criteria)]
+
+    def value(self, name, row):
+        if name in self.codes:
+            return self.labels[name][self.codes[name][row]]
+        return self.columns[name][row]
+
+
+def stats_view(store, path):
+    """Columnar view of a monster collection, rebuilt only when it changes."""
+    return store.collection(path).derived("monster_stats", lambda c: MonsterStats.from_entries(c.entries))
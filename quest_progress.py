@@ -0,0 +1,154 @@
+"""
+Quest Progress
+Materialized progress rollups, baked into each quest as `progress`:
+
+    "progress": {
+        "objectives": [1, 5],                  # own objectives complete / total
+        "percent": 20,
+        "sub_quests": {"Complete": 1, "In Progress": 4, "Not Started": 3},
+        "tree": [4, 19],                       # whole sub-quest tree, this quest included
+        "tree_percent": 21
+    }
+
+A quest's children are its `sub_quests` plus any quest naming it as
+`parent_quest`. Rollups are kept current on write: `record()` recomputes the
+written quest and then only its ancestors, each from its children's stored
+rollups, and appends just the quests whose numbers changed. `refresh()`
+re-bakes everything after hand edits. The CLI overview, the web dashboard
+and the quest graph read these numbers instead of recounting.
+"""
+
+STATUSES = ("Complete", "In Progress", "Not Started")
+
+
+def own_counts(quest):
+    """(complete, total) objectives; a Complete quest counts as fully done.
+
+    A quest without objectives is one unit, done when its status is Complete.
+    """
+    objectives = [o for o in quest.get("objectives") or [] if isinstance(o, dict)]
+    total = len(objectives) or 1
+    if quest.get("status") == "Complete":
+        return total, total
+    if not objectives:
+        return 0, 1
+    return sum(1 for o in objectives if o.get("status") == "complete"), total
+
+
+def percent(done, total):
+    return round(100 * done / total) if total else 0
+
+
+def build_tree(quests):
+    """(children, parents): id -> [ids], from `sub_quests` and `parent_quest` alike."""
+    ids = {q["id"] for q in quests if q.get("id")}
+    children, parents = {}, {}
+
+    def link(parent, child):
+        if parent in ids and child in ids and parent != child and child not in children.setdefault(parent, []):
+            children[parent].append(child)
+            parents.setdefault(child, []).append(parent)
+
+    for q in quests:
+        for child in q.get("sub_quests") or []:
+            link(q.get("id"), child)
+        if q.get("parent_quest"):
+            link(q["parent_quest"], q.get("id"))
+    return children, parents
+
+
+def rollup(quest, kids):
+    """Progress for `quest` given its children's quests (whose `progress` is current)."""
+    done, total = own_counts(quest)
+    statuses = dict.fromkeys(STATUSES, 0)
+    tree_done, tree_total = done, total
+    for kid in kids:
+        status = kid.get("status") or "Not Started"
+        statuses[status] = statuses.get(status, 0) + 1
+        kid_done, kid_total = (kid.get("progress") or {}).get("tree") or own_counts(kid)
+        tree_done += kid_done
+        tree_total += kid_total
+    return {
+        "objectives": [done, total],
+        "percent": percent(done, total),
+        "sub_quests": statuses,
+        "tree": [tree_done, tree_total],
+        "tree_percent": percent(tree_done, tree_total),
+    }
+
+
+def refresh(quests):
+    """Re-bake every quest's `progress`, children before parents. Returns the number changed."""
+    by_id = {q["id"]: q for q in quests if q.get("id")}
+    children, _ = build_tree(quests)
+    done, changed = set(), 0
+
+    def visit(quest_id, path):
+        nonlocal changed
+        if quest_id in done or quest_id in path:  # a cycle counts each quest once
+            return
+        path.add(quest_id)
+        for kid in children.get(quest_id, ()):
+            visit(kid, path)
+        path.discard(quest_id)
+        quest = by_id[quest_id]
+        kids = [by_id[k] for k in children.get(quest_id, ()) if k in done]
+        progress = rollup(quest, kids)
+        if quest.get("progress") != progress:
+            quest["progress"] = progress
+            changed += 1
+        done.add(quest_id)
+
+    for quest_id in by_id:
+        visit(quest_id, set())
+    return changed
+
+
+def quest_tree(store, path):
+    """(children, parents) for the quests at `path`, cached until the collection changes."""
+    return store.collection(path).derived("quest_tree", lambda c: build_tree(c.entries))
+
+
+def record(store, path, quest):
+    """Write one quest with fresh rollups, then update just its ancestors.
+
+    Returns the ids appended (the quest itself plus any ancestor whose
+    numbers moved).
+    """
+    children, parents = quest_tree(store, path)
+    old_parents = list(parents.get(quest["id"], ()))
+    old = store.get(path, quest["id"])
+    if old is None or any(old.get(f) != quest.get(f) for f in ("sub_quests", "parent_quest")):
+        # Links changed: use the tree as it will be once this quest is written.
+        others = [q for q in store.load(path) if q.get("id") != quest["id"]]
+        children, parents = build_tree(others + [quest])
+    current = {quest["id"]: quest}
+
+    def lookup(quest_id):
+        return current.get(quest_id) or store.get(path, quest_id)
+
+    def kids_of(quest_id):
+        return [k for k in map(lookup, children.get(quest_id, ())) if k]
+
+    quest["progress"] = rollup(quest, kids_of(quest["id"]))
+    written = [quest]
+    # Former parents lose this quest from their counts, so they are revisited too.
+    pending, seen = list(parents.get(quest["id"], ())) + old_parents, {quest["id"]}
+    while pending:
+        parent_id = pending.pop(0)
+        if parent_id in seen:
+            continue
+        seen.add(parent_id)
+        parent = lookup(parent_id)
+        if parent is None:
+            continue
+        progress = rollup(parent, kids_of(parent_id))
+        if parent.get("progress") == progress:
+            continue  # unchanged here, so nothing above moves either
+        parent = dict(parent, progress=progress)
+        current[parent_id] = parent
+        written.append(parent)
+        pending += parents.get(parent_id, ())
+    for entry in written:
+        store.append(path, entry)
+    return [q["id"] for q in written]
@@ -0,0 +1,447 @@
+"""
+Search Index
+Inverted full-text index over each collection, shared by every search menu.
+
+Fields are tokenized and case-folded per collection and weighted so that
+name matches outrank tags, which outrank descriptions. Bare words match as
+prefixes ("pipe" finds "pipeleaf"), quoted words match as a phrase, and all
+terms must match. A bare word carrying symbols ("+1", "1d6+1") must also
+appear literally, so "+1" doesn't find every entry mentioning a 1. Indexes are persisted under `.vault_cache/` and re-indexed
+per entry when a collection changes.
+
+Name and tag words also feed a character-trigram index, the typo-tolerant
+fallback behind "did you mean": trigrams narrow the vocabulary to a few
+candidates, and only those are scored by (bounded) edit distance.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+from bisect import bisect_left
+
+from vault_store import cache_path, collection_name
+
+INDEX_VERSION = 3
+
+NAME, TAGS, SHORT, TEXT = 8, 4, 2, 1
+
+DEFAULT_FIELDS = [
+    ("name", NAME),
+    ("tags", TAGS),
+    ("owner", SHORT),
+    ("location", SHORT),
+    ("description", TEXT),
+    ("rules", TEXT),
+    ("stat_block", TEXT),
+    ("notes", TEXT),
+]
+
+SEARCH_FIELDS = {
+    "items": DEFAULT_FIELDS + [("category", SHORT), ("rarity", SHORT)],
+    "monsters": DEFAULT_FIELDS,
+    "shops": DEFAULT_FIELDS + [("type", SHORT)],
+    "characters": [
+        ("name", NAME),
+        ("tags", TAGS),
+        ("type", SHORT),
+        ("race_class", SHORT),
+        ("appearance", TEXT),
+        ("personality", TEXT),
+        ("special_notes", TEXT),
+    ],
+    "quests": [
+        ("name", NAME),
+        ("tags", TAGS),
+        ("themes", TAGS),
+        ("type", SHORT),
+        ("emotion", SHORT),
+        ("biome", SHORT),
+        ("description", TEXT),
+    ],
+}
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+# Symbols that make a bare query word literal; apostrophes and sentence punctuation don't.
+SYMBOL_RE = re.compile(r"[^\w\s'’]")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+def field_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return " ".join(field_text(v) for v in value)
+    return str(value)
+
+
+def parse_query(query):
+    """Split a query into ("prefix", token), ("exact", token), ("phrase", [tokens])
+    and ("literal", text) terms; a literal is a substring check on the raw text."""
+    terms = []
+    for phrase, word in QUERY_RE.findall(query):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) == 1:
+                terms.append(("exact", tokens[0]))
+            elif tokens:
+                terms.append(("phrase", tokens))
+        else:
+            tokens = tokenize(word)
+            terms.extend(("prefix", t) for t in tokens)
+            core = word.strip(".,;:!?()").casefold()
+            if tokens and SYMBOL_RE.search(core):
+                terms.append(("literal", core))
+    return terms
+
+
+def trigrams(word):
+    """Padded character trigrams: "owl" -> {"  o", " ow", "owl", "wl "}."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(word):
+    """How many typos a word of this length may carry and still match."""
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 6 else 2
+
+
+def edit_distance(a, b, limit):
+    """Edits (insert, delete, substitute, swap neighbours) from a to b.
+
+    Gives up early and returns limit + 1 once every path costs more than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1]
+
+
+class TrigramIndex:
+    """Vocabulary word -> {doc_id: weight}, plus trigram -> words for fuzzy lookup."""
+
+    def __init__(self):
+        self.words = {}
+        self.grams = {}
+
+    def add(self, doc_id, weights):
+        for word, weight in weights.items():
+            docs = self.words.get(word)
+            if docs is None:
+                docs = self.words[word] = {}
+                for g in trigrams(word):
+                    self.grams.setdefault(g, set()).add(word)
+            docs[doc_id] = weight
+
+    def remove(self, doc_id, words):
+        for word in words:
+            docs = self.words.get(word)
+            if docs is None or docs.pop(doc_id, None) is None or docs:
+                continue
+            del self.words[word]
+            for g in trigrams(word):
+                bucket = self.grams[g]
+                bucket.discard(word)
+                if not bucket:
+                    del self.grams[g]
+
+    def candidates(self, token, limit):
+        """[(distance, word)] for vocabulary words within `limit` edits, closest first."""
+        if token in self.words:
+            return [(0, token)]
+        if not limit:
+            return []
+        grams = trigrams(token)
+        shared = {}
+        for g in grams:
+            for word in self.grams.get(g, ()):
+                shared[word] = shared.get(word, 0) + 1
+        # One edit changes at most three trigrams.
+        need = max(1, len(grams) - 3 * limit)
+        found = []
+        for word, count in shared.items():
+            if count >= need:
+                dist = edit_distance(token, word, limit)
+                if dist <= limit:
+                    found.append((dist, word))
+        # Closest first, then the word used by the most entries.
+        found.sort(key=lambda dw: (dw[0], -len(self.words[dw[1]]), dw[1]))
+        return found
+
+
+class CollectionIndex:
+    """Postings for one collection: token -> {doc_id: weight}."""
+
+    def __init__(self, fields):
+        self.version = INDEX_VERSION
+        self.fields = fields
+        self.stamp = None
+        self.docs = {}
+        self.postings = {}
+        self.order = {}
+        self.fuzzy = TrigramIndex()
+        self._terms = None
+
+    def fingerprint(self, entry):
+        values = [entry.get(f) for f, _ in self.fields]
+        raw = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def add(self, doc_id, entry, fp):
+        weights = {}
+        fuzzy = {}
+        texts = []
+        raw = []
+        for field, weight in self.fields:
+            text = field_text(entry.get(field))
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            texts.append(" ".join(tokens))
+            raw.append(text.casefold())
+            for t in tokens:
+                if weights.get(t, 0) < weight:
+                    weights[t] = weight
+            if weight >= TAGS:
+                # "owl bear" is also findable as "owlbear" (or a typo of it)
+                for word in tokens + [a + b for a, b in zip(tokens, tokens[1:])]:
+                    if fuzzy.get(word, 0) < weight:
+                        fuzzy[word] = weight
+        for t, weight in weights.items():
+            self.postings.setdefault(t, {})[doc_id] = weight
+        self.docs[doc_id] = {"fp": fp, "text": " | ".join(texts), "raw": " | ".join(raw),
+                             "tokens": list(weights), "fuzzy": list(fuzzy)}
+        self.fuzzy.add(doc_id, fuzzy)
+        self._terms = None
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.fuzzy.remove(doc_id, doc["fuzzy"])
+        for t in doc["tokens"]:
+            posting = self.postings.get(t)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[t]
+        self._terms = None
+
+    def sync(self, entries, stamp):
+        """Re-index only entries that were added, changed or removed.
+
+        Returns False if the collection is unchanged since the last sync.
+        """
+        if stamp == self.stamp:
+            return False
+        seen = set()
+        for entry in entries:
+            doc_id = entry.get("id")
+            if doc_id is not None:
+                seen.add(doc_id)
+                self.reindex(doc_id, entry)
+        for doc_id in [d for d in self.docs if d not in seen]:
+            self.remove(doc_id)
+        self.order = {e.get("id"): i for i, e in enumerate(entries)}
+        self.stamp = stamp
+        return True
+
+    def reindex(self, doc_id, entry):
+        fp = self.fingerprint(entry)
+        doc = self.docs.get(doc_id)
+        if doc is None or doc["fp"] != fp:
+            self.remove(doc_id)
+            self.add(doc_id, entry, fp)
+
+    def update(self, entries, stamp):
+        """Re-index just `entries` (ones put since the last sync); new IDs go last."""
+        for entry in entries:
+            doc_id = entry.get("id")
+            if doc_id is not None:
+                self.reindex(doc_id, entry)
+                self.order.setdefault(doc_id, len(self.order))
+        self.stamp = stamp
+
+    def terms(self):
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        return self._terms
+
+    def prefix_matches(self, prefix):
+        """Merge the postings of every token starting with `prefix`."""
+        terms = self.terms()
+        scores = {}
+        i = bisect_left(terms, prefix)
+        while i < len(terms) and terms[i].startswith(prefix):
+            for doc_id, weight in self.postings[terms[i]].items():
+                if scores.get(doc_id, 0) < weight:
+                    scores[doc_id] = weight
+            i += 1
+        return scores
+
+    def phrase_matches(self, tokens):
+        scores = None
+        for t in tokens:
+            posting = self.postings.get(t, {})
+            if scores is None:
+                scores = dict(posting)
+            else:
+                scores = {d: s + posting[d] for d, s in scores.items() if d in posting}
+        needle = " " + " ".join(tokens) + " "
+        return {
+            d: s for d, s in (scores or {}).items()
+            if needle in " " + self.docs[d]["text"] + " "
+        }
+
+    def query(self, query):
+        """Return [(doc_id, score)] for docs matching every term.
+
+        Ranked by score, ties kept in collection order.
+        """
+        total = None
+        for kind, term in parse_query(query):
+            if kind == "literal":
+                # Confirms the token hits so far; never the only term.
+                total = {d: s for d, s in (total or {}).items() if term in self.docs[d]["raw"]}
+                if not total:
+                    return []
+                continue
+            if kind == "prefix":
+                scores = self.prefix_matches(term)
+            elif kind == "exact":
+                scores = dict(self.postings.get(term, {}))
+            else:
+                scores = self.phrase_matches(term)
+            if total is None:
+                total = scores
+            else:
+                total = {d: s + scores[d] for d, s in total.items() if d in scores}
+            if not total:
+                return []
+        order = self.order
+        return sorted((total or {}).items(), key=lambda kv: (-kv[1], order.get(kv[0], 0)))
+
+    def fuzzy_query(self, query):
+        """Typo-tolerant match on names and tags: (suggestion, [(doc_id, score)]).
+
+        Every query word is matched to vocabulary words within a few edits;
+        closer words score higher. `suggestion` is the query rewritten with
+        the closest words, or None if nothing changed or nothing matched.
+        """
+        tokens = []
+        for kind, term in parse_query(query):
+            if kind != "literal":
+                tokens.extend(term if kind == "phrase" else [term])
+        if not tokens:
+            return None, []
+        total = None
+        corrected = []
+        for token in tokens:
+            found = self.fuzzy.candidates(token, max_edits(token))
+            if not found:
+                return None, []
+            corrected.append(found[0][1])
+            scores = {}
+            for dist, word in found:
+                for doc_id, weight in self.fuzzy.words[word].items():
+                    score = weight / (1 + dist)
+                    if scores.get(doc_id, 0) < score:
+                        scores[doc_id] = score
+            total = scores if total is None else {d: s + scores[d] for d, s in total.items() if d in scores}
+            if not total:
+                return None, []
+        suggestion = " ".join(corrected)
+        if suggestion == " ".join(tokens):
+            suggestion = None
+        order = self.order
+        return suggestion, sorted(total.items(), key=lambda kv: (-kv[1], order.get(kv[0], 0)))
+
+
+class SearchEngine:
+    """Keeps a CollectionIndex per collection file in sync with a VaultStore."""
+
+    def __init__(self, store, persist=True):
+        self.store = store
+        self.persist = persist
+        self._indexes = {}
+        # path -> (collection, len(collection.changes)) as of the last sync
+        self._synced = {}
+
+    def index(self, path):
+        coll = self.store.collection(path)
+        idx = self._indexes.get(coll.path)
+        if idx is None:
+            idx = self._load(coll.path)
+            self._indexes[coll.path] = idx
+        synced, seen = self._synced.get(coll.path, (None, 0))
+        if synced is coll:
+            if len(coll.changes) > seen:
+                # Only entries added or replaced through the store changed. The
+                # on-disk copy catches up with a full sync in the next process.
+                ids = dict.fromkeys(coll.changes[seen:])
+                idx.update([coll.by_id[i] for i in ids if i in coll.by_id], coll.stamp)
+        elif idx.sync(coll.entries, coll.stamp) and self.persist:
+            self._save(coll.path, idx)
+        self._synced[coll.path] = (coll, len(coll.changes))
+        return idx
+
+    def search(self, path, query):
+        """Return matching entries from the collection at `path`, ranked."""
+        coll = self.store.collection(path)
+        hits = self.index(path).query(query)
+        return [coll.by_id[d] for d, _ in hits if d in coll.by_id]
+
+    def fuzzy(self, path, query):
+        """(suggestion, entries) for a query the exact search found nothing for."""
+        coll = self.store.collection(path)
+        suggestion, hits = self.index(path).fuzzy_query(query)
+        return suggestion, [coll.by_id[d] for d, _ in hits if d in coll.by_id]
+
+    def _fields(self, path):
+        return SEARCH_FIELDS.get(collection_name(path), DEFAULT_FIELDS)
+
+    def _cache_file(self, path):
+        return cache_path(path, f"search-{collection_name(path)}.pickle")
+
+    def _load(self, path):
+        fields = self._fields(path)
+        if self.persist:
+            try:
+                with open(self._cache_file(path), "rb") as f:
+                    idx = pickle.load(f)
+                if idx.version == INDEX_VERSION and idx.fields == fields:
+                    return idx
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                pass
+        return CollectionIndex(fields)
+
+    def _save(self, path, idx):
+        target = self._cache_file(path)
+        tmp = target + ".tmp"
+        terms, idx._terms = idx._terms, None
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(idx, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, target)
+        except OSError:
+            pass
+        finally:
+            idx._terms = terms
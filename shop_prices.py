@@ -0,0 +1,175 @@
+"""
+Shop Prices
+Shop menu prices normalized to copper, and a cross-shop index over them.
+
+Every list of priced lines in a shop (`inventory`, `growler_menu`,
+`oddments_menu`, `secret_items`, ...) is parsed once per load of
+`shops.json`:
+
+    "2 sp"          ->  20 cp
+    "15 gp/tin"     ->  1500 cp per tin
+    "2 gp (3 days)" ->  200 cp
+    "varies"        ->  unpriced (listed, never cheapest)
+
+The index keeps offers sorted by price, by item id, by name and by location,
+so "cheapest X", "everything under 5 gp here" and shopping-list totals are
+lookups and bisects rather than walks over every shop's nested menus.
+"""
+
+import bisect
+import re
+
+COPPER = {"cp": 1, "sp": 10, "ep": 50, "gp": 100, "pp": 500}
+PRICE_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(cp|sp|ep|gp|pp)\b", re.IGNORECASE)
+UNIT_RE = re.compile(r"/\s*([A-Za-z][\w -]*)")
+
+
+def parse_price(text):
+    """`"15 gp/tin"` -> (1500, "tin"); no recognizable amount -> (None, None)."""
+    text = str(text or "")
+    amounts = PRICE_RE.findall(text)
+    if not amounts:
+        return None, None
+    copper = sum(float(n.replace(",", "")) * COPPER[coin.lower()] for n, coin in amounts)
+    unit = UNIT_RE.search(text)
+    return int(round(copper)), unit.group(1).strip() if unit else None
+
+
+def format_copper(copper):
+    """1250 -> "12 gp 5 sp"; None -> "?"."""
+    if copper is None:
+        return "?"
+    gp, rest = divmod(copper, 100)
+    sp, cp = divmod(rest, 10)
+    parts = [f"{n:,} {coin}" for n, coin in ((gp, "gp"), (sp, "sp"), (cp, "cp")) if n]
+    return " ".join(parts) or "0 cp"
+
+
+def name_key(text):
+    """Case, punctuation and a trailing "(Growler)" style note don't matter."""
+    text = re.sub(r"\s*\([^)]*\)\s*$", "", str(text or "")).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def priced_lines(shop):
+    """(menu, line) for every priced line in a shop, whatever the menu is called."""
+    for menu, value in shop.items():
+        if isinstance(value, list):
+            for line in value:
+                if isinstance(line, dict) and "price" in line and line.get("name"):
+                    yield menu, line
+
+
+def offer_order(offer):
+    # Unpriced offers sort last.
+    return (offer["copper"] is None, offer["copper"] or 0, offer["name"].lower())
+
+
+class PriceIndex:
+    """Every priced shop line, sorted by copper and bucketed for lookups."""
+
+    def __init__(self, shops):
+        offers = []
+        for shop in shops:
+            for menu, line in priced_lines(shop):
+                copper, unit = parse_price(line.get("price"))
+                offers.append({
+                    "name": line["name"],
+                    "item_id": line.get("item_id"),
+                    "shop_id": shop.get("id"),
+                    "shop": shop.get("name", "?"),
+                    "location": shop.get("location", ""),
+                    "menu": menu,
+                    "price": line.get("price"),
+                    "copper": copper,
+                    "unit": unit,
+                })
+        offers.sort(key=offer_order)
+        self.offers = offers
+        self.by_item = {}
+        self.by_name = {}
+        self.by_location = {}
+        for offer in offers:
+            if offer["item_id"]:
+                self.by_item.setdefault(offer["item_id"], []).append(offer)
+            self.by_name.setdefault(name_key(offer["name"]), []).append(offer)
+            if offer["copper"] is not None:
+                self.by_location.setdefault(offer["location"], []).append(offer)
+        self.names = sorted(self.by_name)
+        # Parallel copper lists for bisecting "under N" queries.
+        self.priced = [o for o in offers if o["copper"] is not None]
+        self.coppers = [o["copper"] for o in self.priced]
+        self.location_coppers = {loc: [o["copper"] for o in group] for loc, group in self.by_location.items()}
+
+    def __len__(self):
+        return len(self.offers)
+
+    def offers_for(self, query, aliases=None):
+        """Offers for an item id or name, cheapest first.
+
+        `aliases` maps name keys to item ids (from items.json), so "Black Goat
+        Porter (Growler)" finds the growler menu line linked to its id. A name
+        with no exact match falls back to names containing it.
+        """
+        query = str(query or "").strip()
+        found = list(self.by_item.get(query, ()))
+        key = name_key(query)
+        found += self.by_name.get(key, ())
+        item_id = (aliases or {}).get(key)
+        if item_id:
+            found += self.by_item.get(item_id, ())
+        if not found and key:
+            for name in self.names:
+                if key in name:
+                    found += self.by_name[name]
+        unique = {id(o): o for o in found}
+        return sorted(unique.values(), key=offer_order)
+
+    def cheapest(self, query, aliases=None, location=None):
+        offers = [o for o in self.offers_for(query, aliases) if o["copper"] is not None]
+        if location:
+            offers = [o for o in offers if o["location"] in self.locations(location)]
+        return offers[0] if offers else None
+
+    def locations(self, text):
+        """Locations whose name contains `text` ("woodcutters" matches "Hex 1109 (Woodcutters' Encampment)")."""
+        key = name_key(text)
+        return [loc for loc in self.by_location if key in " ".join(re.findall(r"[a-z0-9]+", loc.lower()))]
+
+    def under(self, copper, location=None):
+        """Priced offers costing at most `copper`, cheapest first, optionally in matching locations."""
+        if not location:
+            return self.priced[:bisect.bisect_right(self.coppers, copper)]
+        out = []
+        for loc in self.locations(location):
+            end = bisect.bisect_right(self.location_coppers[loc], copper)
+            out += self.by_location[loc][:end]
+        return sorted(out, key=offer_order)
+
+    def basket(self, wanted, aliases=None, location=None):
+        """Cheapest cost of a shopping list [(query, quantity)].
+
+        Returns {"lines": [(query, quantity, offer)], "total": copper, "missing": [query]}.
+        """
+        lines, missing, total = [], [], 0
+        for query, quantity in wanted:
+            offer = self.cheapest(query, aliases, location)
+            if offer is None:
+                missing.append(query)
+                continue
+            lines.append((query, quantity, offer))
+            total += offer["copper"] * quantity
+        return {"lines": lines, "total": total, "missing": missing}
+
+
+def item_aliases(items):
+    return {name_key(i.get("name")): i["id"] for i in items if i.get("id") and i.get("name")}
+
+
+def price_index(store, shops_path):
+    """PriceIndex for the shops at `shops_path`, rebuilt only when the file changes."""
+    return store.collection(shops_path).derived("price_index", lambda c: PriceIndex(c.entries))
+
+
+def aliases_for(store, items_path):
+    return store.collection(items_path).derived("price_aliases", lambda c: item_aliases(c.entries))
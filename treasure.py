@@ -0,0 +1,322 @@
+"""
+Treasure
+OSE treasure types (A-V) compiled into reusable rollers, and magic items
+drawn from `items.json` weighted by rarity.
+
+    "E + 5000gp"  ->  type E plus a fixed 5000gp      (monster `treasure_type`)
+    "L, N, O"     ->  three types rolled together
+    "None"        ->  nothing
+
+Each type is compiled once: its percentage chances, `dice.compile`d amounts,
+the gem value alias table and the per-kind magic item alias tables. Rolls
+are batched: `roll(code, n)` makes one pass per component over all n hoards
+(one `roll_many` for the amounts, one alias `draw_many` for every gem or
+item in the batch), and `roll_groups()` rolls a whole dungeon level's worth
+of monsters with one batch per treasure type.
+"""
+
+import functools
+import random
+import re
+from collections import Counter
+
+import dice
+from encounter_tables import AliasTable
+
+COINS = ("cp", "sp", "ep", "gp", "pp")
+GP_RATE = {"cp": 0.01, "sp": 0.1, "ep": 0.5, "gp": 1, "pp": 5}
+
+# letter -> ((component, % chance, amount), ...); magic amounts are "N kind [+ N kind]".
+# Lair hoards are A-O; P-V are carried by each individual.
+TYPES = {
+    "A": (("cp", 25, "1d6x1000"), ("sp", 30, "1d6x1000"), ("ep", 20, "1d4x1000"), ("gp", 35, "2d6x1000"),
+          ("pp", 25, "1d2x1000"), ("gems", 50, "6d6"), ("jewellery", 50, "6d6"), ("magic", 30, "3 any")),
+    "B": (("cp", 50, "1d8x1000"), ("sp", 25, "1d6x1000"), ("ep", 25, "1d4x1000"), ("gp", 25, "1d3x1000"),
+          ("gems", 25, "1d6"), ("jewellery", 25, "1d6"), ("magic", 10, "1 weapon")),
+    "C": (("cp", 20, "1d12x1000"), ("sp", 30, "1d4x1000"), ("ep", 10, "1d4x1000"),
+          ("gems", 25, "1d4"), ("jewellery", 25, "1d4"), ("magic", 10, "2 any")),
+    "D": (("cp", 10, "1d8x1000"), ("sp", 15, "1d12x1000"), ("gp", 60, "1d6x1000"),
+          ("gems", 30, "1d8"), ("jewellery", 30, "1d8"), ("magic", 15, "2 any + 1 potion")),
+    "E": (("cp", 5, "1d10x1000"), ("sp", 30, "1d12x1000"), ("ep", 25, "1d4x1000"), ("gp", 25, "1d8x1000"),
+          ("gems", 10, "1d10"), ("jewellery", 10, "1d10"), ("magic", 25, "3 any + 1 scroll")),
+    "F": (("sp", 10, "1d10x1000"), ("ep", 20, "1d8x1000"), ("gp", 45, "1d12x1000"), ("pp", 30, "1d3x1000"),
+          ("gems", 20, "2d12"), ("jewellery", 10, "1d12"), ("magic", 30, "3 nonweapon + 1 potion + 1 scroll")),
+    "G": (("gp", 50, "1d4x10000"), ("pp", 50, "1d6x1000"),
+          ("gems", 25, "3d6"), ("jewellery", 25, "1d10"), ("magic", 35, "4 any + 1 scroll")),
+    "H": (("cp", 25, "3d8x1000"), ("sp", 50, "1d100x1000"), ("ep", 50, "1d4x10000"), ("gp", 50, "1d6x10000"),
+          ("pp", 25, "5d4x1000"), ("gems", 50, "1d100"), ("jewellery", 50, "1d4x10"),
+          ("magic", 15, "4 any + 1 potion + 1 scroll")),
+    "I": (("pp", 30, "1d8x1000"), ("gems", 50, "2d6"), ("jewellery", 50, "2d6"), ("magic", 15, "1 any")),
+    "J": (("cp", 25, "1d4x1000"), ("sp", 10, "1d3x1000")),
+    "K": (("sp", 30, "1d6x1000"), ("ep", 10, "1d2x1000")),
+    "L": (("gems", 50, "1d4"),),
+    "M": (("gp", 40, "2d4x1000"), ("pp", 50, "5d6x1000"), ("gems", 55, "5d4"), ("jewellery", 45, "2d6")),
+    "N": (("magic", 40, "2d4 potion"),),
+    "O": (("magic", 50, "1d4 scroll"),),
+    "P": (("cp", 100, "3d8"),),
+    "Q": (("sp", 100, "3d6"),),
+    "R": (("ep", 100, "2d6"),),
+    "S": (("gp", 100, "2d4"),),
+    "T": (("pp", 100, "1d6"),),
+    "U": (("cp", 10, "1d20"), ("sp", 10, "1d20"), ("gp", 5, "1d20"),
+          ("gems", 5, "1d4"), ("jewellery", 5, "1d4"), ("magic", 2, "1 any")),
+    "V": (("sp", 10, "1d20"), ("ep", 5, "1d20"), ("gp", 10, "1d20"), ("pp", 5, "1d20"),
+          ("gems", 10, "1d4"), ("jewellery", 10, "1d4"), ("magic", 5, "1 any")),
+}
+INDIVIDUAL = set("PQRSTUV")
+
+# Gem values (gp) and their d20 odds; jewellery is 3d6 x 100gp a piece.
+GEM_VALUES = ((10, 4), (50, 5), (100, 6), (500, 4), (1000, 1))
+JEWELLERY_VALUE = "3d6x100"
+
+# Rarity -> relative weight as a magic item; longest prefix wins ("very rare" before "rare").
+RARITY_WEIGHTS = {"common": 20, "uncommon": 6, "rare": 2, "very rare": 1, "legendary": 0.5}
+# Named one-offs never turn up in a random hoard.
+EXCLUDED_RARITY = ("unique", "artifact")
+
+# Words in an item's category or name that put it in a magic item kind.
+KIND_WORDS = {
+    "potion": ("potion", "consumable"),
+    "scroll": ("scroll",),
+    "weapon": ("weapon", "armor", "armour", "firearm", "sword", "shield"),
+}
+
+CODE_TOKEN = re.compile(r"^(?:([A-V])|(\d+)\s*(cp|sp|ep|gp|pp))$", re.IGNORECASE)
+
+
+def parse_code(text):
+    """`"E + 5000gp"` -> (("E",), {"gp": 5000}); "None" or blank -> ((), {})."""
+    text = re.sub(r"\(.*?\)", "", str(text or "")).strip()
+    if text.lower() in ("", "none", "nil", "-"):
+        return (), {}
+    letters, extra = [], {}
+    for token in re.split(r"[,+&]", text):
+        token = token.strip()
+        if not token:
+            continue
+        match = CODE_TOKEN.match(token)
+        if not match:
+            raise ValueError(f"Unknown treasure type {token!r} in {text!r}")
+        if match.group(1):
+            letters.append(match.group(1).upper())
+        else:
+            coin = match.group(3).lower()
+            extra[coin] = extra.get(coin, 0) + int(match.group(2))
+    return tuple(letters), extra
+
+
+def new_hoard():
+    hoard = dict.fromkeys(COINS, 0)
+    hoard.update(gems=[], jewellery=[], magic=[])
+    return hoard
+
+
+def merge(into, hoard):
+    for coin in COINS:
+        into[coin] += hoard[coin]
+    for key in ("gems", "jewellery", "magic"):
+        into[key].extend(hoard[key])
+    return into
+
+
+def gp_value(hoard):
+    """Coins, gems and jewellery in gp (magic items are priceless here)."""
+    coins = sum(hoard[c] * GP_RATE[c] for c in COINS)
+    return coins + sum(hoard["gems"]) + sum(hoard["jewellery"])
+
+
+def rarity_weight(rarity):
+    text = str(rarity or "common").lower()
+    if any(word in text for word in EXCLUDED_RARITY):
+        return 0
+    for name in sorted(RARITY_WEIGHTS, key=len, reverse=True):
+        if text.startswith(name):
+            return RARITY_WEIGHTS[name]
+    return RARITY_WEIGHTS["common"]
+
+
+def item_kinds(item):
+    text = f"{item.get('category', '')} {item.get('name', '')}".lower()
+    kinds = {kind for kind, words in KIND_WORDS.items() if any(w in text for w in words)}
+    if "weapon" not in kinds:
+        kinds.add("nonweapon")
+    return kinds
+
+
+class MagicPool:
+    """Alias tables over the item collection, one per magic item kind."""
+
+    def __init__(self, items):
+        chosen = [(item, rarity_weight(item.get("rarity"))) for item in items if item.get("id")]
+        chosen = [(item, w) for item, w in chosen if w > 0]
+        self.tables = {}
+        for kind in ("any", "potion", "scroll", "weapon", "nonweapon"):
+            pool = [(i, w) for i, w in chosen if kind == "any" or kind in item_kinds(i)]
+            if pool:
+                items, weights = zip(*pool)
+                self.tables[kind] = AliasTable(items, weights)
+
+    def draw_many(self, kind, k, rng):
+        """k items of a kind; a kind the vault has none of falls back to any item."""
+        table = self.tables.get(kind) or self.tables.get("any")
+        if table is None:
+            return [{"id": None, "name": f"magic item ({kind})", "rarity": None} for _ in range(k)]
+        return [{"id": i["id"], "name": i.get("name", "?"), "rarity": i.get("rarity")}
+                for i in table.draw_many(k, rng)]
+
+
+def pool_for(store, path):
+    """MagicPool for the items at `path`, cached until the collection changes."""
+    return store.collection(path).derived("treasure_pool", lambda c: MagicPool(c.entries))
+
+
+class TreasureType:
+    """One treasure type letter with its dice compiled."""
+
+    def __init__(self, letter, spec):
+        self.letter = letter
+        self.coins, self.gems, self.jewellery, self.magic = [], None, None, None
+        for part, chance, amount in spec:
+            if part == "magic":
+                kinds = []
+                for piece in amount.split("+"):
+                    count, kind = piece.split()
+                    kinds.append((dice.compile(count), kind))
+                self.magic = (chance / 100, kinds)
+            elif part in ("gems", "jewellery"):
+                setattr(self, part, (chance / 100, dice.compile(amount)))
+            else:
+                self.coins.append((part, chance / 100, dice.compile(amount)))
+
+    def roll_many(self, n, rng, pool=None):
+        """n independent hoards of this type."""
+        hoards = [new_hoard() for _ in range(n)]
+        for coin, chance, amount in self.coins:
+            hit = hits(n, chance, rng)
+            for i, value in zip(hit, amount.roll_many(len(hit), rng)):
+                hoards[i][coin] += value
+        for key, values in (("gems", gem_values), ("jewellery", jewellery_values)):
+            if getattr(self, key):
+                chance, amount = getattr(self, key)
+                hit = hits(n, chance, rng)
+                spread(hoards, key, hit, amount.roll_many(len(hit), rng), lambda k: values(k, rng))
+        if self.magic:
+            chance, kinds = self.magic
+            hit = hits(n, chance, rng)
+            pool = pool or MagicPool(())
+            for count, kind in kinds:
+                draw = lambda k, kind=kind: pool.draw_many(kind, k, rng)
+                spread(hoards, "magic", hit, count.roll_many(len(hit), rng), draw)
+        return hoards
+
+
+def hits(n, chance, rng):
+    """Indices of the n hoards that pass a percentage check."""
+    if chance >= 1:
+        return list(range(n))
+    return [i for i in range(n) if rng.random() < chance]
+
+
+def spread(hoards, key, hit, counts, draw):
+    """Draw every piece for the batch at once, then deal `counts[j]` to `hoards[hit[j]]`."""
+    pieces = draw(sum(counts))
+    pos = 0
+    for i, count in zip(hit, counts):
+        hoards[i][key].extend(pieces[pos:pos + count])
+        pos += count
+
+
+@functools.lru_cache(maxsize=None)
+def gem_table():
+    values, weights = zip(*GEM_VALUES)
+    return AliasTable(values, weights)
+
+
+def gem_values(k, rng):
+    return gem_table().draw_many(k, rng)
+
+
+def jewellery_values(k, rng):
+    return dice.compile(JEWELLERY_VALUE).roll_many(k, rng)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_type(letter):
+    if letter not in TYPES:
+        raise ValueError(f"Unknown treasure type {letter!r}")
+    return TreasureType(letter, TYPES[letter])
+
+
+def roll(code, n=1, pool=None, rng=None, seed=None):
+    """n hoards for a treasure code such as "E + 5000gp" or "L, N, O"."""
+    rng = rng or random.Random(seed)
+    letters, extra = parse_code(code)
+    hoards = [new_hoard() for _ in range(n)]
+    for letter in letters:
+        for hoard, rolled in zip(hoards, compile_type(letter).roll_many(n, rng, pool)):
+            merge(hoard, rolled)
+    for coin, amount in extra.items():
+        for hoard in hoards:
+            hoard[coin] += amount
+    return hoards
+
+
+def roll_groups(groups, pool=None, rng=None, seed=None, lair=True):
+    """Treasure for [(monster, count)]: [{"monster_id", "name", "count", "code", "hoard"}].
+
+    Lair types (A-O) and fixed coin amounts give one hoard per group when
+    `lair`; individual types (P-V) are rolled for every monster. All groups
+    needing a letter share one batch.
+    """
+    rng = rng or random.Random(seed)
+    results, wanted = [], {}
+    for g, (monster, count) in enumerate(groups):
+        code = monster.get("treasure_type")
+        letters, extra = parse_code(code)
+        hoard = new_hoard()
+        if lair:
+            for coin, amount in extra.items():
+                hoard[coin] += amount
+        for letter in letters:
+            if letter in INDIVIDUAL:
+                wanted.setdefault(letter, []).extend([g] * count)
+            elif lair:
+                wanted.setdefault(letter, []).append(g)
+        results.append({"monster_id": monster.get("id"), "name": monster.get("name", "?"),
+                        "count": count, "code": code, "hoard": hoard})
+    for letter, owners in wanted.items():
+        for g, rolled in zip(owners, compile_type(letter).roll_many(len(owners), rng, pool)):
+            merge(results[g]["hoard"], rolled)
+    return results
+
+
+def dungeon_level(table, rooms, pool=None, rng=None, seed=None):
+    """Stock `rooms` lairs from an encounter table and roll all their treasure in one batch."""
+    rng = rng or random.Random(seed)
+    encounters = table.roll(rooms, rng, lair=True)
+    by_id = {m["id"]: m for m in table.alias.items} if table.alias else {}
+    groups = [(by_id[e["monster_id"]], e["count"]) for e in encounters]
+    return roll_groups(groups, pool, rng)
+
+
+def describe(hoard, most=8):
+    """One line: "1,200 gp, 3,000 sp; 4 gems (610 gp); magic: 2 × Pipe of Mists"."""
+    parts = [", ".join(f"{hoard[c]:,} {c}" for c in reversed(COINS) if hoard[c])]
+    for key, label in (("gems", "gem"), ("jewellery", "jewellery")):
+        if hoard[key]:
+            plural = "s" if key == "gems" and len(hoard[key]) != 1 else ""
+            parts.append(f"{len(hoard[key]):,} {label}{plural} ({sum(hoard[key]):,} gp)")
+    if hoard["magic"]:
+        counts = Counter(m["name"] for m in hoard["magic"]).most_common()
+        names = [f"{n} × {name}" if n > 1 else name for name, n in counts[:most]]
+        if len(counts) > most:
+            names.append(f"{len(counts) - most} more")
+        parts.append("magic: " + ", ".join(names))
+    return "; ".join(p for p in parts if p) or "nothing"
+
+
+def total(hoards):
+    out = new_hoard()
+    for hoard in hoards:
+        merge(out, hoard)
+    return out
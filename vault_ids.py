@@ -0,0 +1,87 @@
+"""
+Vault IDs
+Per-collection ID counters kept next to the data (`items.json.seq`).
+
+A counter is seeded once from the highest existing ID and then only moves
+forward, so allocation is O(1) and IDs stay monotonic across restarts.
+Allocation holds a lock file, so two processes adding entries at once never
+hand out the same ID.
+"""
+
+import os
+import time
+
+LOCK_TIMEOUT = 10.0
+STALE_LOCK = 30.0
+
+
+def seq_path(path):
+    return path + ".seq"
+
+
+class FileLock:
+    """Exclusive lock via O_CREAT | O_EXCL, portable across Windows and POSIX."""
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > STALE_LOCK:
+                        os.remove(self.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.path}")
+                time.sleep(0.01)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def read_counter(path):
+    try:
+        with open(seq_path(path), "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_counter(path, value):
+    tmp = seq_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(str(value))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, seq_path(path))
+
+
+class IdAllocator:
+    """Hands out IDs for the collections held in a VaultStore."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def allocate(self, path, prefix, count=1):
+        """Reserve `count` consecutive IDs, e.g. ["item-0079", "item-0080"]."""
+        coll = self.store.collection(path)
+        with FileLock(seq_path(coll.path) + ".lock"):
+            last = read_counter(coll.path)
+            # Never hand out an ID below one already in the data, even if
+            # entries were added by hand behind the counter's back.
+            last = max(last or 0, coll.max_number())
+            write_counter(coll.path, last + count)
+        return [f"{prefix}{n:04d}" for n in range(last + 1, last + count + 1)]
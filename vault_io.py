@@ -0,0 +1,180 @@
+"""
+Vault IO
+Streaming bulk import/export of a collection as NDJSON or CSV.
+
+CSV cells holding lists or objects (tags, objectives, inventory, ...) are
+written as JSON and decoded again on import, as are numbers, true/false and
+null, except in fields the schema says are always text. A string that would
+otherwise read back as something else (an empty string, "12" in a free-form
+field, text starting with a quote or bracket) is written as a JSON string, and
+an empty cell means the entry has no such field. Imports are validated in
+batches, new IDs are allocated in one call, and the collection is written
+once at the end.
+"""
+
+import csv
+import json
+import re
+import sys
+
+FORMATS = ("ndjson", "csv")
+BATCH_SIZE = 500
+SCALAR_RE = re.compile(r"^(?:-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null)$")
+
+
+def guess_format(filename, default="ndjson"):
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return default
+
+
+# ---------- EXPORT ----------
+
+def csv_cell(value, text=False):
+    """One value as a CSV cell that `decode_cell(cell, text)` turns back into it."""
+    if isinstance(value, str):
+        stripped = value.strip()
+        if not stripped or stripped[:1] in "\"[{" or stripped == "null" or (not text and SCALAR_RE.match(stripped)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def export_records(entries, out, fmt="ndjson", text_fields=()):
+    """Write entries to a text stream, one record at a time. Returns the count."""
+    if fmt == "ndjson":
+        for entry in entries:
+            out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return len(entries)
+
+    columns = []
+    seen = set()
+    for entry in entries:
+        for key in entry:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    writer = csv.DictWriter(out, fieldnames=columns, lineterminator="\n")
+    writer.writeheader()
+    for entry in entries:
+        writer.writerow({k: csv_cell(v, k in text_fields) for k, v in entry.items()})
+    return len(entries)
+
+
+# ---------- IMPORT ----------
+
+def decode_cell(value, text=False):
+    """A CSV cell back to what was exported; `text` keeps a number-like string as is.
+
+    `null` is null everywhere, since text fields may be nullable (a character's `shop_id`).
+    """
+    stripped = value.strip()
+    if stripped[:1] in "\"[{" or stripped == "null" or (not text and SCALAR_RE.match(stripped)):
+        try:
+            return json.loads(stripped)
+        except ValueError:
+            pass
+    return value
+
+
+def read_records(stream, fmt="ndjson", text_fields=()):
+    """Yield (line_number, record) from an NDJSON or CSV text stream."""
+    if fmt == "ndjson":
+        for lineno, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield lineno, json.loads(line)
+            except ValueError as e:
+                yield lineno, ValueError(f"invalid JSON: {e}")
+        return
+
+    reader = csv.DictReader(stream)
+    for lineno, row in enumerate(reader, start=2):
+        yield lineno, {k: decode_cell(v, k in text_fields) for k, v in row.items() if k and v}
+
+
+def check_record(record):
+    """Return a list of problems with one imported record (empty if fine)."""
+    if isinstance(record, Exception):
+        return [str(record)]
+    if not isinstance(record, dict):
+        return ["record is not an object"]
+    name = record.get("name")
+    if not isinstance(name, str) or not name.strip():
+        return ["missing name"]
+    return []
+
+
+def batches(iterable, size=BATCH_SIZE):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_records(store, ids, path, prefix, stream, fmt="ndjson", today=None, check=check_record,
+                   text_fields=(), save=None):
+    """Validate and merge records into a collection with a single write.
+
+    Records with an existing ID replace that entry; records without one get
+    a freshly allocated ID. Nothing is written if any record is invalid.
+    `save(path, entries)` defaults to `store.save`; pass one that re-bakes
+    derived fields (dnd_vault.save_list) where a collection has them.
+    Returns (added, updated, errors) where errors is [(line, message)].
+    """
+    records = []
+    errors = []
+    for batch in batches(read_records(stream, fmt, text_fields)):
+        for lineno, record in batch:
+            problems = check(record)
+            if problems:
+                errors.extend((lineno, p) for p in problems)
+            else:
+                records.append(record)
+    if errors:
+        return 0, 0, errors
+
+    # A copy, so a failed save leaves the cached collection untouched.
+    entries = list(store.collection(path).entries)
+    positions = {e.get("id"): i for i, e in enumerate(entries)}
+    taken = {r["id"] for r in records if r.get("id")}
+    needed = sum(1 for r in records if not r.get("id"))
+    fresh = []
+    while len(fresh) < needed:
+        allocated = ids.allocate(path, prefix, needed - len(fresh))
+        fresh.extend(i for i in allocated if i not in taken)
+    fresh = iter(fresh)
+
+    updated = 0
+    for record in records:
+        if not record.get("id"):
+            record["id"] = next(fresh)
+        if today and "created_on" not in record:
+            record["created_on"] = today
+        i = positions.get(record["id"])
+        if i is None:
+            positions[record["id"]] = len(entries)
+            entries.append(record)
+        else:
+            entries[i] = record
+            updated += 1
+
+    (save or store.save)(path, entries)
+    return len(records) - updated, updated, []
+
+
+def open_input(filename):
+    if filename in (None, "-"):
+        return sys.stdin
+    return open(filename, "r", encoding="utf-8", newline="")
+
+
+def open_output(filename):
+    if filename in (None, "-"):
+        return sys.stdout
+    return open(filename, "w", encoding="utf-8", newline="")
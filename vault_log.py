@@ -0,0 +1,85 @@
+"""
+Vault Log
+Append-only change log kept next to each collection file (`items.json.log`)
+and the atomic temp-file + fsync + rename write used to compact it.
+"""
+
+import json
+import os
+import tempfile
+
+
+def log_path(path):
+    return path + ".log"
+
+
+def append_records(path, entries):
+    """Append entries as `put` records, one JSON line each, and fsync."""
+    lines = "".join(
+        json.dumps({"op": "put", "entry": e}, ensure_ascii=False) + "\n"
+        for e in entries
+    )
+    with open(log_path(path), "a", encoding="utf-8") as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_records(path):
+    """Return the logged records for a collection, oldest first.
+
+    A torn final line from a crash mid-append is skipped.
+    """
+    lpath = log_path(path)
+    if not os.path.exists(lpath):
+        return []
+    records = []
+    with open(lpath, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("op") == "put" and isinstance(record.get("entry"), dict):
+                records.append(record)
+    return records
+
+
+def apply_records(entries, records):
+    """Replay logged puts onto a list of entries (update by ID, else append)."""
+    positions = {e.get("id"): i for i, e in enumerate(entries) if isinstance(e, dict)}
+    for record in records:
+        entry = record["entry"]
+        i = positions.get(entry.get("id"))
+        if i is None:
+            positions[entry.get("id")] = len(entries)
+            entries.append(entry)
+        else:
+            entries[i] = entry
+    return entries
+
+
+def write_json_atomic(path, data, indent=2):
+    """Write JSON to a temp file in the same directory, fsync, then rename over."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def clear_log(path):
+    try:
+        os.remove(log_path(path))
+    except FileNotFoundError:
+        pass
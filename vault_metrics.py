@@ -0,0 +1,139 @@
+"""
+Vault Metrics
+Counters and timers for the hot paths (file loads, bytes parsed, lookups,
+cache hits, search latency), reported per menu action or command.
+
+Nothing is measured until `enable()` is called: the store only checks its
+`metrics` attribute when it actually parses a file, and the lookup/search
+timers are installed by wrapping methods on the live objects (`count_calls`,
+`time_calls`), so a disabled build runs the original code untouched.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_TOP = 15
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.profile_dir = None
+        self.counters = Counter()
+        self.timers = {}
+        self._depth = 0
+        self._actions = 0
+
+    def enable(self, profile_dir=None):
+        """Start collecting; with `profile_dir`, also cProfile each action there."""
+        self.enabled = True
+        self.profile_dir = profile_dir
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        timer = self.timers.setdefault(name, [0, 0.0])
+        timer[0] += 1
+        timer[1] += seconds
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+
+    # ---------- INSTRUMENTATION ----------
+
+    def count_calls(self, obj, method, name):
+        """Replace `obj.method` with a wrapper that counts calls under `name`."""
+        original = getattr(obj, method)
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            self.counters[name] += 1
+            return original(*args, **kwargs)
+        setattr(obj, method, wrapper)
+
+    def time_calls(self, obj, method, name):
+        """Replace `obj.method` with a wrapper that times calls under `name`."""
+        original = getattr(obj, method)
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.add_time(name, time.perf_counter() - start)
+        setattr(obj, method, wrapper)
+
+    # ---------- ACTIONS ----------
+
+    @contextmanager
+    def action(self, name):
+        """Measure one menu action or command and print its breakdown.
+
+        Nested actions are folded into the outermost one.
+        """
+        if not self.enabled or self._depth:
+            yield
+            return
+        self.reset()
+        self._depth += 1
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            print(f"\n[profile] {self.summary(name, elapsed)}")
+            if profiler:
+                self.dump(name, profiler)
+
+    def summary(self, name, elapsed):
+        c = self.counters
+        parts = [
+            f"{c['loads']} loads",
+            f"{format_bytes(c['bytes_parsed'])} parsed",
+            f"{c['lookups']} lookups",
+            f"{max(c['collection_calls'] - c['loads'], 0)} cache hits",
+        ]
+        for timer, (calls, seconds) in sorted(self.timers.items()):
+            parts.append(f"{timer} {calls}x {seconds * 1000:.1f} ms")
+        parts.append(f"{elapsed * 1000:.0f} ms")
+        return f"{name}: " + ", ".join(parts)
+
+    def dump(self, name, profiler):
+        self._actions += 1
+        slug = re.sub(r"[^A-Za-z0-9_]+", "-", name).strip("-") or "action"
+        path = os.path.join(self.profile_dir, f"{self._actions:03d}-{slug}.pstats")
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        print(out.getvalue().rstrip())
+        print(f"[profile] wrote {path} (open with `python -m pstats {path}`)")
+
+
+def format_bytes(n):
+    if n >= 1024 * 1024:
+        return f"{n / (1024 * 1024):.1f} MB"
+    if n >= 1024:
+        return f"{n / 1024:.1f} KB"
+    return f"{n} B"
+
+
+# Process-wide instance; dnd_vault hooks it into the store when profiling.
+METRICS = Metrics()
@@ -0,0 +1,470 @@
+"""
+Vault Query
+A small query language for questions that span collections:
+
+    from quests where status = "In Progress" -> related_characters -> related_items
+    from quests -> related_items <- shops.quest_items select name, owner
+    from characters where type ~ npc order by name limit 5
+
+Steps run left to right, each producing a set of entries:
+
+    from NAME                 every entry of a collection
+    -> FIELD                  the entries whose IDs are held in FIELD
+    <- NAME.FIELD             entries of NAME whose FIELD holds one of the current IDs
+    where COND [and COND]     filter the step it follows
+
+Conditions are `FIELD = VALUE` (also !=, <, <=, >, >=), `FIELD ~ TEXT`
+(case-insensitive contains) and `FIELD in (A, B)`. `FIELD = null` matches
+entries where the field is null, missing or an empty list; `!= null` the rest. Fields may be dotted
+(`inventory.item_id`, `objectives.status`); a list matches if any element
+does. Queries end with optional `select F, ...`, `order by F [desc], ...`
+and `limit N`.
+
+The planner never scans a collection it can look into instead: IDs are
+fetched through each collection's ID index, `=`/`in` on top-level fields
+through the store's field indexes (the most selective one wins), reverse
+links through a field index or the link graph, and a join whose filter is
+more selective than the join itself is driven from the filter's index.
+`explain()` reports what each step did and how many rows it produced.
+"""
+
+import re
+
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "~", "in")
+INDEXABLE = ("=", "in")
+CLAUSES = ("where", "select", "order", "limit", "->", "<-")
+
+TOKEN_RE = re.compile(r"""\s*(?:(->|<-|<=|>=|!=|[=<>~(),])|"([^"]*)"|'([^']*)'|([^\s=<>!~(),"']+))""")
+NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+class QueryError(ValueError):
+    pass
+
+
+# ---------- PARSING ----------
+
+def tokenize(text):
+    """Tokens as (kind, value): kind is "op", "str" (quoted) or "word"."""
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise QueryError(f"Can't read the query at {text[pos:]!r}")
+        op, dq, sq, word = m.groups()
+        if op:
+            tokens.append(("op", op))
+        elif word is not None:
+            tokens.append(("word", word))
+        else:
+            tokens.append(("str", dq if dq is not None else sq))
+        pos = m.end()
+    return tokens
+
+
+def literal(kind, value):
+    if kind == "str":
+        return value
+    if NUMBER_RE.match(value):
+        return float(value) if "." in value else int(value)
+    return {"true": True, "false": False, "null": None}.get(value.lower(), value)
+
+
+def field_values(entry, field):
+    """Every value at a dotted path, flattening lists along the way."""
+    values = [entry]
+    for key in field.split("."):
+        found = []
+        for value in values:
+            value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(value, list):
+                found.extend(value)
+            elif value is not None:
+                found.append(value)
+        values = found
+    return values
+
+
+def same(a, b):
+    if isinstance(a, str) != isinstance(b, str) or isinstance(a, bool) != isinstance(b, bool):
+        return False
+    return a == b
+
+
+def ordered(a, b):
+    """(a, b) if they can be compared with < and >, else None."""
+    number = (int, float)
+    if isinstance(a, number) and isinstance(b, number) and not isinstance(a, bool):
+        return a, b
+    if isinstance(a, str) and isinstance(b, str):
+        return a.casefold(), b.casefold()
+    return None
+
+
+class Condition:
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def __str__(self):
+        if self.op == "in":
+            return f"{self.field} in ({', '.join(map(repr, self.value))})"
+        return f"{self.field} {self.op} {self.value!r}"
+
+    @property
+    def indexable(self):
+        # Field indexes leave out null, so null comparisons are scanned.
+        return self.op in INDEXABLE and "." not in self.field and None not in self.wanted()
+
+    def wanted(self):
+        return self.value if self.op == "in" else [self.value]
+
+    def test(self, entry):
+        values = field_values(entry, self.field)
+        if self.op == "!=":
+            if self.value is None:
+                return bool(values)
+            return not any(same(v, self.value) for v in values)
+        if not values and None in self.wanted():
+            return self.op in ("=", "in")
+        return any(self.match(v) for v in values)
+
+    def match(self, v):
+        if self.op == "=":
+            return same(v, self.value)
+        if self.op == "in":
+            return any(same(v, w) for w in self.value)
+        if self.op == "~":
+            return str(self.value).casefold() in str(v).casefold()
+        pair = ordered(v, self.value)
+        if pair is None:
+            return False
+        a, b = pair
+        return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[self.op]
+
+
+class Step:
+    """`from` (collection), `forward` (-> field) or `reverse` (<- collection.field)."""
+
+    def __init__(self, kind, collection=None, field=None):
+        self.kind = kind
+        self.collection = collection
+        self.field = field
+        self.conditions = []
+
+    def __str__(self):
+        if self.kind == "from":
+            return f"from {self.collection}"
+        if self.kind == "forward":
+            return f"-> {self.field}"
+        return f"<- {self.collection}.{self.field}"
+
+
+class Query:
+    def __init__(self):
+        self.steps = []
+        self.select = []
+        self.order = []  # [(field, descending)]
+        self.limit = None
+
+
+class Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def next(self, what="more query"):
+        if self.pos >= len(self.tokens):
+            raise QueryError(f"Query ends early; expected {what}")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def keyword(self):
+        kind, value = self.peek()
+        return value.lower() if kind in ("word", "op") and value else None
+
+    def expect(self, word):
+        kind, value = self.next(repr(word))
+        if kind == "str" or value.lower() != word:
+            raise QueryError(f"Expected {word!r}, got {value!r}")
+
+    def name(self, what):
+        kind, value = self.next(what)
+        if kind != "word" or value.lower() in CLAUSES:
+            raise QueryError(f"Expected {what}, got {value!r}")
+        return value
+
+    def parse(self):
+        query = Query()
+        self.expect("from")
+        query.steps.append(Step("from", collection=self.name("a collection name")))
+        while self.pos < len(self.tokens):
+            word = self.keyword()
+            self.pos += 1
+            if word == "where":
+                query.steps[-1].conditions.extend(self.conditions())
+            elif word == "->":
+                query.steps.append(Step("forward", field=self.name("an ID field")))
+            elif word == "<-":
+                target = self.name("COLLECTION.FIELD")
+                collection, dot, field = target.partition(".")
+                if not dot or not field:
+                    raise QueryError(f"Reverse joins look like `<- shops.inventory.item_id`, got {target!r}")
+                query.steps.append(Step("reverse", collection=collection, field=field))
+            elif word == "select":
+                query.select = self.fields()
+            elif word == "order":
+                self.expect("by")
+                while True:
+                    field = self.name("a field name")
+                    descending = self.keyword() in ("asc", "desc") and self.next()[1].lower() == "desc"
+                    query.order.append((field, descending))
+                    if self.peek() != ("op", ","):
+                        break
+                    self.pos += 1
+            elif word == "limit":
+                kind, value = self.next("a number")
+                if not value.isdigit():
+                    raise QueryError(f"limit needs a number, got {value!r}")
+                query.limit = int(value)
+            else:
+                raise QueryError(f"Unexpected {self.tokens[self.pos - 1][1]!r}")
+        return query
+
+    def fields(self):
+        fields = [self.name("a field name")]
+        while self.peek() == ("op", ","):
+            self.pos += 1
+            fields.append(self.name("a field name"))
+        return fields
+
+    def conditions(self):
+        conditions = [self.condition()]
+        while self.keyword() == "and":
+            self.pos += 1
+            conditions.append(self.condition())
+        return conditions
+
+    def condition(self):
+        field = self.name("a field name")
+        op = self.keyword()
+        if op not in OPERATORS:
+            raise QueryError(f"Expected one of {' '.join(OPERATORS)} after {field!r}")
+        self.pos += 1
+        if op != "in":
+            value = literal(*self.next("a value"))
+            if value is None and op not in ("=", "!="):
+                raise QueryError(f"null only compares with = or !=, not {op}")
+            return Condition(field, op, value)
+        if self.next("(") != ("op", "("):
+            raise QueryError("`in` takes a list, e.g. status in (complete, in_progress)")
+        values = []
+        while True:
+            values.append(literal(*self.next("a value")))
+            kind, value = self.next("`,` or `)`")
+            if value == ")":
+                return Condition(field, op, values)
+            if value != ",":
+                raise QueryError(f"Expected `,` or `)` in the list, got {value!r}")
+
+
+def parse(text):
+    return Parser(text).parse()
+
+
+# ---------- PLANNING / EXECUTION ----------
+
+def sort_key(field, descending):
+    def key(entry):
+        values = field_values(entry, field)
+        if not values:
+            # missing values sort last either way
+            return (0 if descending else 1, 0, "")
+        v = values[0]
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            return (1 if descending else 0, 0, v)
+        return (1 if descending else 0, 1, str(v).casefold())
+    return key
+
+
+def project(entry, fields):
+    out = {}
+    for field in fields:
+        if "." in field:
+            out[field] = field_values(entry, field)
+        else:
+            out[field] = entry.get(field)
+    return out
+
+
+def unique(entries):
+    seen = set()
+    out = []
+    for entry in entries:
+        key = entry.get("id", id(entry))
+        if key not in seen:
+            seen.add(key)
+            out.append(entry)
+    return out
+
+
+class QueryEngine:
+    """Runs queries against a store; `paths` and `prefixes` are keyed by collection name."""
+
+    def __init__(self, store, paths, prefixes, links=None):
+        self.store = store
+        self.paths = paths
+        self.prefixes = prefixes
+        self.links = links
+        self._owners = {prefix: name for name, prefix in prefixes.items()}
+
+    def run(self, text):
+        return self.execute(parse(text))[0]
+
+    def explain(self, text):
+        """(results, plan lines) for a query."""
+        return self.execute(parse(text))
+
+    def execute(self, query):
+        plan = []
+        rows = []
+        for step in query.steps:
+            if step.kind == "from":
+                rows = self.scan_or_index(step, plan)
+            elif step.kind == "forward":
+                rows = self.forward(step, rows, plan)
+            else:
+                rows = self.reverse(step, rows, plan)
+        for field, descending in reversed(query.order):
+            rows.sort(key=sort_key(field, descending), reverse=descending)
+        if query.order:
+            plan.append("sort by " + ", ".join(f + (" desc" if d else "") for f, d in query.order))
+        if query.limit is not None:
+            rows = rows[:query.limit]
+            plan.append(f"limit {query.limit}")
+        if query.select:
+            rows = [project(e, query.select) for e in rows]
+            plan.append("select " + ", ".join(query.select))
+        return rows, plan
+
+    # ----- helpers -----
+
+    def collection(self, name):
+        if name not in self.paths:
+            raise QueryError(f"No collection {name!r} (have: {', '.join(self.paths)})")
+        return self.store.collection(self.paths[name])
+
+    def owner(self, entry_id):
+        """Collection name an ID belongs to, from its prefix."""
+        if not isinstance(entry_id, str):
+            return None
+        head, dash, _ = entry_id.partition("-")
+        return self._owners.get(head + dash)
+
+    def best_index(self, name, conditions):
+        """(condition, entries) for the most selective indexable condition, or None."""
+        coll = self.collection(name)
+        best = None
+        for cond in conditions:
+            if not cond.indexable:
+                continue
+            if cond.field == "id":
+                hits = [coll.get(v) for v in cond.wanted() if isinstance(v, str)]
+                hits = [e for e in hits if e is not None]
+            else:
+                index = coll.index(cond.field)
+                hits = unique(e for v in cond.wanted() for e in index.get(v, ()))
+                # Index keys compare by hash, so True finds 1 (and 1.0); keep only real matches.
+                hits = [e for e in hits if cond.test(e)]
+            if best is None or len(hits) < len(best[1]):
+                best = (cond, hits)
+        return best
+
+    def filter(self, rows, conditions, plan, skip=None):
+        for cond in conditions:
+            if cond is skip:
+                continue
+            before = len(rows)
+            rows = [e for e in rows if cond.test(e)]
+            plan.append(f"  filter {cond}: {before} -> {len(rows)} rows")
+        return rows
+
+    # ----- steps -----
+
+    def scan_or_index(self, step, plan):
+        best = self.best_index(step.collection, step.conditions)
+        if best is None:
+            rows = list(self.collection(step.collection).entries)
+            plan.append(f"{step}: scan, {len(rows)} rows")
+            return self.filter(rows, step.conditions, plan)
+        cond, rows = best
+        plan.append(f"{step}: {'id' if cond.field == 'id' else 'field'} index {cond}, {len(rows)} rows")
+        return self.filter(rows, step.conditions, plan, skip=cond)
+
+    def forward(self, step, rows, plan):
+        ids = {}  # id -> owning collection, in first-seen order
+        for entry in rows:
+            for value in field_values(entry, step.field):
+                if value not in ids:
+                    name = self.owner(value)
+                    if name is not None:
+                        ids[value] = name
+        owners = set(ids.values())
+        best = self.best_index(owners.pop(), step.conditions) if len(owners) == 1 else None
+
+        if best is not None and len(best[1]) < len(ids):
+            # The filter is more selective than the join: walk its index entries instead.
+            cond, hits = best
+            position = {i: n for n, i in enumerate(ids)}
+            out = sorted((e for e in hits if e.get("id") in ids), key=lambda e: position[e["id"]])
+            plan.append(f"{step}: {len(ids)} ids, driven by field index {cond} "
+                        f"({len(hits)} candidates), {len(out)} rows")
+            return self.filter(out, step.conditions, plan, skip=cond)
+
+        out = []
+        colls = {}
+        for entry_id, name in ids.items():
+            if name not in colls:
+                colls[name] = self.collection(name)
+            entry = colls[name].get(entry_id)
+            if entry is not None:
+                out.append(entry)
+        missing = f", {len(ids) - len(out)} dangling" if len(out) < len(ids) else ""
+        plan.append(f"{step}: id index lookup of {len(ids)} ids, {len(out)} rows{missing}")
+        return self.filter(out, step.conditions, plan)
+
+    def reverse(self, step, rows, plan):
+        ids = [e["id"] for e in rows if e.get("id") is not None]
+        wanted = set(ids)
+        coll = self.collection(step.collection)
+        best = self.best_index(step.collection, step.conditions)
+
+        if best is not None and len(best[1]) < len(ids):
+            cond, hits = best
+            out = [e for e in hits if any(v in wanted for v in field_values(e, step.field))]
+            plan.append(f"{step}: driven by field index {cond} ({len(hits)} candidates "
+                        f"< {len(ids)} ids), {len(out)} rows")
+            return self.filter(out, step.conditions, plan, skip=cond)
+
+        if "." not in step.field:
+            index = coll.index(step.field)
+            out = unique(e for i in ids for e in index.get(i, ()))
+            how = f"field index {step.collection}.{step.field}"
+        elif self.links is not None:
+            graph = self.links.refresh()
+            sources = [s for i in ids for s, f in graph.reverse.get(i, ()) if f == step.field]
+            out = unique(graph.entities[s] for s in sources
+                         if graph.kinds.get(s) == step.collection and s in graph.entities)
+            how = "link graph reverse index"
+        else:
+            out = [e for e in coll.entries if any(v in wanted for v in field_values(e, step.field))]
+            how = f"scan of {len(coll.entries)} rows"
+        plan.append(f"{step}: {how} for {len(ids)} ids, {len(out)} rows")
+        return self.filter(out, step.conditions, plan)
@@ -0,0 +1,253 @@
+"""
+Vault Render
+One template per entity type, rendered to plain text, Markdown or Discord and
+memoized by a hash of the fields the template reads.
+
+Templates build a list of blocks; each output format only knows how to lay
+out blocks, so the three formats never drift apart:
+
+    ("title", text)           ("meta", text)          ("para", text)
+    ("section", label, text)  ("list", label, [lines])
+"""
+
+import hashlib
+import json
+
+FORMATS = ("plain", "markdown", "discord")
+DISCORD_LIMIT = 2000
+CACHE_SIZE = 4096
+
+# Fields baked from the others; never part of a template's input.
+DERIVED_FIELDS = ("paste_block", "paste_hash", "stat_line", "progress")
+# Kinds whose entries carry a baked `paste_block`.
+BAKED_KINDS = ("items", "monsters")
+
+STATUS_ICONS = {"Complete": "✅", "In Progress": "🔶", "Not Started": "⬜"}
+OBJECTIVE_ICONS = {"complete": "✅", "in_progress": "🔶"}
+
+
+# ---------- TEMPLATES ----------
+
+def monster_stat_line(m):
+    return (
+        f"AC {m.get('ac', '')}, HD {m.get('hd', '')} ({m.get('hp', '')}hp), "
+        f"Att {m.get('attacks', '')}, THAC0 {m.get('thac0', '')}, MV {m.get('movement', '')}, "
+        f"SV {m.get('saves', '')}, ML {m.get('morale', '')}, AL {m.get('alignment', '')}, "
+        f"XP {m.get('xp', '')}, NA {m.get('number_appearing', '')}, TT {m.get('treasure_type', '')}"
+    )
+
+
+def item_blocks(item, resolve):
+    return [
+        ("title", item.get("name", "")),
+        ("section", "Description", item.get("description", "")),
+        ("section", "Effect", item.get("rules", "")),
+    ]
+
+
+def monster_blocks(monster, resolve):
+    return [
+        ("title", monster.get("name", "")),
+        ("para", monster.get("description", "")),
+        ("para", monster_stat_line(monster)),
+        ("para", monster.get("special_abilities", "")),
+    ]
+
+
+def menu_line(entry):
+    if isinstance(entry, dict):
+        return f"{entry.get('name', '?')} — {entry.get('price', '?')}"
+    return str(entry)
+
+
+def shop_blocks(shop, resolve):
+    meta = " — ".join(v for v in (shop.get("type"), shop.get("location")) if v)
+    blocks = [
+        ("title", shop.get("name", "")),
+        ("meta", meta),
+        ("para", f"Owner: {shop['owner']}" if shop.get("owner") else ""),
+        ("para", shop.get("description", "")),
+        ("list", "For Sale", [menu_line(i) for i in shop.get("inventory", [])]),
+        ("list", "Growler Menu", [menu_line(i) for i in shop.get("growler_menu", [])]),
+        ("list", "Oddments", [menu_line(i) for i in shop.get("oddments_menu", [])]),
+    ]
+    if shop.get("notes"):
+        blocks.append(("section", "Notes", shop["notes"]))
+    return blocks
+
+
+def character_blocks(char, resolve):
+    title = char.get("name", "")
+    if char.get("type"):
+        title += f" — {char['type']}"
+    return [
+        ("title", title),
+        ("meta", char.get("race_class", "")),
+        ("section", "Appearance", char.get("appearance", "")),
+        ("section", "Personality", char.get("personality", "")),
+        ("section", "Motivations", char.get("motivations", "")),
+    ]
+
+
+def quest_blocks(quest, resolve):
+    status = quest.get("status", "Unknown")
+    objectives = []
+    for obj in quest.get("objectives", []):
+        icon = OBJECTIVE_ICONS.get(obj.get("status"), "⬜")
+        objectives.append(f"{icon} {obj.get('text', '?')}")
+    sub_quests = []
+    for sq_id in quest.get("sub_quests", []):
+        sq = resolve(sq_id)
+        if sq:
+            sub_quests.append(f"{STATUS_ICONS.get(sq.get('status'), '❓')} {sq.get('name', sq_id)}")
+        else:
+            sub_quests.append(sq_id)
+    return [
+        ("title", quest.get("name", "")),
+        ("meta", f"{quest.get('type', 'Quest')} — {STATUS_ICONS.get(status, '❓')} {status}"),
+        ("para", quest.get("description", "")),
+        ("list", "Objectives", objectives),
+        ("list", "Sub-Quests", sub_quests),
+        ("section", "Stakes", quest.get("stakes") or ""),
+    ]
+
+
+TEMPLATES = {
+    "items": item_blocks,
+    "monsters": monster_blocks,
+    "shops": shop_blocks,
+    "characters": character_blocks,
+    "quests": quest_blocks,
+}
+
+# Linked entities a template reads through `resolve`; part of the cache key.
+LINKED_FIELDS = {"quests": ("sub_quests",)}
+
+
+# ---------- FORMATS ----------
+
+def layout_markdown(blocks):
+    out = []
+    for block in blocks:
+        kind, rest = block[0], block[1:]
+        if kind == "title":
+            out.append(f"**{rest[0]}**")
+        elif kind == "meta":
+            out.append(f"*{rest[0]}*")
+        elif kind == "para":
+            out.append(rest[0])
+        elif kind == "section":
+            out.append(f"*{rest[0]}*:\n{rest[1]}")
+        elif kind == "list":
+            out.append(f"**{rest[0]}:**\n" + "\n".join(f"- {line}" for line in rest[1]))
+    return "\n\n".join(out)
+
+
+def layout_plain(blocks):
+    out = []
+    for block in blocks:
+        kind, rest = block[0], block[1:]
+        if kind in ("title", "meta", "para"):
+            out.append(rest[0])
+        elif kind == "section":
+            out.append(f"{rest[0]}:\n{rest[1]}")
+        elif kind == "list":
+            out.append(f"{rest[0]}:\n" + "\n".join(f"  • {line}" for line in rest[1]))
+    return "\n\n".join(out)
+
+
+def layout_discord(blocks):
+    text = layout_markdown(blocks)
+    if len(text) > DISCORD_LIMIT:
+        text = text[:DISCORD_LIMIT - 1].rstrip() + "…"
+    return text
+
+
+LAYOUTS = {"plain": layout_plain, "markdown": layout_markdown, "discord": layout_discord}
+
+
+def non_empty(blocks):
+    """Drop blocks with nothing to show (empty text or empty list)."""
+    return [b for b in blocks if b[-1]]
+
+
+# ---------- RENDERER ----------
+
+class Renderer:
+    """Renders entities and memoizes the output by content hash.
+
+    `resolve(id)` looks up linked entities (e.g. a quest's sub-quests).
+    """
+
+    def __init__(self, resolve=None):
+        self.resolve = resolve or (lambda entity_id: None)
+        self._cache = {}
+
+    def digest(self, kind, entry):
+        source = {k: v for k, v in entry.items() if k not in DERIVED_FIELDS}
+        linked = []
+        for field in LINKED_FIELDS.get(kind, ()):
+            for entity_id in entry.get(field) or []:
+                target = self.resolve(entity_id) or {}
+                linked.append([entity_id, target.get("name"), target.get("status")])
+        raw = json.dumps([source, linked], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def render(self, kind, entry, fmt="markdown"):
+        key = (kind, fmt, self.digest(kind, entry))
+        text = self._cache.get(key)
+        if text is None:
+            blocks = non_empty(TEMPLATES[kind](entry, self.resolve))
+            text = LAYOUTS[fmt](blocks).strip()
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = text
+        return text
+
+    def bake(self, kind, entry):
+        """Store a generated `paste_block`, marked so `refresh` can tell it from a hand-written one."""
+        entry["paste_block"] = self.render(kind, entry)
+        entry["paste_hash"] = text_hash(entry["paste_block"])
+        return entry["paste_block"]
+
+    def generated(self, entry):
+        """True if the stored block is still exactly what `bake` wrote."""
+        block = entry.get("paste_block")
+        return bool(block) and entry.get("paste_hash") == text_hash(block)
+
+    def paste_block(self, kind, entry):
+        """The block to copy: a hand-written one as stored, a generated one as of the current source."""
+        block = entry.get("paste_block")
+        if block and not self.generated(entry):
+            return block
+        return self.render(kind, entry)
+
+    def refresh(self, kind, entries):
+        """Re-bake derived fields that have gone stale after hand edits.
+
+        Monster `stat_line`s are always re-derived, and the old stat line is
+        swapped for the new one inside a hand-written `paste_block`. Generated
+        blocks are re-baked when their source changed, and items or monsters
+        without one get one. Hand-written blocks are otherwise left alone.
+        Returns the number of entries changed.
+        """
+        changed = 0
+        for entry in entries:
+            before = (entry.get("paste_block"), entry.get("paste_hash"), entry.get("stat_line"))
+            generated = self.generated(entry)
+            if kind == "monsters":
+                old_line, new_line = entry.get("stat_line"), monster_stat_line(entry)
+                if old_line != new_line:
+                    if old_line and entry.get("paste_block") and not generated:
+                        entry["paste_block"] = entry["paste_block"].replace(old_line, new_line)
+                    entry["stat_line"] = new_line
+            if kind in BAKED_KINDS:
+                if not entry.get("paste_block") or (generated and entry["paste_block"] != self.render(kind, entry)):
+                    self.bake(kind, entry)
+            if (entry.get("paste_block"), entry.get("paste_hash"), entry.get("stat_line")) != before:
+                changed += 1
+        return changed
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,319 @@
+"""
+Vault Schema
+Declarative schemas for every entity type, compiled once into validator
+functions that report problems by JSON path (e.g. `$[3].objectives[1].status`).
+
+Spec language:
+    str, int, bool, list, dict      value must be that type
+    (str, int)                      any of these types
+    [spec]                          list whose elements match spec
+    {"field": spec, "opt?": spec}   object; fields ending in "?" are optional,
+                                    unlisted fields are allowed
+    Nullable(spec)                  spec or null
+    Pattern(regex)                  string matching regex
+    OneOf(a, b, ...)                one of the given values
+    NonEmpty                        non-blank string
+"""
+
+import re
+
+
+class Nullable:
+    def __init__(self, spec):
+        self.spec = spec
+
+
+class Pattern:
+    def __init__(self, regex):
+        self.regex = re.compile(regex)
+
+
+class OneOf:
+    def __init__(self, *values):
+        self.values = values
+
+
+NonEmpty = Pattern(r"\S")
+
+ITEM_ID = Pattern(r"^item-\d+$")
+CHAR_ID = Pattern(r"^char-\d+$")
+SHOP_ID = Pattern(r"^shop-\d+$")
+QUEST_ID = Pattern(r"^quest-\d+$")
+DATE = Pattern(r"^\d{4}-\d{2}-\d{2}$")
+
+TYPE_NAMES = {str: "string", int: "integer", bool: "boolean", list: "array", dict: "object"}
+
+
+# ---------- COMPILER ----------
+
+def compile_spec(spec):
+    """Turn a spec into `check(value, path, errors)`."""
+    if isinstance(spec, Nullable):
+        inner = compile_spec(spec.spec)
+
+        def check(value, path, errors):
+            if value is not None:
+                inner(value, path, errors)
+        return check
+
+    if isinstance(spec, Pattern):
+        regex = spec.regex
+
+        def check(value, path, errors):
+            if not isinstance(value, str):
+                errors.append((path, "expected string"))
+            elif not regex.search(value):
+                errors.append((path, f"does not match {regex.pattern!r}"))
+        return check
+
+    if isinstance(spec, OneOf):
+        values = spec.values
+
+        def check(value, path, errors):
+            if value not in values:
+                errors.append((path, f"expected one of {', '.join(map(repr, values))}"))
+        return check
+
+    if isinstance(spec, list):
+        element = compile_spec(spec[0])
+
+        def check(value, path, errors):
+            if not isinstance(value, list):
+                errors.append((path, "expected array"))
+                return
+            for i, v in enumerate(value):
+                element(v, f"{path}[{i}]", errors)
+        return check
+
+    if isinstance(spec, dict):
+        fields = [
+            (key.rstrip("?"), key.endswith("?"), compile_spec(sub))
+            for key, sub in spec.items()
+        ]
+
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append((path, "expected object"))
+                return
+            for name, optional, sub in fields:
+                if name in value:
+                    sub(value[name], f"{path}.{name}", errors)
+                elif not optional:
+                    errors.append((f"{path}.{name}", "missing"))
+        return check
+
+    types = spec if isinstance(spec, tuple) else (spec,)
+    # bool is an int subclass; don't let True pass as an integer
+    strict_int = int in types and bool not in types
+    expected = " or ".join(TYPE_NAMES.get(t, t.__name__) for t in types)
+
+    def check(value, path, errors):
+        if not isinstance(value, types) or (strict_int and isinstance(value, bool)):
+            errors.append((path, f"expected {expected}"))
+    return check
+
+
+# ---------- SCHEMAS ----------
+
+COMMON = {
+    "name": NonEmpty,
+    "description?": str,
+    "tags?": [str],
+    "created_on?": DATE,
+}
+
+ITEM = {
+    "id": ITEM_ID,
+    **COMMON,
+    "category?": str,
+    "rarity?": str,
+    "rules?": str,
+    "source?": str,
+    "paste_block?": str,
+    "paste_hash?": str,
+}
+
+MONSTER = {
+    "id": Pattern(r"^monster-\d+$"),
+    **COMMON,
+    "ac?": Pattern(r"^-?\d+ \[\d+\]"),
+    "hd?": str,
+    "hp?": str,
+    "attacks?": str,
+    "thac0?": Pattern(r"^\d+ \[[+-]\d+\]"),
+    "movement?": str,
+    "saves?": str,
+    "morale?": str,
+    "alignment?": str,
+    "xp?": str,
+    "number_appearing?": str,
+    "treasure_type?": str,
+    "special_abilities?": str,
+    "stat_line?": str,
+    "paste_block?": str,
+    "paste_hash?": str,
+}
+
+MONSTER_SOURCE = {
+    "id": NonEmpty,
+    **COMMON,
+    "ac": int,
+    "aac": int,
+    "hd": str,
+    "hp_avg": int,
+    "attacks": [{
+        "name": NonEmpty,
+        "damage": str,
+        "count?": Nullable(int),
+        "special?": Nullable(str),
+        "range?": Nullable((str, int)),
+    }],
+    "thac0": int,
+    "attack_bonus": int,
+    "mv": {"base": int, "encounter": int, "fly?": int, "swim?": int, "burrow?": int, "web?": int},
+    "saves": {"D": int, "W": int, "P": int, "B": int, "S": int},
+    "save_as?": str,
+    "morale": int,
+    "alignment": str,
+    "xp": int,
+    "number_appearing": {"dungeon": str, "lair": str},
+    "treasure_type": str,
+    "special?": [str],
+}
+
+MONSTER_SOURCE_FILE = {"monsters": [MONSTER_SOURCE]}
+
+SHOP_LINE = (str, dict)
+
+SHOP = {
+    "id": SHOP_ID,
+    **COMMON,
+    "owner?": str,
+    "location?": str,
+    "type?": str,
+    "inventory?": [SHOP_LINE],
+    "growler_menu?": [SHOP_LINE],
+    "oddments_menu?": [SHOP_LINE],
+    "acquired_here?": [ITEM_ID],
+    "stolen_from?": [ITEM_ID],
+    "quest_items?": [(str, dict)],
+    "notes?": str,
+}
+
+CHARACTER = {
+    "id": CHAR_ID,
+    **COMMON,
+    "type?": str,
+    "race_class?": str,
+    "level?": int,
+    "max_hp?": int,
+    "current_hp?": int,
+    "appearance?": str,
+    "personality?": str,
+    "motivations?": str,
+    "special_notes?": str,
+    "shop_id?": Nullable(SHOP_ID),
+    "quest_ids?": [QUEST_ID],
+    "related_items?": [ITEM_ID],
+    "related_characters?": [CHAR_ID],
+}
+
+QUEST = {
+    "id": QUEST_ID,
+    **COMMON,
+    "type?": str,
+    "status?": OneOf("Not Started", "In Progress", "Complete"),
+    "objectives?": [{
+        "text": NonEmpty,
+        "status": OneOf("incomplete", "in_progress", "complete"),
+        "notes?": str,
+    }],
+    "parent_quest?": Nullable(QUEST_ID),
+    "sub_quests?": [QUEST_ID],
+    "related_characters?": [CHAR_ID],
+    "related_items?": [ITEM_ID],
+    "related_shops?": [SHOP_ID],
+    "host?": Nullable(CHAR_ID),
+    "current_holder?": Nullable(CHAR_ID),
+    "core_item?": Nullable(ITEM_ID),
+    "mechanics?": Nullable(dict),
+    "themes?": [str],
+    "progress?": Nullable(dict),
+}
+
+SCHEMAS = {
+    "items": ITEM,
+    "monsters": MONSTER,
+    "shops": SHOP,
+    "characters": CHARACTER,
+    "quests": QUEST,
+}
+
+# Compiled once at import; validating is then plain function calls.
+VALIDATORS = {name: compile_spec(spec) for name, spec in SCHEMAS.items()}
+NEW_ENTRY_VALIDATORS = {
+    name: compile_spec({("id?" if k == "id" else k): v for k, v in spec.items()})
+    for name, spec in SCHEMAS.items()
+}
+SOURCE_FILE_VALIDATOR = compile_spec(MONSTER_SOURCE_FILE)
+
+
+# ---------- VALIDATION ----------
+
+def validate_collection(kind, entries, path="$"):
+    """Validate a whole collection in one pass; returns [(json_path, message)].
+
+    Also flags duplicate IDs.
+    """
+    if not isinstance(entries, list):
+        return [(path, "expected array")]
+    check = VALIDATORS[kind]
+    errors = []
+    seen = set()
+    for i, entry in enumerate(entries):
+        check(entry, f"{path}[{i}]", errors)
+        entry_id = entry.get("id") if isinstance(entry, dict) else None
+        if entry_id is not None and entry_id in seen:
+            errors.append((f"{path}[{i}].id", f"duplicate id {entry_id}"))
+        seen.add(entry_id)
+    return errors
+
+
+def validate_source_file(data, path="$"):
+    """Validate one `monsters/*.json` source file."""
+    errors = []
+    SOURCE_FILE_VALIDATOR(data, path, errors)
+    return errors
+
+
+def is_text(spec):
+    """True if a spec only ever accepts strings (or null)."""
+    if isinstance(spec, Nullable):
+        return is_text(spec.spec)
+    if isinstance(spec, OneOf):
+        return all(isinstance(v, str) for v in spec.values)
+    return spec is str or isinstance(spec, Pattern)
+
+
+def text_fields(kind):
+    """Top-level fields of an entity that are always strings, e.g. a monster's "hd".
+
+    CSV import leaves these as text even when a cell looks like a number.
+    """
+    return {key.rstrip("?") for key, spec in SCHEMAS[kind].items() if is_text(spec)}
+
+
+def record_checker(kind):
+    """Problem-list checker for one incoming record (ID may be omitted).
+
+    Matches the `check` hook of vault_io.import_records.
+    """
+    check = NEW_ENTRY_VALIDATORS[kind]
+
+    def problems(record):
+        if isinstance(record, Exception):
+            return [str(record)]
+        errors = []
+        check(record, "$", errors)
+        return [f"{p}: {m}" for p, m in errors]
+    return problems
@@ -0,0 +1,410 @@
+"""
+Vault Server
+Local HTTP API over the in-memory indexed store, plus the web UI's static files
+(only those: the rest of the vault directory, .git included, is never served).
+
+    GET  /api/<collection>?offset=0&limit=50&fields=id,name   paginated list
+    GET  /api/<collection>/<id>                               one entry
+    GET  /api/<collection>/<id>/render?format=discord         copy block
+    GET  /api/search?q=pipe[&type=items][&limit=20]           ranked search
+    GET  /api/links                                           link graph
+    GET  /api/calendar?date=376-11-4&days=60[&seed=0&season=hitching]  day + what's ahead
+    GET  /api/encounters?biome=swamp&level=3&days=7[&force=1]  random encounters
+    GET  /api/prices?q=lager | under=500[&location=woodcutters]  shop prices (copper)
+    GET  /api/events                                          change stream (SSE)
+    POST /api/<collection>                                    add an entry
+    PUT  /api/<collection>/<id>                               replace an entry
+
+Responses carry an ETag (If-None-Match gets a 304) and are gzipped when the
+client accepts it. Files edited on disk (by hand or by merge_monsters.py) are
+picked up by a watcher (vault_watch) and announced on /api/events.
+
+Usage:
+    python vault_server.py [--port 8000] [--host 127.0.0.1] [--poll | --no-watch]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import queue
+import threading
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import dnd_vault as vault
+import dolmenwood_calendar
+import encounter_tables
+import shop_prices
+import vault_schema
+from vault_render import FORMATS
+from vault_watch import VaultWatcher
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+GZIP_MIN_BYTES = 1024
+CACHE_SIZE = 256
+KEEPALIVE = 15
+MONSTER_SOURCE_DIR = "monsters"
+
+# What the web UI loads. Caches, logs, databases and dotfiles stay private.
+STATIC_FILES = {"index.html", "main.js", "style.css", "dolmenwood-calendar.json",
+                *vault.COLLECTION_PATHS.values()}
+STATIC_DIRS = ("components/", "styles/", "utils/")
+
+# The JS search box accepts "item:pipe"-style prefixes; honour the same ones.
+SEARCH_PREFIXES = {
+    "item": "items",
+    "monster": "monsters",
+    "char": "characters",
+    "shop": "shops",
+    "quest": "quests",
+}
+
+# One lock around the shared store: handlers run on separate threads.
+LOCK = threading.Lock()
+
+# One queue per connected /api/events client.
+LISTENERS = set()
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def int_param(params, name, default, maximum=None):
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    value = max(value, 0)
+    return min(value, maximum) if maximum is not None else value
+
+
+def project(entry, fields):
+    if not fields:
+        return entry
+    return {k: entry[k] for k in fields if k in entry}
+
+
+def collection_path(name):
+    path = vault.COLLECTION_PATHS.get(name)
+    if path is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown collection: {name}")
+    return path
+
+
+# ---------- HANDLERS ----------
+
+def list_entries(name, params):
+    entries = vault.load_list(collection_path(name))
+    offset = int_param(params, "offset", 0)
+    limit = int_param(params, "limit", DEFAULT_LIMIT, MAX_LIMIT)
+    fields = [f for f in params.get("fields", [""])[0].split(",") if f]
+    return {
+        "total": len(entries),
+        "offset": offset,
+        "limit": limit,
+        "items": [project(e, fields) for e in entries[offset:offset + limit]],
+    }
+
+
+def get_entry(name, entry_id):
+    entry = vault.STORE.get(collection_path(name), entry_id)
+    if entry is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No {name} entry {entry_id}")
+    return entry
+
+
+def render_entry(name, entry_id, params):
+    fmt = params.get("format", ["markdown"])[0]
+    if fmt not in FORMATS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"format must be one of {', '.join(FORMATS)}")
+    return {"format": fmt, "text": vault.RENDER.render(name, get_entry(name, entry_id), fmt)}
+
+
+def search(params):
+    query = params.get("q", [""])[0].strip()
+    limit = int_param(params, "limit", DEFAULT_LIMIT, MAX_LIMIT)
+    names = list(vault.COLLECTION_PATHS)
+    if "type" in params:
+        names = [params["type"][0]]
+    prefix, sep, rest = query.partition(":")
+    if sep and prefix.lower() in SEARCH_PREFIXES:
+        names = [SEARCH_PREFIXES[prefix.lower()]]
+        query = rest.strip()
+    results = {name: [] for name in vault.COLLECTION_PATHS}
+    if query:
+        for name in names:
+            hits = vault.search_entries(collection_path(name), query)
+            results[name] = hits[:limit]
+    return results
+
+
+def calendar(params):
+    date = params.get("date", [dolmenwood_calendar.DEFAULT_DATE])[0]
+    days = int_param(params, "days", 60, 3660)
+    seed = int_param(params, "seed", 0)
+    try:
+        today, upcoming = dolmenwood_calendar.lookahead(date, days, seed, params.get("kind"),
+                                                        params.get("season", [None])[0])
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+    return {"today": today, "upcoming": upcoming}
+
+
+def encounters(params):
+    text = params.get("biome", [""])[0]
+    # Like the CLI: text that names no biome reaches table_for and is a 400, not "any biome".
+    biome = (encounter_tables.biome_for(text) or text) if text else None
+    tag = params.get("tag", [None])[0]
+    level = int_param(params, "level", 0) or None
+    days = int_param(params, "days", 1, 3660)
+    seed = int_param(params, "seed", None) if "seed" in params else None
+    force = params.get("force", ["0"])[0] not in ("0", "", "false")
+    try:
+        lair_chance = float(params.get("lair", ["0"])[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "lair must be a number")
+    if not 0 <= lair_chance <= 1:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "lair must be between 0 and 1")
+    try:
+        table = encounter_tables.table_for(vault.STORE, vault.MONSTERS_PATH, biome, tag, level)
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+    rolled = encounter_tables.hex_days(table, days, seed=seed, force=force, lair_chance=lair_chance)
+    return {"table": table.describe(), "monsters": len(table), "chance": table.chance, "days": rolled}
+
+
+def prices(params):
+    index = shop_prices.price_index(vault.STORE, vault.SHOPS_PATH)
+    location = params.get("location", [None])[0]
+    if "q" in params:
+        aliases = shop_prices.aliases_for(vault.STORE, vault.ITEMS_PATH)
+        offers = index.offers_for(params["q"][0], aliases)
+        if location:
+            places = set(index.locations(location))
+            offers = [o for o in offers if o["location"] in places]
+    elif "under" in params:
+        offers = index.under(int_param(params, "under", 0), location)
+    else:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Give q=ITEM or under=COPPER")
+    return {"offers": offers}
+
+
+def collection_stamps():
+    return tuple(vault.STORE.collection(p).stamp for p in vault.COLLECTION_PATHS.values())
+
+
+def write_entry(name, body, entry_id=None):
+    path = collection_path(name)
+    problems = vault_schema.record_checker(name)(body)
+    if problems:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "; ".join(problems))
+    if entry_id is None:
+        body["id"] = vault.next_id(path, vault.ID_PREFIXES[name])
+        body.setdefault("created_on", vault.today_str())
+    else:
+        if vault.STORE.get(path, entry_id) is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No {name} entry {entry_id}")
+        body["id"] = entry_id
+    vault.RENDER.refresh(name, [body])
+    vault.append_entry(path, body)
+    # The web UI fetches the JSON files themselves, so fold the log in now.
+    vault.STORE.compact(path)
+    return body
+
+
+def is_static(url_path):
+    """True if a request path names one of the web UI's files."""
+    path = posixpath.normpath(unquote(url_path)).lstrip("/") or "index.html"
+    if any(part.startswith(".") for part in path.split("/")):
+        return False
+    return path in STATIC_FILES or path.startswith(STATIC_DIRS)
+
+
+def broadcast(event):
+    """Watcher subscriber: pass a change event on to every /api/events client."""
+    for listener in list(LISTENERS):
+        listener.put(event)
+
+
+# ---------- HTTP ----------
+
+class VaultRequestHandler(SimpleHTTPRequestHandler):
+    """Serves /api/* from the store and everything else from ROOT."""
+
+    # (url, store stamps) -> (etag, body); stale stamps simply stop matching.
+    cache = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=ROOT, **kwargs)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith("/api/"):
+            if not is_static(url.path):
+                return self.send_error(HTTPStatus.NOT_FOUND)
+            return super().do_GET()
+        if url.path.rstrip("/") == "/api/events":
+            return self.stream_events()
+        self.handle_api("GET", url)
+
+    def do_HEAD(self):
+        if not is_static(urlsplit(self.path).path):
+            return self.send_error(HTTPStatus.NOT_FOUND)
+        return super().do_HEAD()
+
+    def do_POST(self):
+        self.handle_api("POST", urlsplit(self.path))
+
+    def do_PUT(self):
+        self.handle_api("PUT", urlsplit(self.path))
+
+    def handle_api(self, method, url):
+        parts = [p for p in url.path.split("/")[2:] if p]
+        params = parse_qs(url.query)
+        try:
+            with LOCK:
+                if method == "GET":
+                    # Unseeded rolls must differ between requests.
+                    key = (self.path, collection_stamps())
+                    if parts == ["encounters"] and "seed" not in params:
+                        key = None
+                    cached = self.cache.get(key) if key else None
+                    if cached is None:
+                        body = json.dumps(self.route_get(parts, params), ensure_ascii=False).encode("utf-8")
+                        cached = (hashlib.sha1(body).hexdigest(), body)
+                        if key is not None:
+                            if len(self.cache) >= CACHE_SIZE:
+                                self.cache.clear()
+                            self.cache[key] = cached
+                    etag, body = cached
+                    status = HTTPStatus.OK
+                else:
+                    result = self.route_write(method, parts)
+                    body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                    etag = None
+                    status = HTTPStatus.CREATED if method == "POST" else HTTPStatus.OK
+        except ApiError as e:
+            return self.send_json(e.status, {"error": e.message})
+        self.send_body(status, body, "application/json; charset=utf-8", etag)
+
+    def route_get(self, parts, params):
+        if parts == ["search"]:
+            return search(params)
+        if parts == ["links"]:
+            return vault.LINKS.to_dict()
+        if parts == ["calendar"]:
+            return calendar(params)
+        if parts == ["encounters"]:
+            return encounters(params)
+        if parts == ["prices"]:
+            return prices(params)
+        if len(parts) == 1:
+            return list_entries(parts[0], params)
+        if len(parts) == 2:
+            return get_entry(parts[0], parts[1])
+        if len(parts) == 3 and parts[2] == "render":
+            return render_entry(parts[0], parts[1], params)
+        raise ApiError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+
+    def route_write(self, method, parts):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+        if method == "POST" and len(parts) == 1:
+            return write_entry(parts[0], body)
+        if method == "PUT" and len(parts) == 2:
+            return write_entry(parts[0], body, parts[1])
+        raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Unsupported write")
+
+    def stream_events(self):
+        """Server-sent events: `change` with {"collections", "sources"} per reload."""
+        listener = queue.Queue()
+        LISTENERS.add(listener)
+        self.close_connection = True
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            while True:
+                try:
+                    chunk = f"event: change\ndata: {json.dumps(listener.get(timeout=KEEPALIVE))}\n\n"
+                except queue.Empty:
+                    chunk = ": keepalive\n\n"
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            LISTENERS.discard(listener)
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data).encode("utf-8"), "application/json; charset=utf-8")
+
+    def send_body(self, status, body, content_type, etag=None):
+        if etag and self.headers.get("If-None-Match") == f'"{etag}"':
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", f'"{etag}"')
+            self.end_headers()
+            return
+        gzipped = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if etag:
+            self.send_header("ETag", f'"{etag}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the vault API and web UI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--poll", action="store_true", help="Watch files by polling instead of inotify")
+    parser.add_argument("--no-watch", action="store_true", help="Don't watch files; stat them per request")
+    args = parser.parse_args()
+
+    # Collection paths in dnd_vault are relative to the vault directory.
+    os.chdir(ROOT)
+    watcher = None
+    if not args.no_watch and not vault.VAULT_DB:
+        watcher = VaultWatcher(vault.STORE, vault.COLLECTION_PATHS, [MONSTER_SOURCE_DIR],
+                               search=vault.SEARCH, links=vault.LINKS, lock=LOCK, force_poll=args.poll)
+        watcher.subscribe(broadcast)
+        watcher.start()
+    server = ThreadingHTTPServer((args.host, args.port), VaultRequestHandler)
+    print(f"Serving D&D Vault on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    if watcher is not None:
+        print(f"Watching vault files for changes ({watcher.watcher.kind})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        with LOCK:
+            vault.STORE.compact_all()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
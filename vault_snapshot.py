@@ -0,0 +1,100 @@
+"""
+Vault Snapshot
+Binary (marshal) snapshots of parsed collections under .vault_cache/, so a
+cold start reads one compact file instead of parsing pretty-printed JSON.
+
+A snapshot records the stamp (mtime/size) of the JSON file and its change
+log plus a sha1 of their contents. A matching stamp is trusted outright; a
+different stamp with identical contents (a touch, a checkout) still counts.
+Anything else falls back to JSON, and a fresh snapshot is written by a
+background thread.
+
+Each entry is marshalled separately, so loading a snapshot only reads a list
+of byte strings; entries are decoded when first used (see
+`vault_store.Collection.from_snapshot`).
+"""
+
+import gc
+import hashlib
+import marshal
+import os
+import threading
+from contextlib import contextmanager
+
+import vault_log
+
+# Bump when the payload layout changes; older snapshots are then ignored.
+VERSION = 2
+
+
+@contextmanager
+def gc_paused():
+    """Pause the cyclic GC while bulk-building containers.
+
+    Parsing a large collection creates millions of dicts and lists that are
+    never garbage; letting the collector scan them repeatedly costs more
+    than the parse itself.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def content_digest(raw, path):
+    """sha1 of a collection's JSON bytes (`raw`) followed by its change log."""
+    h = hashlib.sha1(raw)
+    h.update(b"\0")
+    try:
+        with open(vault_log.log_path(path), "rb") as f:
+            h.update(f.read())
+    except FileNotFoundError:
+        pass
+    return h.hexdigest()
+
+
+def read_snapshot(target):
+    """Return (stamp, digest, log_length, ids, blobs), or None if missing or unreadable."""
+    try:
+        with open(target, "rb") as f, gc_paused():
+            data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, tuple) or len(data) != 6 or data[0] != VERSION:
+        return None
+    return data[1:]
+
+
+def split_entries(entries):
+    """Entries -> (ids, per-entry marshal blobs)."""
+    ids = [e.get("id") if isinstance(e, dict) else None for e in entries]
+    return ids, [marshal.dumps(e) for e in entries]
+
+
+def encode(stamp, digest, log_length, ids, blobs):
+    """Serialize now, on the caller's thread, so later edits can't leak in."""
+    return marshal.dumps((VERSION, stamp, digest, log_length, ids, blobs))
+
+
+def write_snapshot(target, payload):
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, target)
+    except OSError:
+        # A snapshot is only an optimization; never fail a load over it.
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def write_snapshot_async(target, payload):
+    """Write in a background thread (joined at interpreter exit, so it isn't lost)."""
+    thread = threading.Thread(target=write_snapshot, args=(target, payload), name="vault-snapshot")
+    thread.start()
+    return thread
@@ -0,0 +1,290 @@
+"""
+Vault SQLite
+Optional SQLite storage backend with the same interface as VaultStore.
+
+One table per collection holds each record as a JSON document (nested fields
+like `objectives` and `inventory` stay queryable with json_extract), keyed by
+ID and ordered by position. A matching FTS5 table serves search. Records are
+still addressed by their JSON file path, so everything built on the store
+(search menus, link graph, ID allocator, API server) works unchanged.
+
+Enable it by pointing VAULT_DB at a database file, and copy data between the
+canonical JSON files and the database with `dnd_vault.py sync`.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import urllib.request
+
+from search_index import (DEFAULT_FIELDS, NAME, SEARCH_FIELDS, TAGS, CollectionIndex, field_text,
+                          parse_query)
+from vault_store import Collection, collection_name
+
+NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def table_name(path):
+    name = collection_name(path)
+    if not NAME_RE.match(name):
+        raise ValueError(f"Can't use {name!r} as a table name")
+    return name
+
+
+def fts_columns(entry, fields):
+    """Split an entry's searchable text into (name, tags, body) FTS columns."""
+    cols = {NAME: [], TAGS: []}
+    body = []
+    for field, weight in fields:
+        text = field_text(entry.get(field))
+        if text:
+            cols.get(weight, body).append(text)
+    return " ".join(cols[NAME]), " ".join(cols[TAGS]), " ".join(body)
+
+
+def fts_query(query):
+    """Translate search_index query syntax (prefix words, quoted phrases) to FTS5.
+
+    Literal terms have no FTS5 form; `search` checks them on the matched rows.
+    """
+    parts = []
+    for kind, term in parse_query(query):
+        if kind == "prefix":
+            parts.append(f'"{term}"*')
+        elif kind == "exact":
+            parts.append(f'"{term}"')
+        elif kind == "phrase":
+            parts.append('"' + " ".join(term) + '"')
+    return " AND ".join(parts)
+
+
+class SqliteStore:
+    """VaultStore-compatible store backed by a single SQLite database."""
+
+    def __init__(self, db_path, readonly=False):
+        """`readonly` opens an existing database without creating or changing anything."""
+        self.db_path = db_path
+        self.readonly = readonly
+        if readonly:
+            if not os.path.isfile(db_path):
+                raise FileNotFoundError(f"No database at {db_path}")
+            uri = "file:" + urllib.request.pathname2url(os.path.abspath(db_path)) + "?mode=ro"
+            self.db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS _meta (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+        self._tables = set()
+        self._collections = {}
+        self._compacted = {}  # table -> version at its last compact
+        self.metrics = None
+
+    def _table(self, path):
+        table = table_name(path)
+        if table not in self._tables:
+            if self.readonly:
+                if not self.has_table(table):
+                    raise ValueError(f"{self.db_path} has no {table} table")
+                self._tables.add(table)
+                return table
+            with self.db:
+                self.db.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table}" ('
+                    "id TEXT PRIMARY KEY, pos INTEGER NOT NULL, name TEXT, "
+                    "doc TEXT NOT NULL CHECK (json_valid(doc)))"
+                )
+                self.db.execute(f'CREATE INDEX IF NOT EXISTS "{table}_pos" ON "{table}" (pos)')
+                self.db.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}_fts" USING fts5('
+                    "id UNINDEXED, name, tags, body, tokenize = 'unicode61')"
+                )
+                self.db.execute("INSERT OR IGNORE INTO _meta VALUES (?, 0)", (table,))
+            self._tables.add(table)
+        return table
+
+    def has_table(self, table):
+        row = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        return row is not None
+
+    def _version(self, table):
+        row = self.db.execute("SELECT version FROM _meta WHERE name = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, table):
+        self.db.execute("UPDATE _meta SET version = version + 1 WHERE name = ?", (table,))
+
+    def _write_row(self, table, fields, entry, pos):
+        self.db.execute(
+            f'INSERT OR REPLACE INTO "{table}" (id, pos, name, doc) VALUES (?, ?, ?, ?)',
+            (entry["id"], pos, entry.get("name"), json.dumps(entry, ensure_ascii=False)),
+        )
+        self.db.execute(f'DELETE FROM "{table}_fts" WHERE id = ?', (entry["id"],))
+        self.db.execute(
+            f'INSERT INTO "{table}_fts" (id, name, tags, body) VALUES (?, ?, ?, ?)',
+            (entry["id"], *fts_columns(entry, fields)),
+        )
+
+    # ---------- STORE INTERFACE ----------
+
+    def collection(self, path):
+        key = os.path.abspath(path)
+        table = self._table(key)
+        stamp = ("sqlite", self._version(table))
+        coll = self._collections.get(key)
+        if coll is not None and coll.stamp == stamp:
+            return coll
+        docs = [doc for (doc,) in self.db.execute(f'SELECT doc FROM "{table}" ORDER BY pos')]
+        if self.metrics is not None:
+            self.metrics.count("loads")
+            self.metrics.count("bytes_parsed", sum(len(doc) for doc in docs))
+        coll = Collection(key, stamp, [json.loads(doc) for doc in docs])
+        self._collections[key] = coll
+        return coll
+
+    def load(self, path):
+        return self.collection(path).entries
+
+    def get(self, path, entry_id):
+        """Primary-key lookup straight from the database."""
+        row = self.db.execute(
+            f'SELECT doc FROM "{self._table(path)}" WHERE id = ?', (entry_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _matching(self, path, field, value, limit=-1):
+        """Docs whose `field` equals `value` or holds it as a list element, in order."""
+        rows = self.db.execute(
+            f'SELECT doc FROM "{self._table(path)}" WHERE EXISTS ('
+            "SELECT 1 FROM json_each(doc, ?) WHERE value = ? AND type NOT IN ('object', 'array')"
+            ") ORDER BY pos LIMIT ?",
+            ('$."' + field + '"', value, limit),
+        )
+        return [json.loads(doc) for (doc,) in rows]
+
+    def find_all(self, path, field, value):
+        """Every entry whose `field` equals (or contains) `value`, via json_each."""
+        if value is None:
+            return []
+        return self._matching(path, field, value)
+
+    def find(self, path, field, value):
+        matches = self._matching(path, field, value, 1) if value is not None else []
+        return matches[0] if matches else None
+
+    def save(self, path, entries, indent=2):
+        """Replace a whole collection in one transaction."""
+        table = self._table(path)
+        fields = SEARCH_FIELDS.get(table, DEFAULT_FIELDS)
+        with self.db:
+            self.db.execute(f'DELETE FROM "{table}"')
+            self.db.execute(f'DELETE FROM "{table}_fts"')
+            for pos, entry in enumerate(entries):
+                self._write_row(table, fields, entry, pos)
+            self._bump(table)
+        key = os.path.abspath(path)
+        self._collections[key] = Collection(key, ("sqlite", self._version(table)), entries)
+
+    def append(self, path, entry):
+        """Insert or update a single record (O(log n))."""
+        table = self._table(path)
+        fields = SEARCH_FIELDS.get(table, DEFAULT_FIELDS)
+        with self.db:
+            row = self.db.execute(f'SELECT pos FROM "{table}" WHERE id = ?', (entry["id"],)).fetchone()
+            if row is None:
+                row = self.db.execute(f'SELECT COALESCE(MAX(pos) + 1, 0) FROM "{table}"').fetchone()
+            self._write_row(table, fields, entry, row[0])
+            self._bump(table)
+        coll = self._collections.get(os.path.abspath(path))
+        if coll is not None and coll.stamp == ("sqlite", self._version(table) - 1):
+            coll.put(entry)
+            coll.stamp = ("sqlite", self._version(table))
+
+    def compact(self, path, indent=2):
+        """Merge the table's FTS segments if it changed, then checkpoint the WAL."""
+        self._optimize(self._table(path))
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def compact_all(self):
+        for table in list(self._tables):
+            self._optimize(table)
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _optimize(self, table):
+        version = self._version(table)
+        if self._compacted.get(table) != version:
+            with self.db:
+                self.db.execute(f'INSERT INTO "{table}_fts" ("{table}_fts") VALUES (\'optimize\')')
+            self._compacted[table] = version
+
+    def invalidate(self, path=None):
+        if path is None:
+            self._collections.clear()
+        else:
+            self._collections.pop(os.path.abspath(path), None)
+
+    # ---------- SEARCH ----------
+
+    def search(self, path, query):
+        """Ranked FTS5 search (name > tags > other text), same syntax as SearchEngine."""
+        match = fts_query(query)
+        if not match:
+            return []
+        table = self._table(path)
+        rows = self.db.execute(
+            f'SELECT t.doc FROM "{table}_fts" f JOIN "{table}" t ON t.id = f.id '
+            f'WHERE "{table}_fts" MATCH ? '
+            f'ORDER BY bm25("{table}_fts", 0, {NAME}, {TAGS}, 1), t.pos',
+            (match,),
+        )
+        docs = [json.loads(doc) for (doc,) in rows]
+        literals = [term for kind, term in parse_query(query) if kind == "literal"]
+        if literals:
+            fields = SEARCH_FIELDS.get(table, DEFAULT_FIELDS)
+            raw = lambda d: " ".join(field_text(d.get(f)) for f, _ in fields).casefold()
+            docs = [d for d in docs if all(t in raw(d) for t in literals)]
+        return docs
+
+    def fuzzy(self, path, query):
+        """Typo-tolerant fallback; the trigram index is rebuilt when the table changes."""
+        coll = self.collection(path)
+        fields = SEARCH_FIELDS.get(collection_name(path), DEFAULT_FIELDS)
+        idx = coll.derived("fuzzy", lambda c: CollectionIndex(fields))
+        idx.sync(coll.entries, coll.stamp)
+        suggestion, hits = idx.fuzzy_query(query)
+        return suggestion, [coll.get(d) for d, _ in hits]
+
+    # ---------- SYNC ----------
+
+    def import_json(self, paths, json_store):
+        """Copy each collection from its canonical JSON file into the database."""
+        counts = {}
+        for name, path in paths.items():
+            entries = json_store.load(path)
+            self.save(path, entries)
+            counts[name] = len(entries)
+        return counts
+
+    def export_json(self, paths, json_store, indent=2, force=False):
+        """Write each collection back to its canonical JSON file via `json_store.save`.
+
+        Refuses (ValueError) when any collection is missing or empty in the
+        database, since that would wipe its JSON file; `force` writes anyway.
+        """
+        collections = {}
+        for name, path in paths.items():
+            has = self.has_table(table_name(path))
+            collections[name] = (path, self.load(path) if has else [])
+        empty = [name for name, (_, entries) in collections.items() if not entries]
+        if empty and not force:
+            raise ValueError(f"{self.db_path} has no {', '.join(empty)}; "
+                             "refusing to overwrite their JSON files (use --force)")
+        counts = {}
+        for name, (path, entries) in collections.items():
+            json_store.save(path, entries, indent)
+            counts[name] = len(entries)
+        return counts
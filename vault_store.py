@@ -0,0 +1,304 @@
+"""
+Vault Store
+Keeps each parsed collection file in memory with ID and field indexes,
+reloading a file only when its mtime or size changes on disk.
+
+Adds and updates go to an append-only log next to the file (see vault_log)
+and are folded back into the pretty-printed JSON by `compact()`.
+
+Parsed collections are also snapshotted in binary form (see vault_snapshot),
+so the next process can skip JSON parsing while the files are unchanged.
+"""
+
+import json
+import marshal
+import os
+
+import vault_log
+import vault_snapshot
+
+# Number of logged records after which a collection is compacted.
+COMPACT_EVERY = 50
+
+# Derived data (search indexes, snapshots, ...) lives here, next to the vault.
+CACHE_DIR = ".vault_cache"
+
+
+def file_stamp(path):
+    """Return (mtime_ns, size) for a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def cache_path(path, name):
+    """Path for a derived-data file belonging to the collection at `path`."""
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def collection_name(path):
+    """`items.json` -> `items`."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def id_number(entry_id):
+    """Numeric part of an ID like `item-0042`, or 0 if it has none."""
+    try:
+        return int(str(entry_id).split("-")[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def collection_stamp(path):
+    """Stamp covering both the canonical file and its change log."""
+    return (file_stamp(path), file_stamp(vault_log.log_path(path)))
+
+
+class Collection:
+    """One parsed collection file plus the indexes built over it."""
+
+    def __init__(self, path, stamp, entries, log_length=0):
+        self.path = path
+        self.stamp = stamp
+        self.log_length = log_length
+        self._entries = entries
+        self._by_id = None
+        # (ids, marshal blobs, {slot: decoded entry}) until fully decoded
+        self._lazy = None
+        self._slots = None
+        self._indexes = {}
+        self._derived = {}
+        self._max_number = None
+        # IDs passed to put(), in order, so indexes can catch up incrementally
+        self.changes = []
+
+    @classmethod
+    def from_snapshot(cls, path, stamp, ids, blobs, log_length=0):
+        """A collection whose entries are decoded from a snapshot only when used."""
+        coll = cls(path, stamp, None, log_length)
+        coll._lazy = (ids, blobs, {})
+        return coll
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            ids, blobs, decoded = self._lazy
+            with vault_snapshot.gc_paused():
+                self._entries = [
+                    decoded[i] if i in decoded else marshal.loads(blob) for i, blob in enumerate(blobs)
+                ]
+            self._lazy = self._slots = None
+        return self._entries
+
+    @property
+    def by_id(self):
+        if self._by_id is None:
+            self._by_id = {}
+            for entry in self.entries:
+                if isinstance(entry, dict) and entry.get("id") is not None:
+                    self._by_id[entry["id"]] = entry
+        return self._by_id
+
+    def get(self, entry_id):
+        """Look up one entry, decoding only that entry if the collection is still lazy."""
+        if self._lazy is None:
+            return self.by_id.get(entry_id)
+        ids, blobs, decoded = self._lazy
+        if self._slots is None:
+            self._slots = {i: slot for slot, i in enumerate(ids) if i is not None}
+        slot = self._slots.get(entry_id)
+        if slot is None:
+            return None
+        if slot not in decoded:
+            decoded[slot] = marshal.loads(blobs[slot])
+        return decoded[slot]
+
+    def max_number(self):
+        """Highest numeric ID suffix in the collection (`item-0042` -> 42)."""
+        if self._max_number is None:
+            ids = self._lazy[0] if self._lazy is not None else self.by_id
+            self._max_number = max((id_number(i) for i in ids if i is not None), default=0)
+        return self._max_number
+
+    def put(self, entry):
+        """Insert or replace an entry by ID and drop stale field indexes."""
+        old = self.by_id.get(entry.get("id"))
+        if old is None:
+            self.entries.append(entry)
+        else:
+            self.entries[self.entries.index(old)] = entry
+        if entry.get("id") is not None:
+            self.by_id[entry["id"]] = entry
+            if self._max_number is not None:
+                self._max_number = max(self._max_number, id_number(entry["id"]))
+        self.changes.append(entry.get("id"))
+        self._indexes.clear()
+        self._derived.clear()
+
+    def index(self, field):
+        """Map every value of `field` to the entries holding it.
+
+        List-valued fields (e.g. `related_items`) are indexed per element,
+        so this doubles as the reverse index for ID links.
+        """
+        idx = self._indexes.get(field)
+        if idx is None:
+            idx = {}
+            for entry in self.entries:
+                value = entry.get(field) if isinstance(entry, dict) else None
+                values = value if isinstance(value, list) else [value]
+                for v in values:
+                    if v is None or isinstance(v, (dict, list)):
+                        continue
+                    idx.setdefault(v, []).append(entry)
+            self._indexes[field] = idx
+        return idx
+
+    def derived(self, name, build):
+        """Memoize `build(collection)` until the collection next changes."""
+        value = self._derived.get(name)
+        if value is None:
+            value = self._derived[name] = build(self)
+        return value
+
+
+class VaultStore:
+    """Cache of parsed collection files, keyed by absolute path."""
+
+    def __init__(self, compact_every=COMPACT_EVERY, snapshots=True):
+        self.compact_every = compact_every
+        self.snapshots = snapshots
+        self._collections = {}
+        # Optional vault_metrics.Metrics; only consulted when a file is parsed.
+        self.metrics = None
+        # Paths a watcher (vault_watch) keeps fresh: served without a stat.
+        self.watched = set()
+
+    def collection(self, path):
+        key = os.path.abspath(path)
+        coll = self._collections.get(key)
+        if coll is not None and key in self.watched:
+            return coll
+        stamp = collection_stamp(key)
+        if coll is not None and coll.stamp == stamp:
+            return coll
+
+        coll = self._read(key, stamp)
+        self._collections[key] = coll
+        return coll
+
+    def watch(self, path):
+        """Trust the cached copy of `path` until `refresh()` is called for it."""
+        self.watched.add(os.path.abspath(path))
+
+    def unwatch(self, path):
+        self.watched.discard(os.path.abspath(path))
+
+    def refresh(self, path):
+        """Re-parse `path` if it changed on disk; returns True if it did."""
+        key = os.path.abspath(path)
+        stamp = collection_stamp(key)
+        coll = self._collections.get(key)
+        if coll is not None and coll.stamp == stamp:
+            return False
+        self._collections[key] = self._read(key, stamp)
+        return True
+
+    def _read(self, key, stamp):
+        """Parse a collection, preferring a matching binary snapshot over the JSON."""
+        snap = None
+        if self.snapshots:
+            target = cache_path(key, f"{collection_name(key)}.snapshot")
+            snap = vault_snapshot.read_snapshot(target)
+            if snap is not None and snap[0] == stamp:
+                self._count_load(os.path.getsize(target))
+                return Collection.from_snapshot(key, stamp, snap[3], snap[4], snap[2])
+
+        raw = b""
+        if stamp[0] is not None:
+            with open(key, "rb") as f:
+                raw = f.read()
+        if self.snapshots:
+            digest = vault_snapshot.content_digest(raw, key)
+            if snap is not None and snap[1] == digest:
+                # Same content under a new mtime: re-key the snapshot, skip the parse.
+                vault_snapshot.write_snapshot_async(
+                    target, vault_snapshot.encode(stamp, digest, *snap[2:]))
+                self._count_load(os.path.getsize(target))
+                return Collection.from_snapshot(key, stamp, snap[3], snap[4], snap[2])
+
+        with vault_snapshot.gc_paused():
+            entries = json.loads(raw) if raw else []
+        records = vault_log.read_records(key)
+        vault_log.apply_records(entries, records)
+        if self.snapshots:
+            vault_snapshot.write_snapshot_async(
+                target, vault_snapshot.encode(stamp, digest, len(records), *vault_snapshot.split_entries(entries)))
+        self._count_load(sum(s[1] for s in stamp if s))
+        return Collection(key, stamp, entries, len(records))
+
+    def _count_load(self, size):
+        if self.metrics is not None:
+            self.metrics.count("loads")
+            self.metrics.count("bytes_parsed", size)
+
+    def load(self, path):
+        """Return the cached entry list for a collection file."""
+        return self.collection(path).entries
+
+    def get(self, path, entry_id):
+        """Look up an entry by its ID."""
+        return self.collection(path).get(entry_id)
+
+    def find_all(self, path, field, value):
+        """Return every entry whose `field` equals (or contains) `value`."""
+        return list(self.collection(path).index(field).get(value, []))
+
+    def find(self, path, field, value):
+        """Return the first entry whose `field` equals (or contains) `value`."""
+        matches = self.collection(path).index(field).get(value)
+        return matches[0] if matches else None
+
+    def save(self, path, entries, indent=2):
+        """Atomically rewrite a whole collection and clear its change log."""
+        key = os.path.abspath(path)
+        vault_log.write_json_atomic(key, entries, indent)
+        vault_log.clear_log(key)
+        stamp = collection_stamp(key)
+        self._collections[key] = Collection(key, stamp, entries)
+        if self.snapshots:
+            with open(key, "rb") as f:
+                digest = vault_snapshot.content_digest(f.read(), key)
+            vault_snapshot.write_snapshot_async(
+                cache_path(key, f"{collection_name(key)}.snapshot"),
+                vault_snapshot.encode(stamp, digest, 0, *vault_snapshot.split_entries(entries)))
+
+    def append(self, path, entry):
+        """Add or update one entry via the change log (O(record) on disk)."""
+        coll = self.collection(path)
+        vault_log.append_records(coll.path, [entry])
+        coll.put(entry)
+        coll.log_length += 1
+        coll.stamp = collection_stamp(coll.path)
+        if coll.log_length >= self.compact_every:
+            self.compact(path)
+
+    def compact(self, path, indent=2):
+        """Fold a collection's change log into its canonical JSON file."""
+        coll = self.collection(path)
+        if coll.log_length:
+            self.save(path, coll.entries, indent)
+
+    def compact_all(self):
+        for key in list(self._collections):
+            self.compact(key)
+
+    def invalidate(self, path=None):
+        if path is None:
+            self._collections.clear()
+        else:
+            self._collections.pop(os.path.abspath(path), None)
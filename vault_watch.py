@@ -0,0 +1,256 @@
+"""
+Vault Watch
+Hot reload for long-running processes (the API server): notices when a
+collection file, its change log or a monster source file changes on disk,
+waits for the burst of writes to settle, then re-parses just that collection
+and tells subscribers which collections changed.
+
+On Linux the watcher uses inotify (through ctypes, no extra packages) on the
+directories holding the files, so atomic replaces (write tmp, rename) are
+seen too. Elsewhere, or if inotify is unavailable, it polls (mtime, size).
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import vault_log
+from vault_store import file_stamp
+
+DEBOUNCE = 0.2
+POLL_INTERVAL = 1.0
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal inotify binding: watch directories, read changed file paths."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+
+    def add_dir(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Can't watch {directory}")
+        self.dirs[wd] = directory
+
+    def read(self, timeout):
+        """Paths touched since the last read; waits up to `timeout` seconds for the first."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        paths = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if wd in self.dirs and name:
+                paths.add(os.path.join(self.dirs[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Poller:
+    """Fallback with the same interface: diff (mtime, size) of every watched file."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.dirs = []
+        self.stamps = {}
+
+    def add_dir(self, directory):
+        self.dirs.append(directory)
+        self.stamps.update(self.scan(directory))
+
+    def scan(self, directory):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return {}
+        paths = (os.path.join(directory, n) for n in names)
+        return {p: file_stamp(p) for p in paths if os.path.isfile(p)}
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = {}
+        for directory in self.dirs:
+            current.update(self.scan(directory))
+        changed = {p for p in current.keys() | self.stamps.keys() if current.get(p) != self.stamps.get(p)}
+        self.stamps = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_backend(force_poll=False):
+    if not force_poll and sys.platform.startswith("linux"):
+        try:
+            return Inotify()
+        except (OSError, AttributeError):
+            pass
+    return Poller()
+
+
+class Watcher:
+    """Background thread reporting debounced sets of changed paths.
+
+    `files` are watched individually; anything inside `directories` counts.
+    Subscribers are called on the watcher thread with a set of absolute paths.
+    """
+
+    def __init__(self, files=(), directories=(), debounce=DEBOUNCE, force_poll=False):
+        self.files = {os.path.abspath(f) for f in files}
+        self.directories = {os.path.abspath(d) for d in directories if os.path.isdir(d)}
+        self.debounce = debounce
+        self.backend = make_backend(force_poll)
+        for directory in sorted({os.path.dirname(f) for f in self.files} | self.directories):
+            self.backend.add_dir(directory)
+        self.subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def kind(self):
+        return "inotify" if isinstance(self.backend, Inotify) else "poll"
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def relevant(self, path):
+        return path in self.files or os.path.dirname(path) in self.directories
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="vault-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.backend.close()
+
+    def _run(self):
+        pending = set()
+        while not self._stop.is_set():
+            # While a burst is pending, only wait out the quiet period.
+            changed = {p for p in self.backend.read(self.debounce if pending else 0.5) if self.relevant(p)}
+            if changed:
+                pending |= changed
+                continue
+            if pending:
+                batch, pending = pending, set()
+                for callback in list(self.subscribers):
+                    try:
+                        callback(batch)
+                    except Exception as e:  # keep watching whatever one subscriber does
+                        print(f"[watch] subscriber failed: {e}", file=sys.stderr)
+
+
+class VaultWatcher:
+    """Reloads changed collections into a store and refreshes what depends on them.
+
+    `paths` maps collection names to files (dnd_vault.COLLECTION_PATHS);
+    `source_dirs` are directories of monster source files. Subscribers get
+    {"collections": [names], "sources": [paths]} after the reload, and run
+    under `lock` when one is given (the API server's store lock).
+    """
+
+    def __init__(self, store, paths, source_dirs=(), search=None, links=None, lock=None,
+                 debounce=DEBOUNCE, force_poll=False):
+        self.store = store
+        self.paths = {name: os.path.abspath(p) for name, p in paths.items()}
+        self.search = search
+        self.links = links
+        self.lock = lock or contextlib.nullcontext()
+        self.subscribers = []
+        files = []
+        for path in self.paths.values():
+            files += [path, vault_log.log_path(path)]
+        self.source_dirs = {os.path.abspath(d) for d in source_dirs}
+        self.watcher = Watcher(files, self.source_dirs, debounce, force_poll)
+        self.watcher.subscribe(self.on_change)
+        # Stamp each collection was last announced at, so writes made through
+        # the store itself (which don't need a reload) still reach subscribers.
+        self.stamps = {}
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def start(self):
+        with self.lock:
+            for name, path in self.paths.items():
+                self.stamps[name] = self.store.collection(path).stamp
+                self.store.watch(path)
+        self.watcher.start()
+        return self
+
+    def stop(self):
+        self.watcher.stop()
+        with self.lock:
+            for path in self.paths.values():
+                self.store.unwatch(path)
+
+    def on_change(self, changed):
+        log_of = {vault_log.log_path(p): p for p in self.paths.values()}
+        touched = {log_of.get(p, p) for p in changed}
+        with self.lock:
+            names = []
+            for name, path in self.paths.items():
+                if path not in touched:
+                    continue
+                self.store.refresh(path)
+                stamp = self.store.collection(path).stamp
+                if stamp != self.stamps.get(name):
+                    self.stamps[name] = stamp
+                    names.append(name)
+                    if self.search is not None:
+                        self.search.index(path)
+            if names and self.links is not None:
+                self.links.refresh()
+            event = {
+                "collections": names,
+                "sources": sorted(os.path.relpath(p) for p in changed if os.path.dirname(p) in self.source_dirs),
+            }
+            if event["collections"] or event["sources"]:
+                for callback in list(self.subscribers):
+                    callback(event)